@@ -18,14 +18,19 @@ from bot.db import make_engine, make_sessionmaker
 from bot.handlers.common import router as common_router
 from bot.handlers.developer import router as developer_router
 from bot.handlers.drop_manager import router as drop_router
-from bot.handlers.team_lead import router as team_lead_router
+from bot.handlers.team_lead import router as team_lead_router, run_banks_updated_coalescer
 from bot.handlers.wictory import router as wictory_router
 from bot.logging_setup import setup_logging
 from bot.middlewares import DBSessionMiddleware, GroupChatRestrictionMiddleware, LastPrivateMessageTrackerMiddleware
 from bot.models import Base
 from bot.keyboards import kb_dev_main_inline, kb_dm_main_inline, kb_dm_source_pick_inline, kb_pending_main, kb_team_lead_inline_main, kb_wictory_main_inline
 from bot.models import UserRole
-from bot.repositories import count_pending_forms, count_rejected_forms_by_user_id, get_active_shift, list_users
+from bot.repositories import (
+    count_pending_forms,
+    count_rejected_forms_by_user_id,
+    get_active_shift,
+    iter_users,
+)
 
 
 async def _init_db(engine: AsyncEngine) -> None:
@@ -141,6 +146,12 @@ async def _init_db(engine: AsyncEngine) -> None:
                 await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_duplicate_reports_phone ON duplicate_reports (phone)"))
                 await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_duplicate_reports_bank_name ON duplicate_reports (bank_name)"))
                 await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_duplicate_reports_created_at ON duplicate_reports (created_at)"))
+            await conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_duplicate_reports_source_created "
+                    "ON duplicate_reports (manager_source, created_at)"
+                )
+            )
         except Exception:
             pass
 
@@ -188,6 +199,58 @@ async def _init_db(engine: AsyncEngine) -> None:
         except Exception:
             pass
 
+        try:
+            await conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_access_requests_status_created "
+                    "ON access_requests (status, created_at)"
+                )
+            )
+        except Exception:
+            pass
+
+        try:
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username))"))
+        except Exception:
+            pass
+
+        try:
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_forms_phone_bank ON forms (phone, bank_name)"))
+        except Exception:
+            pass
+
+        # Composite indexes for the hot pool/form/shift filters
+        for ddl in (
+            "CREATE INDEX IF NOT EXISTS ix_forms_manager_status ON forms (manager_id, status)",
+            "CREATE INDEX IF NOT EXISTS ix_resource_pool_bank_source_status ON resource_pool (bank_id, source, status)",
+            "CREATE INDEX IF NOT EXISTS ix_resource_pool_assigned_status ON resource_pool (assigned_to_user_id, status)",
+            "CREATE INDEX IF NOT EXISTS ix_resource_pool_created_by_status ON resource_pool (created_by_user_id, status)",
+            "CREATE INDEX IF NOT EXISTS ix_shifts_active ON shifts (manager_id) WHERE ended_at IS NULL",
+        ):
+            try:
+                await conn.execute(text(ddl))
+            except Exception:
+                pass
+
+        # One-off (user_version 0 -> 1): rewrite JSON-array screenshot lists into the
+        # newline-joined TEXT encoding. The version is bumped only after all tables succeed.
+        if conn.dialect.name == "sqlite":
+            version = int((await conn.execute(text("PRAGMA user_version"))).scalar() or 0)
+            if version < 1:
+                try:
+                    for table, col in (("forms", "screenshots"), ("bank_conditions", "template_screens"), ("resource_pool", "screenshots")):
+                        await conn.execute(
+                            text(
+                                f"UPDATE {table} SET {col} = coalesce(("
+                                f"SELECT group_concat(value, char(10)) FROM "
+                                f"(SELECT value FROM json_each({table}.{col}) ORDER BY key)"
+                                f"), '') WHERE {col} LIKE '[%'"
+                            )
+                        )
+                    await conn.execute(text("PRAGMA user_version = 1"))
+                except Exception:
+                    logging.getLogger("bot").exception("screenshot list migration failed; retrying on next start")
+
 
 async def _run_daily_private_cleanup(*, bot: Bot, session_maker, hour: int = 3, minute: int = 0) -> None:
     tz = ZoneInfo("Europe/Kyiv")
@@ -200,8 +263,7 @@ async def _run_daily_private_cleanup(*, bot: Bot, session_maker, hour: int = 3,
 
         try:
             async with session_maker() as session:
-                users = await list_users(session)
-                for u in users:
+                async for u in iter_users(session):
                     try:
                         last_mid = int(getattr(u, "last_private_message_id", 0) or 0)
                         if last_mid <= 0:
@@ -223,17 +285,28 @@ async def _run_daily_private_cleanup(*, bot: Bot, session_maker, hour: int = 3,
             pass
 
 
+# Strong references to fire-and-forget tasks: the event loop only keeps weak ones.
+_BG_TASKS: set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _BG_TASKS.add(task)
+    task.add_done_callback(_BG_TASKS.discard)
+    return task
+
+
 async def main(settings: Settings) -> None:
     setup_logging(settings.log_level)
     log = logging.getLogger("bot")
 
-    engine = make_engine(settings.db_url)
+    engine = make_engine(settings.db_url, pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow)
     await _init_db(engine)
     session_maker = make_sessionmaker(engine)
 
     bot = Bot(token=settings.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    # FSM data holds ORM rows, datetimes and State objects, so it stays in-process (not JSON-serializable)
     dp = Dispatcher(storage=MemoryStorage())
-
     dp.update.middleware(GroupChatRestrictionMiddleware())
     dp.update.middleware(DBSessionMiddleware(session_maker))
     dp.update.middleware(LastPrivateMessageTrackerMiddleware())
@@ -247,14 +320,15 @@ async def main(settings: Settings) -> None:
     # Best-effort greeting broadcast to all known users on each restart
     try:
         async with session_maker() as session:
-            users = await list_users(session)
-            for u in users:
+            live_cnt: int | None = None  # counted once, on the first team lead
+            async for u in iter_users(session):
                 try:
                     rm = kb_pending_main()
                     if int(getattr(u, "tg_id", 0)) in settings.developer_id_set:
                         rm = kb_dev_main_inline()
                     elif u.role == UserRole.TEAM_LEAD:
-                        live_cnt = await count_pending_forms(session)
+                        if live_cnt is None:
+                            live_cnt = await count_pending_forms(session)
                         rm = kb_team_lead_inline_main(live_count=live_cnt)
                     elif u.role == UserRole.DROP_MANAGER:
                         if not getattr(u, "manager_source", None):
@@ -274,7 +348,8 @@ async def main(settings: Settings) -> None:
         pass
 
     log.info("Bot started")
-    asyncio.create_task(_run_daily_private_cleanup(bot=bot, session_maker=session_maker, hour=3, minute=0))
+    _spawn(_run_daily_private_cleanup(bot=bot, session_maker=session_maker, hour=3, minute=0))
+    _spawn(run_banks_updated_coalescer(bot=bot, session_maker=session_maker))
     await dp.start_polling(bot, settings=settings)
 
 
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+from bot.models import TeamLeadSource, User, UserRole
+
+TEAM_LEAD_TTL_SECONDS = 60.0
+USER_TTL_SECONDS = 30.0
+
+
+@dataclass(frozen=True, slots=True)
+class TeamLeadAuth:
+    """Session-independent snapshot of a TeamLead row, safe to keep between updates."""
+
+    tg_id: int
+    source: TeamLeadSource
+
+
+@dataclass(frozen=True, slots=True)
+class UserAuth:
+    """Session-independent snapshot of the User fields role-scoped handlers need."""
+
+    id: int
+    tg_id: int
+    role: UserRole
+    manager_source: str | None
+
+
+# tg_id -> (snapshot, monotonic expiry); "not a team lead" is never cached, so a new
+# team lead passes on the very next update
+_TEAM_LEADS: dict[int, tuple[TeamLeadAuth, float]] = {}
+# tg_id -> (snapshot, monotonic expiry); unknown users are never cached
+_USERS: dict[int, tuple[UserAuth, float]] = {}
+_MISS = object()
+# bumped by every invalidation: a load that started before one must not be cached
+_epoch = 0
+# session.info keys: tg_ids whose snapshot is dropped once that session commits
+_PENDING_TEAM_LEADS = "auth_cache_team_leads"
+_PENDING_USERS = "auth_cache_users"
+# User columns copied into UserAuth (besides id/tg_id)
+_USER_AUTH_FIELDS = ("role", "manager_source")
+
+
+def _get(store: dict[int, tuple[object, float]], tg_id: int) -> object:
+    entry = store.get(int(tg_id))
+    if entry is None:
+        return _MISS
+    value, expires_at = entry
+    if expires_at <= time.monotonic():
+        store.pop(int(tg_id), None)
+        return _MISS
+    return value
+
+
+def auth_epoch() -> int:
+    """Read before loading a row from the DB; pass to cache_team_lead/cache_user."""
+    return _epoch
+
+
+def get_cached_team_lead(tg_id: int) -> TeamLeadAuth | object:
+    """Returns the cached snapshot or _MISS."""
+    return _get(_TEAM_LEADS, tg_id)
+
+
+def is_miss(value: object) -> bool:
+    return value is _MISS
+
+
+def cache_team_lead(tg_id: int, value: TeamLeadAuth | None, epoch: int) -> None:
+    if value is None or epoch != _epoch:
+        return
+    _TEAM_LEADS[int(tg_id)] = (value, time.monotonic() + TEAM_LEAD_TTL_SECONDS)
+
+
+def invalidate_team_lead(tg_id: int | None = None) -> None:
+    global _epoch
+    _epoch += 1
+    if tg_id is None:
+        _TEAM_LEADS.clear()
+        return
+    _TEAM_LEADS.pop(int(tg_id), None)
+
+
+def get_cached_user(tg_id: int) -> UserAuth | object:
+    """Returns the cached snapshot or _MISS."""
+    return _get(_USERS, tg_id)
+
+
+def cache_user(tg_id: int, value: UserAuth | None, epoch: int) -> None:
+    if value is None or epoch != _epoch:
+        return
+    _USERS[int(tg_id)] = (value, time.monotonic() + USER_TTL_SECONDS)
+
+
+def invalidate_user(tg_id: int | None = None) -> None:
+    global _epoch
+    _epoch += 1
+    if tg_id is None:
+        _USERS.clear()
+        return
+    _USERS.pop(int(tg_id), None)
+
+
+def invalidate_team_lead_on_commit(session: AsyncSession, tg_id: int) -> None:
+    """
+    Drops the snapshot once `session` commits (a rollback keeps it). Invalidating before
+    the commit would let a concurrent update re-cache the row it is about to replace.
+    """
+    session.info.setdefault(_PENDING_TEAM_LEADS, set()).add(int(tg_id))
+
+
+# Role/source changes are plain attribute writes spread across handlers; collect the
+# affected users on flush instead of relying on every call site, and drop their
+# snapshots only when the transaction commits.
+@event.listens_for(Session, "after_flush")
+def _on_session_flush(session: Session, flush_context) -> None:
+    changed = [u for u in session.deleted if isinstance(u, User)]
+    for u in session.dirty:
+        if isinstance(u, User) and any(inspect(u).attrs[f].history.has_changes() for f in _USER_AUTH_FIELDS):
+            changed.append(u)
+    if changed:
+        session.info.setdefault(_PENDING_USERS, set()).update(int(u.tg_id) for u in changed if u.tg_id is not None)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_session_commit(session: Session) -> None:
+    for tg_id in session.info.pop(_PENDING_TEAM_LEADS, ()):
+        invalidate_team_lead(tg_id)
+    for tg_id in session.info.pop(_PENDING_USERS, ()):
+        invalidate_user(tg_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _on_session_rollback(session: Session, previous_transaction: SessionTransaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_TEAM_LEADS, None)
+        session.info.pop(_PENDING_USERS, None)
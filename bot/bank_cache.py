@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+BANK_ITEMS_TTL_SECONDS = 60.0
+
+BankItems = tuple[tuple[int, str], ...]
+# list key -> (monotonic expiry, ((bank_id, label), ...))
+_bank_items: dict[str, tuple[float, BankItems]] = {}
+_bank_items_lock = asyncio.Lock()
+
+
+def invalidate_bank(bank_id: int | None = None) -> None:
+    # any bank write may change names/ordering of the shared lists
+    _bank_items.clear()
+
+
+async def get_bank_items(load: Callable[[], Awaitable[BankItems]], key: str = "all") -> BankItems:
+    """
+    Cached (id, label) list of banks stored under `key`. On expiry only one caller
+    runs `load` (single-flight); concurrent callers wait for and share its result.
+    """
+    cached = _bank_items.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    async with _bank_items_lock:
+        cached = _bank_items.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        items = await load()
+        _bank_items[key] = (time.monotonic() + BANK_ITEMS_TTL_SECONDS, items)
+        return items
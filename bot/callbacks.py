@@ -30,3 +30,26 @@ class BankEditCb(CallbackData, prefix="bankedit"):
     bank_id: int
 
 
+
+
+# WICTORY callbacks share the "wictory" prefix; the leading fields keep the existing
+# "wictory:<action>:..." wire format, so buttons already sent in chats keep working.
+class WictoryAddCb(CallbackData, prefix="wictory"):
+    action: str  # add
+    resource_type: str  # link/esim/link_esim
+
+
+class WictoryBankCb(CallbackData, prefix="wictory"):
+    action: str  # bank
+    bank_id: int
+
+
+class WictoryEditCb(CallbackData, prefix="wictory"):
+    action: str  # edit
+    field: str  # bank/data/screen
+
+
+class WictoryInvalidCb(CallbackData, prefix="wictory"):
+    scope: str  # invalid
+    action: str  # open/edit_data/edit_media/return/delete
+    item_id: int
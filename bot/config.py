@@ -43,6 +43,8 @@ class Settings:
     developer_ids: str = ""
     group_chat_id: int | None = None
     db_url: str = "sqlite+aiosqlite:///./bot.db"
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
     log_level: str = "INFO"
 
     def __init__(self) -> None:
@@ -59,6 +61,8 @@ class Settings:
         self.developer_ids = _get_env("DEVELOPER_IDS", "") or ""
         self.group_chat_id = _get_int("GROUP_CHAT_ID", None)
         self.db_url = _get_env("DB_URL", "sqlite+aiosqlite:///./bot.db") or "sqlite+aiosqlite:///./bot.db"
+        self.db_pool_size = _get_int("DB_POOL_SIZE", 20)
+        self.db_max_overflow = _get_int("DB_MAX_OVERFLOW", 40)
         self.log_level = _get_env("LOG_LEVEL", "INFO") or "INFO"
 
     @property
@@ -2,11 +2,24 @@ from __future__ import annotations
 
 from contextlib import asynccontextmanager
 
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 
-def make_engine(db_url: str) -> AsyncEngine:
-    return create_async_engine(db_url, future=True)
+def make_engine(db_url: str, *, pool_size: int | None = None, max_overflow: int | None = None) -> AsyncEngine:
+    url = make_url(db_url)
+    # query_cache_size: room for every distinct repository statement (default 500) so
+    # compiled SQL is not evicted between handlers
+    kwargs: dict = {"future": True, "pool_pre_ping": True, "pool_recycle": 3600, "query_cache_size": 1200}
+    # in-memory SQLite runs on a single static connection: no queue to size
+    if url.database not in (None, "", ":memory:"):
+        if pool_size is not None:
+            kwargs["pool_size"] = pool_size
+        if max_overflow is not None:
+            kwargs["max_overflow"] = max_overflow
+    if url.get_driver_name() == "asyncpg":
+        kwargs["connect_args"] = {"server_settings": {"jit": "off"}, "timeout": 10, "command_timeout": 60}
+    return create_async_engine(url, **kwargs)
 
 
 def make_sessionmaker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
@@ -32,7 +32,7 @@ async def run_doctor() -> int:
     if not settings.group_chat_id:
         problems.append("GROUP_CHAT_ID не задан — подтвержденные анкеты не будут уходить в группу")
 
-    engine = make_engine(settings.db_url)
+    engine = make_engine(settings.db_url, pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
         await conn.execute(text("SELECT 1"))
@@ -86,8 +86,7 @@ from bot.repositories import (
     list_forward_groups,
     list_team_leads,
     list_all_access_requests,
-    list_all_forms,
-    list_all_forms_in_range,
+    list_form_rows_in_range,
     list_forms_by_user_id,
     list_users,
     set_user_forward_group,
@@ -210,9 +209,9 @@ async def _load_forms_with_filter(session: AsyncSession, state: FSMContext) -> l
     if period == "custom":
         created_from = data.get("forms_created_from")
         created_to = data.get("forms_created_to")
-        return await list_all_forms_in_range(session, created_from=created_from, created_to=created_to)
+        return await list_form_rows_in_range(session, created_from=created_from, created_to=created_to)
     created_from, created_to = _period_to_range(period)
-    return await list_all_forms_in_range(session, created_from=created_from, created_to=created_to)
+    return await list_form_rows_in_range(session, created_from=created_from, created_to=created_to)
 
 
 async def _render_team_leads_menu(cq_or_msg: CallbackQuery | Message, session: AsyncSession) -> None:
@@ -1077,7 +1076,6 @@ def _format_request_details(req) -> str:
 
 
 async def _send_next_access_request(message_or_bot: Message | object, chat_id: int, session: AsyncSession) -> None:
-    pending_cnt = await count_pending_access_requests(session)
     req = await get_next_pending_access_request(session)
     if not req:
         try:
@@ -1090,6 +1088,7 @@ async def _send_next_access_request(message_or_bot: Message | object, chat_id: i
     uname = f"@{u.username}" if u and u.username else "—"
     name = f"{(u.first_name or '') if u else ''} {(u.last_name or '') if u else ''}".strip() or "—"
     tg_id = u.tg_id if u else "—"
+    pending_cnt = await count_pending_access_requests(session)
     try:
         await message_or_bot.send_message(
             chat_id,
@@ -1903,7 +1902,8 @@ async def dev_forms_select(message: Message, session: AsyncSession, state: FSMCo
     forms = data.get("forms", [])
     
     # Ищем анкету в списке
-    form = next((f for f in forms if f.id == form_id), None)
+    # list rows carry only the columns the list renders; the details need the full form
+    form = await get_form(session, form_id) if any(f.id == form_id for f in forms) else None
     if not form:
         await message.answer("Анкета с таким ID не найдена. Попробуйте еще раз:")
         return
@@ -2252,7 +2252,8 @@ async def dev_select_form_cb(cq: CallbackQuery, session: AsyncSession, state: FS
     forms = data.get("forms", [])
     
     # Ищем анкету в списке
-    form = next((f for f in forms if f.id == form_id), None)
+    # list rows carry only the columns the list renders; the details need the full form
+    form = await get_form(session, form_id) if any(f.id == form_id for f in forms) else None
     if not form:
         await cq.answer("Анкета не найдена", show_alert=True)
         return
@@ -18,7 +18,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError
 
-from bot.callbacks import FormEditCb
+from bot.callbacks import FormEditCb, WictoryInvalidCb
 from bot.config import Settings
 from bot.keyboards import (
     DEFAULT_BANKS,
@@ -73,21 +73,24 @@ from bot.repositories import (
     create_form,
     delete_form,
     ensure_default_banks,
+    list_bank_items_cached,
     list_banks,
     list_team_lead_ids_by_source,
     end_shift,
     get_active_shift,
     get_bank,
+    get_banks_by_ids,
     get_bank_by_name,
     get_forward_group_by_id,
     get_form,
     get_user_by_id,
     get_user_by_tg_id,
-    list_users,
+    list_user_tg_ids_by_role,
     find_forms_by_phone,
     list_dm_approved_without_payment,
     list_dm_active_pool_items,
-    list_free_pool_items_for_bank,
+    count_free_pool_items_by_type,
+    get_first_free_pool_item,
     count_free_pool_items_by_bank,
     assign_pool_item_to_dm,
     count_dm_active_pool_items,
@@ -754,10 +757,10 @@ async def _notify_wictory_resource_attached(
     dm_user_id: int,
 ) -> None:
     try:
-        wictory_users = [u for u in (await list_users(session)) if u.role == UserRole.WICTORY]
+        wictory_tg_ids = await list_user_tg_ids_by_role(session, UserRole.WICTORY)
     except Exception:
-        wictory_users = []
-    if not wictory_users:
+        wictory_tg_ids = []
+    if not wictory_tg_ids:
         return
 
     caption = (
@@ -769,11 +772,7 @@ async def _notify_wictory_resource_attached(
         f"ID дм: <code>{int(dm_user_id)}</code>"
     )
     sent_tg_ids: set[int] = set()
-    for wu in wictory_users:
-        try:
-            tg_id = int(getattr(wu, "tg_id", 0) or 0)
-        except Exception:
-            tg_id = 0
+    for tg_id in wictory_tg_ids:
         if tg_id <= 0 or tg_id in sent_tg_ids:
             continue
         try:
@@ -1483,18 +1482,18 @@ async def dm_actual_cb(cq: CallbackQuery, session: AsyncSession) -> None:
         return
 
     source = (getattr(user, "manager_source", None) or "TG").upper()
-    banks = await list_banks(session)
+    banks = await list_bank_items_cached(session)
     counts = await count_free_pool_items_by_bank(session, source=source)
     cnt_by_id = {bid: c for bid, c in counts}
 
     lines: list[str] = []
     total_free = 0
-    for b in banks:
-        c = int(cnt_by_id.get(int(b.id), 0))
+    for bank_id, bank_name in banks:
+        c = int(cnt_by_id.get(bank_id, 0))
         if c <= 0:
             continue
         total_free += c
-        lines.append(f"{getattr(b, 'name', '—')} - {c}")
+        lines.append(f"{bank_name or '—'} - {c}")
     if not lines:
         text = "<b>Актуал по ресурсам (FREE)</b>\n\nСвободных ресурсов нет."
     else:
@@ -5867,10 +5866,10 @@ async def dm_resource_banks(cq: CallbackQuery, session: AsyncSession) -> None:
         return
     banks = await _list_banks_for_dm_source(session, getattr(user, "manager_source", None))
     source = (getattr(user, "manager_source", None) or "TG")
+    free_by_bank = dict(await count_free_pool_items_by_bank(session, source=source))
     items: list[tuple[int, str]] = []
     for b in banks:
-        free_items = await list_free_pool_items_for_bank(session, bank_id=int(b.id), source=source)
-        total_free = len(free_items)
+        total_free = free_by_bank.get(int(b.id), 0)
         if total_free <= 0:
             continue
         items.append((int(b.id), f"{getattr(b, 'name', '—')} ({total_free})"))
@@ -5892,18 +5891,17 @@ async def dm_resource_bank_open(cq: CallbackQuery, session: AsyncSession) -> Non
     if not bank:
         await cq.answer("Банк не найден", show_alert=True)
         return
-    free_items = await list_free_pool_items_for_bank(session, bank_id=bank_id, source=(getattr(user, "manager_source", None) or "TG"))
+    counts = await count_free_pool_items_by_type(session, bank_id=bank_id, source=(getattr(user, "manager_source", None) or "TG"))
+    total = sum(counts.values())
     await cq.answer()
     if cq.message:
-        if not free_items:
+        if not total:
             await _safe_edit_message(
                 message=cq.message,
                 text="Для этого банка нету ссылок или есим",
                 reply_markup=kb_dm_resource_empty_bank(bank_id),
             )
             return
-        counts = _free_pool_counts_by_type(free_items)
-        total = sum(counts.values())
         lines = [f"<b>{bank.name}</b>", f"Доступно всего: <b>{total}</b>"]
         for t in ("link", "esim", "link_esim"):
             cnt = int(counts.get(t, 0))
@@ -5923,8 +5921,7 @@ async def dm_resource_take(cq: CallbackQuery, session: AsyncSession) -> None:
         await cq.answer("Лимит 5 активных ресурсов на этот банк уже достигнут", show_alert=True)
         await dm_resource_active(cq, session)
         return
-    free_items = await list_free_pool_items_for_bank(session, bank_id=bank_id, source=(getattr(user, "manager_source", None) or "TG"))
-    counts = _free_pool_counts_by_type(free_items)
+    counts = await count_free_pool_items_by_type(session, bank_id=bank_id, source=(getattr(user, "manager_source", None) or "TG"))
     available_types = [t for t in ("esim", "link", "link_esim") if int(counts.get(t, 0)) > 0]
     await cq.answer()
     if cq.message:
@@ -5957,8 +5954,9 @@ async def dm_resource_take_type(cq: CallbackQuery, session: AsyncSession) -> Non
         await cq.answer("Лимит 5 активных ресурсов на этот банк уже достигнут", show_alert=True)
         await dm_resource_active(cq, session)
         return
-    free_items = await list_free_pool_items_for_bank(session, bank_id=bank_id, source=(getattr(user, "manager_source", None) or "TG"))
-    picked = next((x for x in free_items if getattr(getattr(x, 'type', None), 'value', '') == rtype), None)
+    picked = await get_first_free_pool_item(
+        session, bank_id=bank_id, source=(getattr(user, "manager_source", None) or "TG"), resource_type=rtype
+    )
     if not picked:
         await cq.answer("Нет доступных записей этого типа", show_alert=True)
         return
@@ -6013,9 +6011,10 @@ async def dm_resource_active(cq: CallbackQuery, session: AsyncSession) -> None:
         return
     items = await list_dm_active_pool_items(session, dm_user_id=int(user.id))
     source = (getattr(user, "manager_source", None) or "TG").upper()
+    banks = await get_banks_by_ids(session, (_pool_item_effective_bank_id_for_source(it, source) or 0 for it in items))
     packed: list[tuple[int, str]] = []
     for it in items:
-        bank = await _pool_item_effective_bank_for_source(session, it, source)
+        bank = banks.get(_pool_item_effective_bank_id_for_source(it, source) or 0)
         packed.append((int(it.id), f"{_resource_ident(int(it.id))} | {bank.name if bank else '—'} | {_pool_type_ru(getattr(it.type, 'value', ''))}"))
     await cq.answer()
     if cq.message:
@@ -6169,31 +6168,29 @@ async def dm_resource_invalid_comment(message: Message, session: AsyncSession, s
     except Exception:
         wictory_owner = None
 
-    targets: list[User] = []
-    if wictory_owner and wictory_owner.role == UserRole.WICTORY:
-        targets.append(wictory_owner)
+    targets: list[int] = []
+    if wictory_owner and wictory_owner.role == UserRole.WICTORY and wictory_owner.tg_id:
+        targets.append(int(wictory_owner.tg_id))
 
     # fallback: notify all WICTORY users so the event never gets lost
     if not targets:
         try:
-            all_users = await list_users(session)
-            targets = [u for u in all_users if u.role == UserRole.WICTORY and getattr(u, "tg_id", None)]
+            targets = await list_user_tg_ids_by_role(session, UserRole.WICTORY)
         except Exception:
             targets = []
 
-    for wu in targets:
+    for tg_id in targets:
         try:
-            tg_id = int(getattr(wu, "tg_id", 0) or 0)
             if tg_id <= 0 or tg_id in sent_tg_ids:
                 continue
             kb = InlineKeyboardBuilder()
-            kb.button(text="Перейти", callback_data=f"wictory:invalid:open:{int(item_id)}")
+            kb.button(text="Перейти", callback_data=WictoryInvalidCb(scope="invalid", action="open", item_id=int(item_id)).pack())
             kb.adjust(1)
             await message.bot.send_message(tg_id, notice_text, parse_mode="HTML", reply_markup=kb.as_markup())
             sent_tg_ids.add(tg_id)
             notified_wictory = True
         except Exception:
-            log.exception("Failed to notify WICTORY about invalid pool item: item_id=%s owner_tg_id=%s", item_id, getattr(wu, "tg_id", None))
+            log.exception("Failed to notify WICTORY about invalid pool item: item_id=%s owner_tg_id=%s", item_id, tg_id)
 
     if notified_wictory:
         await message.answer(f"Комментарий сохранён. Ресурс <code>{_resource_ident(int(item_id))}</code> отправлен обратно как невалидный, WICTORY уведомлён.", reply_markup=kb_dm_resource_menu())
@@ -6403,9 +6400,10 @@ async def dm_resource_used(cq: CallbackQuery, session: AsyncSession) -> None:
         return
     items = await list_dm_used_pool_items(session, dm_user_id=int(user.id), limit=100)
     source = (getattr(user, "manager_source", None) or "TG").upper()
+    banks = await get_banks_by_ids(session, (_pool_item_effective_bank_id_for_source(it, source) or 0 for it in items))
     packed: list[tuple[int, str]] = []
     for it in items:
-        bank = await _pool_item_effective_bank_for_source(session, it, source)
+        bank = banks.get(_pool_item_effective_bank_id_for_source(it, source) or 0)
         form_suffix = f" → анкета #{int(it.used_with_form_id)}" if getattr(it, "used_with_form_id", None) else ""
         packed.append((int(it.id), f"{_resource_ident(int(it.id))} | {bank.name if bank else '—'} | {_pool_type_ru(getattr(it.type, 'value', ''))}{form_suffix}"))
     await cq.answer()
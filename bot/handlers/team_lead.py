@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import re
+from functools import lru_cache
+from itertools import islice
+from typing import Awaitable, Iterable
 
 from aiogram import F, Router
-from aiogram.exceptions import TelegramMigrateToChat, TelegramNetworkError
+from aiogram.exceptions import TelegramBadRequest, TelegramMigrateToChat, TelegramNetworkError
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, InputMediaDocument, InputMediaPhoto, InputMediaVideo, Message, ReplyKeyboardRemove
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -28,25 +32,27 @@ from bot.keyboards import (
     kb_tl_reject_back_inline,
     kb_tl_duplicate_notice,
 )
+from bot.auth_cache import TeamLeadAuth
 from bot.models import FormStatus, Shift, TeamLeadSource, User, UserRole
 from bot.repositories import (
     create_bank,
-    get_forward_group_by_id,
     get_active_shift,
     delete_bank_condition,
     get_bank,
     get_bank_by_name,
     get_form,
-    get_team_lead_by_tg_id,
     get_user_by_id,
+    get_user_with_forward_group,
     get_user_by_tg_id,
-    is_team_lead,
+    require_team_lead,
     count_pending_forms,
     list_banks,
     list_pending_forms,
     list_duplicate_reports_in_range,
     set_form_status,
     approve_form_if_pending,
+    bank_instructions,
+    pick_banks_for_source,
     update_bank,
 )
 from bot.utils import (
@@ -59,9 +65,10 @@ from bot.utils import (
 )
 from bot.states import TeamLeadStates
 from bot.utils import format_user_payload
-from bot.middlewares import GroupMessageFilter
+from bot.middlewares import CallbackDebounceMiddleware, GroupMessageFilter
 
 router = Router(name="team_lead")
+router.callback_query.middleware(CallbackDebounceMiddleware())
 # Apply group message filter to all handlers in this router
 router.message.filter(GroupMessageFilter())
 log = logging.getLogger(__name__)
@@ -75,21 +82,45 @@ async def _notify_active_dms_banks_updated(bot: any, session: AsyncSession) -> N
             .where(and_(User.role == UserRole.DROP_MANAGER, Shift.ended_at.is_(None)))
         )
         tg_ids = sorted({int(r[0]) for r in res.all() if r and r[0]})
-        for tg_id in tg_ids:
-            try:
-                await bot.send_message(tg_id, "🔄 Обновлено")
-            except Exception:
-                continue
     except Exception:
         return
+    # stay below Telegram's ~30 msg/s bot-wide limit
+    sem = asyncio.Semaphore(25)
+
+    async def _send(tg_id: int) -> None:
+        async with sem:
+            await bot.send_message(tg_id, "🔄 Обновлено")
+
+    await asyncio.gather(*(_send(tg_id) for tg_id in tg_ids), return_exceptions=True)
+
+
+_banks_updated = asyncio.Event()
 
 
-async def _render_tl_users(cq_or_msg: Message | CallbackQuery, session: AsyncSession) -> None:
+def _schedule_banks_updated() -> None:
+    """Marks banks as changed; run_banks_updated_coalescer sends one broadcast per burst of edits."""
+    _banks_updated.set()
+
+
+async def run_banks_updated_coalescer(*, bot: any, session_maker, delay: float = 0.5) -> None:
+    while True:
+        await _banks_updated.wait()
+        # debounce window: further edits within it are folded into this broadcast
+        await asyncio.sleep(delay)
+        _banks_updated.clear()
+        try:
+            async with session_maker() as session:
+                await _notify_active_dms_banks_updated(bot, session)
+        except Exception:
+            log.exception("Failed to broadcast banks update")
+
+
+async def _render_tl_users(cq_or_msg: Message | CallbackQuery, session: AsyncSession, tl: TeamLeadAuth | None = None) -> None:
     u = cq_or_msg.from_user
     if not u:
         return
-    src = await _get_team_lead_source(session, int(u.id))
-    src_s = str(src).split(".")[-1]
+    src = _team_lead_source(tl) if tl else await _get_team_lead_source(session, int(u.id))
+    src_s = _src_name(src)
 
     res = await session.execute(
         select(User)
@@ -164,18 +195,24 @@ def _period_to_range(period: str | None) -> tuple[datetime | None, datetime | No
 async def _form_visible_for_tl(session: AsyncSession, form: Form, tl_source: TeamLeadSource) -> bool:
     mgr = await get_user_by_id(session, int(form.manager_id))
     src = (getattr(mgr, "manager_source", None) or "TG").upper() if mgr else "TG"
-    tl_src = (str(tl_source).split(".")[-1] if tl_source else "TG").upper()
+    tl_src = _src_name(tl_source)
     return src == tl_src
 
 
-async def _render_tl_live_list(message_or_cq: Message | CallbackQuery, session: AsyncSession) -> None:
-    forms_all = await list_pending_forms(session, limit=30)
-    tl = None
-    if isinstance(message_or_cq, CallbackQuery) and message_or_cq.from_user:
-        tl = await get_team_lead_by_tg_id(session, int(message_or_cq.from_user.id))
-    elif isinstance(message_or_cq, Message) and message_or_cq.from_user:
-        tl = await get_team_lead_by_tg_id(session, int(message_or_cq.from_user.id))
-    tl_source = getattr(tl, "source", TeamLeadSource.TG)
+def _tl_live_items(forms: list) -> tuple[tuple[int, str | None], ...]:
+    return tuple((int(f.id), getattr(f, "bank_name", None)) for f in forms[:30])
+
+
+async def _render_tl_live_list(
+    message_or_cq: Message | CallbackQuery,
+    session: AsyncSession,
+    tl: TeamLeadAuth | None = None,
+) -> None:
+    # managers are preloaded: the per-form visibility check below resolves them without a query
+    forms_all = await list_pending_forms(session, limit=30, with_managers=True)
+    if tl is None and message_or_cq.from_user:
+        tl = await require_team_lead(session, int(message_or_cq.from_user.id))
+    tl_source = _team_lead_source(tl)
     forms: list[Form] = []
     for f in forms_all:
         if await _form_visible_for_tl(session, f, tl_source):
@@ -186,7 +223,7 @@ async def _render_tl_live_list(message_or_cq: Message | CallbackQuery, session:
         text += "Пока нет анкет в обработке."
     else:
         text += f"В очереди: <b>{len(forms)}</b>\n\nВыберите анкету:"
-    kb = kb_tl_live_list(forms)
+    kb = kb_tl_live_list(_tl_live_items(forms))
     if isinstance(message_or_cq, CallbackQuery):
         await message_or_cq.answer()
         if message_or_cq.message:
@@ -201,7 +238,27 @@ async def _render_tl_live_list(message_or_cq: Message | CallbackQuery, session:
     await message_or_cq.answer(text, reply_markup=kb, parse_mode="HTML")
 
 
-async def _render_tl_duplicates_list(message_or_cq: Message | CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
+_DUP_LINE_TPL = "• <code>{dt}</code> | <b>{bank}</b> | <code>{phone}</code> | {u}".format_map
+
+
+@lru_cache(maxsize=256)
+def _fmt_dup_minute(ts: datetime) -> str:
+    return ts.strftime("%d.%m.%Y %H:%M")
+
+
+def _fmt_dup_ts(ts: datetime | None) -> str:
+    # Reports of one burst share the minute, so the cache key drops seconds.
+    if not ts:
+        return "—"
+    return _fmt_dup_minute(ts.replace(second=0, microsecond=0))
+
+
+async def _render_tl_duplicates_list(
+    message_or_cq: Message | CallbackQuery,
+    session: AsyncSession,
+    state: FSMContext,
+    tl: TeamLeadAuth | None = None,
+) -> None:
     data = await state.get_data()
     period = (data.get("dup_period") or "today")
     created_from = data.get("dup_created_from")
@@ -209,15 +266,9 @@ async def _render_tl_duplicates_list(message_or_cq: Message | CallbackQuery, ses
     if period != "custom":
         created_from, created_to = _period_to_range(period)
 
-    src = None
-    if isinstance(message_or_cq, CallbackQuery) and message_or_cq.from_user:
-        tl = await get_team_lead_by_tg_id(session, int(message_or_cq.from_user.id))
-        if tl:
-            src = str(tl.source).split(".")[-1]
-    elif isinstance(message_or_cq, Message) and message_or_cq.from_user:
-        tl = await get_team_lead_by_tg_id(session, int(message_or_cq.from_user.id))
-        if tl:
-            src = str(tl.source).split(".")[-1]
+    if tl is None and message_or_cq.from_user:
+        tl = await require_team_lead(session, int(message_or_cq.from_user.id))
+    src = _src_name(tl.source) if tl else None
 
     reports = await list_duplicate_reports_in_range(
         session,
@@ -232,12 +283,17 @@ async def _render_tl_duplicates_list(message_or_cq: Message | CallbackQuery, ses
         lines.append("Пока нет записей.")
     else:
         lines.append(f"Всего: <b>{len(reports)}</b>\n")
-        for r in reports[:40]:
-            dt = r.created_at.strftime("%d.%m.%Y %H:%M") if r.created_at else "—"
-            uname = f"@{r.manager_username}" if r.manager_username else "—"
-            lines.append(
-                f"• <code>{dt}</code> | <b>{r.bank_name}</b> | <code>{r.phone}</code> | {uname}"
+        lines.extend(
+            _DUP_LINE_TPL(
+                {
+                    "dt": _fmt_dup_ts(r.created_at),
+                    "bank": r.bank_name,
+                    "phone": r.phone,
+                    "u": "@" + r.manager_username if r.manager_username else "—",
+                }
             )
+            for r in islice(reports, 40)
+        )
         if len(reports) > 40:
             lines.append(f"\n...и ещё <b>{len(reports) - 40}</b>")
     text = "\n".join(lines)
@@ -264,7 +320,7 @@ async def _render_tl_live_list_to_message(*, bot: object, chat_id: int, message_
         text += "Пока нет анкет в обработке."
     else:
         text += f"В очереди: <b>{len(forms)}</b>\n\nВыберите анкету:"
-    kb = kb_tl_live_list(forms)
+    kb = kb_tl_live_list(_tl_live_items(forms))
     try:
         await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text, reply_markup=kb, parse_mode="HTML")
     except Exception:
@@ -274,6 +330,15 @@ async def _render_tl_live_list_to_message(*, bot: object, chat_id: int, message_
             return
 
 
+async def _send_or_none(coro) -> Message | None:
+    """Awaits one send of the form view; a failure is logged and yields None instead of raising."""
+    try:
+        return await coro
+    except Exception:
+        log.exception("Failed to send team lead form view message")
+        return None
+
+
 async def _send_tl_form_view(*, bot: object, chat_id: int, session: AsyncSession, form) -> tuple[list[int], int | None]:
     mgr = await get_user_by_id(session, form.manager_id)
     manager_tag = mgr.manager_tag if mgr else "—"
@@ -286,16 +351,30 @@ async def _send_tl_form_view(*, bot: object, chat_id: int, session: AsyncSession
 
     dm_username = f"@{mgr.username}" if mgr and getattr(mgr, "username", None) else "—"
     text = f"От кого заявка: {dm_username}\n\n{form_text}"
+
+    # DB work first: the sends below run concurrently and must not touch the session.
+    conditions = None
+    bank_name = (getattr(form, "bank_name", None) or "").strip()
+    if bank_name:
+        bank = await get_bank_by_name(session, bank_name)
+        tl_source = await _get_team_lead_source(session, int(chat_id))
+        conditions = _format_bank_conditions_for_tl(bank, tl_source)
+    bank_display = format_bank_hashtag(bank_name)
+    if not conditions:
+        conditions = f"📌 <b>Условия ({bank_display})</b>:\n<blockquote expandable>Условий нет</blockquote>"
+    else:
+        conditions = f"📌 <b>Условия ({bank_display})</b>:\n<blockquote expandable>{conditions}</blockquote>"
+    controls_text = f"{conditions}\n\nВыберите действие:"
+
     photos = list(getattr(form, "screenshots", None) or [])
     form_msg_ids: list[int] = []
-    if not photos:
-        try:
+    reply_docs: list[str] = []
+    reply_to_message_id: int | None = None
+    try:
+        if not photos:
             m = await bot.send_message(chat_id, text, parse_mode="HTML")
             form_msg_ids.append(int(m.message_id))
-        except Exception:
-            return [], None
-    elif len(photos) == 1:
-        try:
+        elif len(photos) == 1:
             kind, fid = unpack_media_item(str(photos[0]))
             if kind == "doc":
                 m = await bot.send_document(chat_id, fid, caption=text, parse_mode="HTML")
@@ -304,21 +383,16 @@ async def _send_tl_form_view(*, bot: object, chat_id: int, session: AsyncSession
             else:
                 m = await bot.send_photo(chat_id, fid, caption=text, parse_mode="HTML")
             form_msg_ids.append(int(m.message_id))
-        except Exception:
-            return [], None
-    else:
-        photos = photos[:10]
-        try:
+        else:
             docs: list[str] = []
             media_items: list[str] = []
-            for raw in photos:
+            for raw in photos[:10]:
                 kind, _ = unpack_media_item(str(raw))
                 if kind == "doc":
                     docs.append(str(raw))
                 else:
                     media_items.append(str(raw))
 
-            reply_to_message_id: int | None = None
             if media_items:
                 media: list[InputMediaPhoto | InputMediaVideo] = []
                 first_kind, first_fid = unpack_media_item(str(media_items[0]))
@@ -344,87 +418,92 @@ async def _send_tl_form_view(*, bot: object, chat_id: int, session: AsyncSession
                     m = await bot.send_document(chat_id, first_fid, caption=text, parse_mode="HTML")
                     form_msg_ids.append(int(m.message_id))
                     reply_to_message_id = int(m.message_id)
-                    for raw in docs[1:]:
-                        _, fid = unpack_media_item(str(raw))
-                        dm = await bot.send_document(chat_id, fid, reply_to_message_id=reply_to_message_id)
-                        form_msg_ids.append(int(dm.message_id))
+                    reply_docs = docs[1:]
                 else:
                     # Attach docs to first album message.
-                    for raw in docs:
-                        _, fid = unpack_media_item(str(raw))
-                        dm = await bot.send_document(chat_id, fid, reply_to_message_id=reply_to_message_id)
-                        form_msg_ids.append(int(dm.message_id))
-        except Exception:
-            return [], None
-
-    conditions = None
-    bank_name = (getattr(form, "bank_name", None) or "").strip()
-    if bank_name:
-        bank = await get_bank_by_name(session, bank_name)
-        tl_source = await _get_team_lead_source(session, int(chat_id))
-        conditions = _format_bank_conditions_for_tl(bank, tl_source)
-    bank_display = format_bank_hashtag(bank_name)
-    if not conditions:
-        conditions = f"📌 <b>Условия ({bank_display})</b>:\n<blockquote expandable>Условий нет</blockquote>"
-    else:
-        conditions = f"📌 <b>Условия ({bank_display})</b>:\n<blockquote expandable>{conditions}</blockquote>"
-    controls_text = f"{conditions}\n\nВыберите действие:"
-    try:
-        controls = await bot.send_message(chat_id, controls_text, reply_markup=kb_form_review_with_back(int(form.id)), parse_mode="HTML")
+                    reply_docs = docs
     except Exception:
-        return form_msg_ids, None
+        return [], None
+
+    # Remaining docs reply to the head message, so Telegram keeps them attached regardless
+    # of arrival order; the controls message goes out in the same burst.
+    async with asyncio.TaskGroup() as tg:
+        doc_tasks = [
+            tg.create_task(
+                _send_or_none(bot.send_document(chat_id, unpack_media_item(raw)[1], reply_to_message_id=reply_to_message_id))
+            )
+            for raw in reply_docs
+        ]
+        controls_task = tg.create_task(
+            _send_or_none(
+                bot.send_message(chat_id, controls_text, reply_markup=kb_form_review_with_back(int(form.id)), parse_mode="HTML")
+            )
+        )
+    form_msg_ids.extend(int(t.result().message_id) for t in doc_tasks if t.result() is not None)
 
+    controls = controls_task.result()
+    if controls is None:
+        return form_msg_ids, None
     return form_msg_ids, int(controls.message_id)
 
 
 async def _cleanup_open_form_messages(*, bot: object, chat_id: int, state: FSMContext) -> None:
     data = await state.get_data()
-    ids = list(data.get("tl_form_msg_ids") or [])
+    ids = data.get("tl_form_msg_ids") or ()
     if ids:
-        await _safe_delete_messages(bot=bot, chat_id=chat_id, message_ids=[int(x) for x in ids])
-    await state.update_data(tl_form_msg_ids=[])
+        await _safe_delete_messages(bot=bot, chat_id=chat_id, message_ids=ids)
+    await state.update_data(tl_form_msg_ids=())
 
 
-async def _safe_delete_messages(*, bot: object, chat_id: int, message_ids: list[int]) -> None:
-    for mid in message_ids:
+async def _safe_delete_messages(*, bot: object, chat_id: int, message_ids: Iterable[int]) -> None:
+    ids = list(dict.fromkeys(message_ids))
+    for i in range(0, len(ids), 100):
+        chunk = ids[i : i + 100]
         try:
-            await bot.delete_message(chat_id=chat_id, message_id=int(mid))
+            # deleteMessages skips ids it can't find, one round-trip per 100 ids
+            await bot.delete_messages(chat_id=chat_id, message_ids=chunk)
         except Exception:
-            pass
+            for mid in chunk:
+                try:
+                    await bot.delete_message(chat_id=chat_id, message_id=mid)
+                except Exception:
+                    pass
 
 
-async def _get_team_lead_source(session: AsyncSession, tg_id: int) -> TeamLeadSource:
-    tl = await get_team_lead_by_tg_id(session, tg_id)
-    return getattr(tl, "source", None) or TeamLeadSource.TG
+async def _gather_logged(jobs: dict[str, Awaitable]) -> dict[str, object]:
+    """Runs independent Telegram calls concurrently; failures are logged per label, not raised."""
+    results = dict(zip(jobs, await asyncio.gather(*jobs.values(), return_exceptions=True)))
+    for label, res in results.items():
+        if isinstance(res, Exception):
+            log.error("Failed to %s", label, exc_info=res)
+    return results
 
 
-async def _list_banks_for_tl_source(session: AsyncSession, source: TeamLeadSource) -> list:
-    banks = await list_banks(session)
-    src = (str(source).split(".")[-1] if source else "TG").upper()
+_ALLOWED_ACTIONS: dict[TeamLeadSource, frozenset[str]] = {
+    TeamLeadSource.TG: frozenset({"rename", "instructions_tg", "required_tg", "delete", "back"}),
+    TeamLeadSource.FB: frozenset({"rename", "instructions_fb", "required_fb", "delete", "back"}),
+}
 
-    def _has_fb(bank) -> bool:
-        return bool((getattr(bank, "instructions_fb", None) or "").strip()) or getattr(bank, "required_screens_fb", None) is not None
 
-    def _has_tg(bank) -> bool:
-        return bool((getattr(bank, "instructions_tg", None) or "").strip()) or getattr(bank, "required_screens_tg", None) is not None
+def _src_name(src: TeamLeadSource | None) -> str:
+    return src.name if src else "TG"
 
-    def _has_legacy(bank) -> bool:
-        return bool((getattr(bank, "instructions", None) or "").strip()) or getattr(bank, "required_screens", None) is not None
 
-    if src == "FB":
-        picked = [b for b in banks if _has_fb(b) or (_has_legacy(b) and not _has_tg(b))]
-        if picked:
-            return picked
-        return [b for b in banks if _has_fb(b) or not _has_tg(b)]
+def _team_lead_source(tl: TeamLeadAuth | None) -> TeamLeadSource:
+    return getattr(tl, "source", None) or TeamLeadSource.TG
 
-    picked = [b for b in banks if _has_tg(b) or (_has_legacy(b) and not _has_fb(b))]
-    if picked:
-        return picked
-    return [b for b in banks if _has_tg(b) or not _has_fb(b)]
+
+async def _get_team_lead_source(session: AsyncSession, tg_id: int) -> TeamLeadSource:
+    # Served from the TTL-cached TeamLeadAuth snapshot; add/delete_team_lead invalidate it.
+    return _team_lead_source(await require_team_lead(session, tg_id))
+
+
+async def _list_banks_for_tl_source(session: AsyncSession, source: TeamLeadSource) -> list:
+    return pick_banks_for_source(await list_banks(session), _src_name(source))
 
 
-def _tl_bank_items_with_source(banks: list, source: TeamLeadSource) -> list[tuple[int, str]]:
-    src = (str(source).split(".")[-1] if source else "TG").upper()
+def _tl_bank_items_with_source(banks: list, source: TeamLeadSource) -> tuple[tuple[int, str], ...]:
+    src = _src_name(source)
     suffix = "FB" if src == "FB" else "TG"
     items: list[tuple[int, str]] = []
     for b in banks:
@@ -432,29 +511,21 @@ def _tl_bank_items_with_source(banks: list, source: TeamLeadSource) -> list[tupl
         if not name:
             continue
         items.append((int(b.id), f"{name} ({suffix})"))
-    return items
+    # hashable: kb_banks_list is memoized on it
+    return tuple(items)
 
 
 def _format_bank_conditions_for_tl(bank, source: TeamLeadSource) -> str | None:
     if not bank:
         return None
-    src = (str(source).split(".")[-1] if source else "TG").upper()
-    instructions = None
-    required_screens = None
+    src = _src_name(source)
+    i = bank_instructions(bank)
     if src == "FB":
-        instructions = (getattr(bank, "instructions_fb", None) or getattr(bank, "instructions", None) or "").strip()
-        required_screens = (
-            getattr(bank, "required_screens_fb", None)
-            if getattr(bank, "required_screens_fb", None) is not None
-            else getattr(bank, "required_screens", None)
-        )
+        instructions = i.ins_fb or i.ins
+        required_screens = i.rs_fb if i.rs_fb is not None else i.rs
     else:
-        instructions = (getattr(bank, "instructions_tg", None) or getattr(bank, "instructions", None) or "").strip()
-        required_screens = (
-            getattr(bank, "required_screens_tg", None)
-            if getattr(bank, "required_screens_tg", None) is not None
-            else getattr(bank, "required_screens", None)
-        )
+        instructions = i.ins_tg or i.ins
+        required_screens = i.rs_tg if i.rs_tg is not None else i.rs
     if not instructions and required_screens is None:
         return None
     req = "—" if required_screens is None else str(required_screens)
@@ -554,16 +625,8 @@ def _compose_bank_name(core: str, suffix: str, limit_part: str) -> str:
 
 
 def _has_conditions(bank) -> bool:
-    return any(
-        [
-            bool((getattr(bank, "instructions", None) or "").strip()),
-            bool((getattr(bank, "instructions_tg", None) or "").strip()),
-            bool((getattr(bank, "instructions_fb", None) or "").strip()),
-            getattr(bank, "required_screens", None) is not None,
-            getattr(bank, "required_screens_tg", None) is not None,
-            getattr(bank, "required_screens_fb", None) is not None,
-        ]
-    )
+    i = bank_instructions(bank)
+    return bool(i.ins or i.ins_tg or i.ins_fb) or i.rs is not None or i.rs_tg is not None or i.rs_fb is not None
 
 
 async def _send_photos_with_caption(bot: object, chat_id: int, photos: list[str], caption: str) -> None:
@@ -641,6 +704,15 @@ async def _edit_text_or_caption(message: Message, text: str) -> None:
         pass
 
 
+async def _edit_text_if_changed(message: Message, text: str, reply_markup=None) -> None:
+    """edit_text that treats Telegram's "message is not modified" as success."""
+    try:
+        await message.edit_text(text, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+
+
 def _format_form_for_group(form, manager_tag: str) -> str:
     traffic = "—"
     if form.traffic_type == "DIRECT":
@@ -683,7 +755,8 @@ async def team_lead_menu(message: Message, session: AsyncSession) -> None:
 async def tl_home(cq: CallbackQuery, session: AsyncSession) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     await cq.answer()
@@ -696,11 +769,12 @@ async def tl_home(cq: CallbackQuery, session: AsyncSession) -> None:
 async def tl_live(cq: CallbackQuery, session: AsyncSession, settings: Settings) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
 
-    await _render_tl_live_list(cq, session)
+    await _render_tl_live_list(cq, session, tl)
     return
 
 
@@ -708,27 +782,30 @@ async def tl_live(cq: CallbackQuery, session: AsyncSession, settings: Settings)
 async def tl_users(cq: CallbackQuery, session: AsyncSession) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
-    await _render_tl_users(cq, session)
+    await _render_tl_users(cq, session, tl)
 
 
 @router.callback_query(TeamLeadMenuCb.filter(F.action == "duplicates"))
 async def tl_duplicates(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
-    await _render_tl_duplicates_list(cq, session, state)
+    await _render_tl_duplicates_list(cq, session, state, tl)
 
 
 @router.callback_query(F.data == "tl:dup_notice_open")
 async def tl_duplicate_notice_open(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     try:
@@ -742,14 +819,15 @@ async def tl_duplicate_notice_open(cq: CallbackQuery, session: AsyncSession, sta
                 await cq.bot.delete_message(chat_id=int(cq.from_user.id), message_id=int(msg_id))
             except Exception:
                 pass
-    await _render_tl_duplicates_list(cq, session, state)
+    await _render_tl_duplicates_list(cq, session, state, tl)
 
 
 @router.callback_query(F.data == "tl:dup_filter")
 async def tl_dup_filter_menu_cb(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     await cq.answer()
@@ -763,20 +841,22 @@ async def tl_dup_filter_menu_cb(cq: CallbackQuery, session: AsyncSession, state:
 async def tl_dup_filter_set_cb(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     await cq.answer()
     period = (cq.data or "").split(":")[-1]
     await state.update_data(dup_period=period, dup_created_from=None, dup_created_to=None)
-    await _render_tl_duplicates_list(cq, session, state)
+    await _render_tl_duplicates_list(cq, session, state, tl)
 
 
 @router.callback_query(F.data == "tl:dup_filter_custom")
 async def tl_dup_filter_custom_cb(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     await cq.answer()
@@ -789,7 +869,8 @@ async def tl_dup_filter_custom_cb(cq: CallbackQuery, session: AsyncSession, stat
 async def tl_dup_filter_range_msg(message: Message, session: AsyncSession, state: FSMContext) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
     raw = (message.text or "").strip().replace(" ", "")
     if "-" not in raw:
@@ -808,14 +889,15 @@ async def tl_dup_filter_range_msg(message: Message, session: AsyncSession, state
     created_to = datetime(d2.year, d2.month, d2.day) + timedelta(days=1)
     await state.update_data(dup_period="custom", dup_created_from=created_from, dup_created_to=created_to)
     await state.set_state(None)
-    await _render_tl_duplicates_list(message, session, state)
+    await _render_tl_duplicates_list(message, session, state, tl)
 
 
 @router.callback_query(F.data.startswith("tl:live_open:"))
 async def tl_live_open_cb(cq: CallbackQuery, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     try:
@@ -829,7 +911,7 @@ async def tl_live_open_cb(cq: CallbackQuery, session: AsyncSession, state: FSMCo
         await cq.answer("Анкета не найдена", show_alert=True)
         return
 
-    tl_source = await _get_team_lead_source(session, cq.from_user.id)
+    tl_source = _team_lead_source(tl)
     if not await _form_visible_for_tl(session, form, tl_source):
         await cq.answer("Анкета недоступна для вашего источника", show_alert=True)
         return
@@ -850,7 +932,7 @@ async def tl_live_open_cb(cq: CallbackQuery, session: AsyncSession, state: FSMCo
 
     form_msg_ids, controls_msg_id = await _send_tl_form_view(bot=cq.bot, chat_id=chat_id, session=session, form=form)
     await state.update_data(
-        tl_form_msg_ids=form_msg_ids,
+        tl_form_msg_ids=tuple(form_msg_ids),
         tl_controls_msg_id=int(controls_msg_id) if controls_msg_id else None,
     )
 
@@ -860,32 +942,34 @@ async def tl_banks(cq: CallbackQuery, session: AsyncSession, settings: Settings)
     from bot.keyboards import kb_banks_list
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     try:
         await cq.answer()
     except Exception:
         pass
-    src = await _get_team_lead_source(session, cq.from_user.id)
+    src = _team_lead_source(tl)
     banks = await _list_banks_for_tl_source(session, src)
     items = _tl_bank_items_with_source(banks, src)
     if cq.message:
-        await cq.message.edit_text("🏦 <b>Условия для сдачи</b>", reply_markup=kb_banks_list(items))
+        await _edit_text_if_changed(cq.message, "🏦 <b>Условия для сдачи</b>", reply_markup=kb_banks_list(items))
 
 
 @router.callback_query(BankCb.filter(F.action == "open"))
 async def bank_open(cq: CallbackQuery, callback_data: BankCb, session: AsyncSession, settings: Settings) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     bank = await get_bank(session, int(callback_data.bank_id))
     if not bank:
         await cq.answer("Банк не найден", show_alert=True)
         return
-    src = await _get_team_lead_source(session, cq.from_user.id)
+    src = _team_lead_source(tl)
     cond = _format_bank_conditions_for_tl(bank, src)
     if cond is None:
         await cq.answer("Банк недоступен для вашего источника", show_alert=True)
@@ -901,7 +985,8 @@ async def bank_open(cq: CallbackQuery, callback_data: BankCb, session: AsyncSess
 async def bank_edit_menu(cq: CallbackQuery, callback_data: BankCb, session: AsyncSession, settings: Settings) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     bank = await get_bank(session, int(callback_data.bank_id))
@@ -909,11 +994,12 @@ async def bank_edit_menu(cq: CallbackQuery, callback_data: BankCb, session: Asyn
         await cq.answer("Банк не найден", show_alert=True)
         return
     await cq.answer()
-    src = await _get_team_lead_source(session, cq.from_user.id)
+    src = _team_lead_source(tl)
     if cq.message:
-        await cq.message.edit_text(
+        await _edit_text_if_changed(
+            cq.message,
             f"Редактирование <b>{bank.name}</b>:",
-            reply_markup=kb_bank_edit_for_source(bank.id, source=str(src).split(".")[-1]),
+            reply_markup=kb_bank_edit_for_source(bank.id, source=_src_name(src)),
         )
 
 
@@ -921,7 +1007,8 @@ async def bank_edit_menu(cq: CallbackQuery, callback_data: BankCb, session: Asyn
 async def bank_setup_start(cq: CallbackQuery, callback_data: BankCb, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     bank = await get_bank(session, int(callback_data.bank_id))
@@ -929,32 +1016,38 @@ async def bank_setup_start(cq: CallbackQuery, callback_data: BankCb, session: As
         await cq.answer("Банк не найден", show_alert=True)
         return
     await cq.answer()
-    await state.clear()
-    src = await _get_team_lead_source(session, cq.from_user.id)
-    await state.update_data(bank_id=bank.id)
+    src = _team_lead_source(tl)
+    # set_data replaces the whole payload, so it doubles as clear() + update_data()
     await state.set_state(TeamLeadStates.bank_instructions)
-    await state.update_data(edit_field=("instructions_fb" if src == TeamLeadSource.FB else "instructions_tg"))
+    await state.set_data(
+        {
+            "bank_id": int(bank.id),
+            "edit_field": "instructions_fb" if src == TeamLeadSource.FB else "instructions_tg",
+            "return_to": "bank_open",
+        }
+    )
     if cq.message:
         await cq.message.answer(
             "Напишите <b>пару предложений</b> с условиями и требованиями.",
             reply_markup=kb_back(),
         )
         await cq.message.answer(f"Условия для банка <b>{bank.name}</b>:")
-    await state.update_data(return_to="bank_open")
 
 
 @router.callback_query(BankCb.filter(F.action == "create"))
 async def bank_create_start(cq: CallbackQuery, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     await cq.answer()
-    await state.clear()
-    src = await _get_team_lead_source(session, cq.from_user.id)
+    src = _team_lead_source(tl)
     await state.set_state(TeamLeadStates.bank_custom_name)
-    await state.update_data(return_to="banks_list", edit_field=("instructions_fb" if src == TeamLeadSource.FB else "instructions_tg"))
+    await state.set_data(
+        {"return_to": "banks_list", "edit_field": "instructions_fb" if src == TeamLeadSource.FB else "instructions_tg"}
+    )
     if cq.message:
         await cq.message.answer(
             "Сейчас создадим условия для банка:\n"
@@ -971,7 +1064,8 @@ async def bank_create_start(cq: CallbackQuery, session: AsyncSession, state: FSM
 async def bank_create_name(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
     raw = (message.text or "").strip()
     core, suffix = _parse_bank_core_and_suffix(raw)
@@ -994,7 +1088,8 @@ async def bank_create_name(message: Message, session: AsyncSession, state: FSMCo
 async def bank_create_limit(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
 
     data = await state.get_data()
@@ -1010,34 +1105,34 @@ async def bank_create_limit(message: Message, session: AsyncSession, state: FSMC
 
     existing = await get_bank_by_name(session, name)
     if existing:
-        src = await _get_team_lead_source(session, message.from_user.id)
+        src = _team_lead_source(tl)
         edit_field = "instructions_fb" if src == TeamLeadSource.FB else "instructions_tg"
-        await state.clear()
-        await state.update_data(bank_id=existing.id, return_to="banks_list", edit_field=edit_field)
         await state.set_state(TeamLeadStates.bank_instructions)
+        await state.set_data({"bank_id": int(existing.id), "return_to": "banks_list", "edit_field": edit_field})
         await message.answer(
-            f"ℹ️ Банк <b>{existing.name}</b> уже есть. Обновим условия для источника <b>{str(src).split('.')[-1]}</b>."
+            f"ℹ️ Банк <b>{existing.name}</b> уже есть. Обновим условия для источника <b>{_src_name(src)}</b>."
         )
         await message.answer("Отправьте текст условий (можно несколько строк):", reply_markup=kb_back())
         return
 
     edit_field = data.get("edit_field")
     bank = await create_bank(session, name)
-    await state.clear()
-    await state.update_data(bank_id=bank.id)
-    await state.set_state(TeamLeadStates.bank_instructions)
+    await session.commit()
+    new_data: dict = {"bank_id": int(bank.id), "return_to": "banks_list"}
     if edit_field in {"instructions_fb", "instructions_tg"}:
-        await state.update_data(edit_field=edit_field)
+        new_data["edit_field"] = edit_field
+    await state.set_state(TeamLeadStates.bank_instructions)
+    await state.set_data(new_data)
     await message.answer(f"✅ Создан банк <b>{bank.name}</b>.")
     await message.answer("Теперь отправьте текст условий (можно несколько строк):", reply_markup=kb_back())
-    await state.update_data(return_to="banks_list")
 
 
 @router.message(TeamLeadStates.bank_custom_limit, F.text == "Назад")
 async def bank_create_limit_back(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
     await state.set_state(TeamLeadStates.bank_custom_name)
     await message.answer("Введите название банка:", reply_markup=kb_back())
@@ -1047,7 +1142,8 @@ async def bank_create_limit_back(message: Message, session: AsyncSession, state:
 async def bank_edit_action(cq: CallbackQuery, callback_data: BankEditCb, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
     bank = await get_bank(session, callback_data.bank_id)
@@ -1055,12 +1151,8 @@ async def bank_edit_action(cq: CallbackQuery, callback_data: BankEditCb, session
         await cq.answer("Банк не найден", show_alert=True)
         return
 
-    src = await _get_team_lead_source(session, cq.from_user.id)
-    allowed = {
-        TeamLeadSource.TG: {"rename", "instructions_tg", "required_tg", "delete", "back"},
-        TeamLeadSource.FB: {"rename", "instructions_fb", "required_fb", "delete", "back"},
-    }
-    if callback_data.action not in allowed.get(src, set()):
+    src = _team_lead_source(tl)
+    if callback_data.action not in _ALLOWED_ACTIONS.get(src, frozenset()):
         await cq.answer("Нет прав", show_alert=True)
         return
 
@@ -1070,29 +1162,27 @@ async def bank_edit_action(cq: CallbackQuery, callback_data: BankEditCb, session
             cond = _format_bank_conditions_for_tl(bank, src)
             text = f"🏦 <b>{bank.name}</b>\n\n{cond or '—'}"
             has_cond = _has_conditions(bank)
-            await cq.message.edit_text(text, reply_markup=kb_bank_open(bank.id, has_conditions=has_cond))
+            await _edit_text_if_changed(cq.message, text, reply_markup=kb_bank_open(bank.id, has_conditions=has_cond))
         return
 
     if callback_data.action == "delete":
         ok = await delete_bank_condition(session, int(bank.id))
+        await session.commit()
         await state.clear()
         if not ok:
             await cq.answer("Банк не найден", show_alert=True)
             return
         await cq.answer("Банк удалён")
-        await _notify_active_dms_banks_updated(cq.bot, session)
+        _schedule_banks_updated()
         banks = await _list_banks_for_tl_source(session, src)
         items = _tl_bank_items_with_source(banks, src)
         if cq.message:
             await cq.message.answer("✅ Банк удалён.\n🏦 <b>Условия для сдачи</b>", reply_markup=kb_banks_list(items))
         return
 
-    await state.clear()
-    await state.update_data(bank_id=bank.id)
-
     if callback_data.action == "rename":
         await state.set_state(TeamLeadStates.bank_rename_name)
-        await state.update_data(return_to="edit_menu")
+        await state.set_data({"bank_id": int(bank.id), "return_to": "edit_menu"})
         if cq.message:
             await cq.message.answer(
                 f"Введите новое название банка (сейчас: <b>{bank.name}</b>).\n"
@@ -1103,14 +1193,14 @@ async def bank_edit_action(cq: CallbackQuery, callback_data: BankEditCb, session
 
     if callback_data.action in {"instructions_tg", "instructions_fb"}:
         await state.set_state(TeamLeadStates.bank_instructions)
-        await state.update_data(return_to="edit_menu", edit_field=callback_data.action)
+        await state.set_data({"bank_id": int(bank.id), "return_to": "edit_menu", "edit_field": callback_data.action})
         if cq.message:
             await cq.message.answer("Введите текст условий (можно несколько строк):", reply_markup=kb_back())
         return
 
     if callback_data.action in {"required_tg", "required_fb"}:
         await state.set_state(TeamLeadStates.bank_required_screens)
-        await state.update_data(return_to="edit_menu", edit_field=callback_data.action)
+        await state.set_data({"bank_id": int(bank.id), "return_to": "edit_menu", "edit_field": callback_data.action})
         if cq.message:
             await cq.message.answer(
                 "Введите число (сколько скринов нужно) или 0 чтобы снять требование:",
@@ -1118,6 +1208,7 @@ async def bank_edit_action(cq: CallbackQuery, callback_data: BankEditCb, session
             )
         return
 
+    await state.clear()
     await cq.answer("Неизвестное действие", show_alert=True)
     return
 
@@ -1126,12 +1217,13 @@ async def bank_edit_action(cq: CallbackQuery, callback_data: BankEditCb, session
 async def bank_rename_name(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
 
     data = await state.get_data()
-    bank_id_raw = data.get("bank_id")
-    if not bank_id_raw:
+    bank_id = int(data.get("bank_id") or 0)
+    if not bank_id:
         await state.clear()
         await message.answer("⚠️ Сессия сбилась. Зайдите в 'Условия для сдачи' и выберите банк заново.")
         return
@@ -1145,7 +1237,7 @@ async def bank_rename_name(message: Message, session: AsyncSession, state: FSMCo
         )
         return
 
-    bank = await get_bank(session, int(bank_id_raw))
+    bank = await get_bank(session, bank_id)
     if not bank:
         await state.clear()
         await message.answer("Банк не найден")
@@ -1160,12 +1252,13 @@ async def bank_rename_name(message: Message, session: AsyncSession, state: FSMCo
 async def bank_rename_limit(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
 
     data = await state.get_data()
-    bank_id_raw = data.get("bank_id")
-    if not bank_id_raw:
+    bank_id = int(data.get("bank_id") or 0)
+    if not bank_id:
         await state.clear()
         await message.answer("⚠️ Сессия сбилась. Зайдите в 'Условия для сдачи' и выберите банк заново.")
         return
@@ -1180,7 +1273,7 @@ async def bank_rename_limit(message: Message, session: AsyncSession, state: FSMC
         await message.answer("Слишком длинное название. Укоротите лимит/доп.часть и попробуйте снова.")
         return
 
-    bank = await get_bank(session, int(bank_id_raw))
+    bank = await get_bank(session, bank_id)
     if not bank:
         await state.clear()
         await message.answer("Банк не найден")
@@ -1192,8 +1285,9 @@ async def bank_rename_limit(message: Message, session: AsyncSession, state: FSMC
         return
 
     await update_bank(session, int(bank.id), name=name)
+    await session.commit()
     await state.clear()
-    await _notify_active_dms_banks_updated(message.bot, session)
+    _schedule_banks_updated()
     await message.answer("✅ Название банка обновлено.", reply_markup=kb_team_lead_inline_main())
 
 
@@ -1201,7 +1295,8 @@ async def bank_rename_limit(message: Message, session: AsyncSession, state: FSMC
 async def bank_rename_limit_back(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
     await state.set_state(TeamLeadStates.bank_rename_name)
     await message.answer("Введите новое название банка:", reply_markup=kb_back())
@@ -1211,24 +1306,25 @@ async def bank_rename_limit_back(message: Message, session: AsyncSession, state:
 async def bank_rename_back(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
 
     data = await state.get_data()
-    bank_id = data.get("bank_id")
+    bank_id = int(data.get("bank_id") or 0)
     await state.clear()
 
     if bank_id:
-        bank = await get_bank(session, int(bank_id))
+        bank = await get_bank(session, bank_id)
         if bank:
-            src = await _get_team_lead_source(session, message.from_user.id)
+            src = _team_lead_source(tl)
             await message.answer(
                 f"Редактирование <b>{bank.name}</b>:",
-                reply_markup=kb_bank_edit_for_source(bank.id, source=str(src).split(".")[-1]),
+                reply_markup=kb_bank_edit_for_source(bank.id, source=_src_name(src)),
             )
             return
 
-    src = await _get_team_lead_source(session, message.from_user.id)
+    src = _team_lead_source(tl)
     banks = await _list_banks_for_tl_source(session, src)
     items = _tl_bank_items_with_source(banks, src)
     await message.answer("🏦 <b>Условия для сдачи</b>", reply_markup=kb_banks_list(items))
@@ -1238,18 +1334,17 @@ async def bank_rename_back(message: Message, session: AsyncSession, state: FSMCo
 async def bank_set_instructions(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
     data = await state.get_data()
-    bank_id_raw = data.get("bank_id")
-    if not bank_id_raw:
+    bank_id = int(data.get("bank_id") or 0)
+    if not bank_id:
         await state.clear()
         await message.answer("⚠️ Сессия сбилась. Зайдите в 'Условия для сдачи' и выберите банк заново.")
         return
-    bank_id = int(bank_id_raw)
-    data = await state.get_data()
     edit_field = data.get("edit_field")
-    src = await _get_team_lead_source(session, message.from_user.id)
+    src = _team_lead_source(tl)
     if src == TeamLeadSource.FB and edit_field not in {None, "instructions_fb"}:
         await state.clear()
         await message.answer("Нет прав")
@@ -1267,8 +1362,9 @@ async def bank_set_instructions(message: Message, session: AsyncSession, state:
             await update_bank(session, bank_id, instructions_fb=txt)
         else:
             await update_bank(session, bank_id, instructions_tg=txt)
+    await session.commit()
     await state.clear()
-    await _notify_active_dms_banks_updated(message.bot, session)
+    _schedule_banks_updated()
     await message.answer("✅ Условия обновлены.", reply_markup=kb_team_lead_inline_main())
 
 
@@ -1276,28 +1372,29 @@ async def bank_set_instructions(message: Message, session: AsyncSession, state:
 async def bank_instructions_back(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
     data = await state.get_data()
-    bank_id = data.get("bank_id")
+    bank_id = int(data.get("bank_id") or 0)
     return_to = data.get("return_to")
     await state.clear()
 
     # Remove the "Назад" reply keyboard and render target screen
     if return_to == "edit_menu" and bank_id:
-        bank = await get_bank(session, int(bank_id))
+        bank = await get_bank(session, bank_id)
         if bank:
-            src = await _get_team_lead_source(session, message.from_user.id)
+            src = _team_lead_source(tl)
             await message.answer(
                 f"Редактирование <b>{bank.name}</b>:",
-                reply_markup=kb_bank_edit_for_source(bank.id, source=str(src).split(".")[-1]),
+                reply_markup=kb_bank_edit_for_source(bank.id, source=_src_name(src)),
             )
             return
 
     if return_to == "bank_open" and bank_id:
-        bank = await get_bank(session, int(bank_id))
+        bank = await get_bank(session, bank_id)
         if bank:
-            src = await _get_team_lead_source(session, message.from_user.id)
+            src = _team_lead_source(tl)
             cond = _format_bank_conditions_for_tl(bank, src)
             text = f"🏦 <b>{bank.name}</b>\n\n{cond or '—'}"
             has_cond = _has_conditions(bank)
@@ -1305,7 +1402,7 @@ async def bank_instructions_back(message: Message, session: AsyncSession, state:
             return
 
     # default: banks list
-    src = await _get_team_lead_source(session, message.from_user.id)
+    src = _team_lead_source(tl)
     banks = await _list_banks_for_tl_source(session, src)
     items = _tl_bank_items_with_source(banks, src)
     await message.answer("🏦 <b>Условия для сдачи</b>", reply_markup=kb_banks_list(items))
@@ -1315,7 +1412,8 @@ async def bank_instructions_back(message: Message, session: AsyncSession, state:
 async def bank_set_required(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
     txt = message.text.strip()
     if not txt.isdigit():
@@ -1326,14 +1424,13 @@ async def bank_set_required(message: Message, session: AsyncSession, state: FSMC
         await message.answer("Число должно быть 0..20")
         return
     data = await state.get_data()
-    bank_id_raw = data.get("bank_id")
-    if not bank_id_raw:
+    bank_id = int(data.get("bank_id") or 0)
+    if not bank_id:
         await state.clear()
         await message.answer("⚠️ Сессия сбилась. Зайдите в 'Условия для сдачи' и выберите банк заново.")
         return
-    bank_id = int(bank_id_raw)
     edit_field = data.get("edit_field")
-    src = await _get_team_lead_source(session, message.from_user.id)
+    src = _team_lead_source(tl)
     if src == TeamLeadSource.FB and edit_field not in {None, "required_fb"}:
         await state.clear()
         await message.answer("Нет прав")
@@ -1351,8 +1448,9 @@ async def bank_set_required(message: Message, session: AsyncSession, state: FSMC
             await update_bank(session, bank_id, required_screens_fb=val)
         else:
             await update_bank(session, bank_id, required_screens_tg=val)
+    await session.commit()
     await state.clear()
-    await _notify_active_dms_banks_updated(message.bot, session)
+    _schedule_banks_updated()
     await message.answer("✅ Кол-во скринов обновлено.", reply_markup=kb_team_lead_inline_main())
 
 
@@ -1360,35 +1458,36 @@ async def bank_set_required(message: Message, session: AsyncSession, state: FSMC
 async def bank_required_back(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
     data = await state.get_data()
-    bank_id = data.get("bank_id")
+    bank_id = int(data.get("bank_id") or 0)
     return_to = data.get("return_to")
     await state.clear()
 
     if return_to == "edit_menu" and bank_id:
-        bank = await get_bank(session, int(bank_id))
+        bank = await get_bank(session, bank_id)
         if bank:
-            src = await _get_team_lead_source(session, message.from_user.id)
+            src = _team_lead_source(tl)
             await message.answer(
                 f"Редактирование <b>{bank.name}</b>:",
-                reply_markup=kb_bank_edit_for_source(bank.id, source=str(src).split(".")[-1]),
+                reply_markup=kb_bank_edit_for_source(bank.id, source=_src_name(src)),
             )
             return
 
     # default: open bank card if possible; otherwise banks list
     if bank_id:
-        bank = await get_bank(session, int(bank_id))
+        bank = await get_bank(session, bank_id)
         if bank:
-            src = await _get_team_lead_source(session, message.from_user.id)
+            src = _team_lead_source(tl)
             cond = _format_bank_conditions_for_tl(bank, src)
             text = f"🏦 <b>{bank.name}</b>\n\n{cond or '—'}"
             has_cond = _has_conditions(bank)
             await message.answer(text, reply_markup=kb_bank_open(bank.id, has_conditions=has_cond))
             return
 
-    src = await _get_team_lead_source(session, message.from_user.id)
+    src = _team_lead_source(tl)
     banks = await _list_banks_for_tl_source(session, src)
     items = _tl_bank_items_with_source(banks, src)
     await message.answer("🏦 <b>Условия для сдачи</b>", reply_markup=kb_banks_list(items))
@@ -1398,10 +1497,11 @@ async def bank_required_back(message: Message, session: AsyncSession, state: FSM
 async def bank_custom_name_back(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
     await state.clear()
-    src = await _get_team_lead_source(session, message.from_user.id)
+    src = _team_lead_source(tl)
     banks = await _list_banks_for_tl_source(session, src)
     items = _tl_bank_items_with_source(banks, src)
     await message.answer("🏦 <b>Условия для сдачи</b>", reply_markup=kb_banks_list(items))
@@ -1417,7 +1517,8 @@ async def review_form(
 ) -> None:
     if not cq.from_user:
         return
-    if not await is_team_lead(session, cq.from_user.id):
+    tl = await require_team_lead(session, cq.from_user.id)
+    if not tl:
         await cq.answer("Нет прав", show_alert=True)
         return
 
@@ -1432,104 +1533,81 @@ async def review_form(
         if not approved_now:
             await cq.answer("Анкета уже обработана", show_alert=True)
             return
-        manager = await get_user_by_id(session, form.manager_id)
+        manager, g = await get_user_with_forward_group(session, int(form.manager_id))
+        # end of the DB write phase: release the connection before Telegram I/O
+        await session.commit()
         manager_tg_id = manager.tg_id if manager else None
         manager_tag = manager.manager_tag if manager and manager.manager_tag else "—"
 
-        # notify manager with full form (and screenshots) + edit button
-        if manager_tg_id:
-            try:
-                bank_label = format_bank_hashtag(getattr(form, "bank_name", None))
-                b = InlineKeyboardBuilder()
-                b.button(text="Перейти", callback_data=f"dm:approved_no_pay_open:{int(form.id)}")
-                b.adjust(1)
-                notice = await cq.bot.send_message(
-                    manager_tg_id,
-                    f"✅ Апрувнули анкету <code>{form.id}</code>\nБанк: <b>{bank_label}</b>",
-                    parse_mode="HTML",
-                    reply_markup=b.as_markup(),
-                )
-                register_dm_approved_notice(int(manager_tg_id), int(notice.message_id))
-            except Exception:
-                log.exception("Failed to notify manager about approval")
-
-        # post to forwarding group bound to the drop manager
-        target_chat_id: int | None = None
-        forward_ok = False
-        forward_err = ""
-        if manager and getattr(manager, "forward_group_id", None):
-            g = await get_forward_group_by_id(session, int(manager.forward_group_id))
-            if g:
-                target_chat_id = int(g.chat_id)
-
-        # legacy fallback
+        # forwarding group bound to the drop manager, legacy fallback to settings
+        target_chat_id: int | None = int(g.chat_id) if g else None
         if target_chat_id is None and settings.group_chat_id:
             target_chat_id = int(settings.group_chat_id)
 
-        if target_chat_id is not None:
+        async def _notify_manager() -> None:
+            bank_label = format_bank_hashtag(getattr(form, "bank_name", None))
+            b = InlineKeyboardBuilder()
+            b.button(text="Перейти", callback_data=f"dm:approved_no_pay_open:{int(form.id)}")
+            b.adjust(1)
+            notice = await cq.bot.send_message(
+                manager_tg_id,
+                f"✅ Апрувнули анкету <code>{form.id}</code>\nБанк: <b>{bank_label}</b>",
+                parse_mode="HTML",
+                reply_markup=b.as_markup(),
+            )
+            register_dm_approved_notice(int(manager_tg_id), int(notice.message_id))
+
+        async def _post_to_group() -> None:
             group_text = _format_form_for_group(form, manager_tag)
             try:
                 await cq.bot.send_message(target_chat_id, group_text, reply_markup=None)
-                forward_ok = True
             except TelegramMigrateToChat as e:
                 new_chat_id = int(getattr(e, "migrate_to_chat_id", 0) or 0)
-                if new_chat_id:
-                    try:
-                        if manager and getattr(manager, "forward_group_id", None):
-                            g = await get_forward_group_by_id(session, int(manager.forward_group_id))
-                            if g:
-                                g.chat_id = int(new_chat_id)
-                        await cq.bot.send_message(int(new_chat_id), group_text, reply_markup=None)
-                        forward_ok = True
-                        log.warning("Updated migrated forward group chat_id %s -> %s", target_chat_id, new_chat_id)
-                    except Exception as ex:
-                        forward_err = str(ex)
-                        log.exception("Failed to post to migrated group")
-                else:
-                    forward_err = "group migrated without new chat id"
-                    log.exception("Failed to post to group (migrate without target id)")
-            except Exception as ex:
-                forward_err = str(ex)
-                log.exception("Failed to post to group")
-        else:
-            forward_err = "forward group is not configured"
+                if not new_chat_id:
+                    raise
+                if g:
+                    g.chat_id = new_chat_id
+                await cq.bot.send_message(new_chat_id, group_text, reply_markup=None)
+                log.warning("Updated migrated forward group chat_id %s -> %s", target_chat_id, new_chat_id)
+
+        # form messages (album/text) + controls + live notice in TL chat
+        data = await state.get_data()
+        await state.update_data(tl_form_msg_ids=(), tl_controls_msg_id=None)
+        tl_msg_ids = [*(data.get("tl_form_msg_ids") or ())]
+        if data.get("tl_controls_msg_id"):
+            tl_msg_ids.append(int(data["tl_controls_msg_id"]))
+        notice_id = pop_tl_form_notice(int(cq.from_user.id), int(form.id))
+        if notice_id:
+            tl_msg_ids.append(int(notice_id))
+
+        jobs: dict[str, Awaitable] = {"answer approve callback": cq.answer("Подтверждено")}
+        if manager_tg_id:
+            jobs["notify manager about approval"] = _notify_manager()
+        if target_chat_id is not None:
+            jobs["post form to group"] = _post_to_group()
+        if tl_msg_ids and cq.message:
+            jobs["clean up TL form messages"] = _safe_delete_messages(
+                bot=cq.bot, chat_id=int(cq.message.chat.id), message_ids=tl_msg_ids
+            )
+        results = await _gather_logged(jobs)
 
+        forward_ok = "post form to group" in results and not isinstance(results["post form to group"], Exception)
         if manager_tg_id and not forward_ok:
-            try:
-                await cq.bot.send_message(
+            await _send_or_none(
+                cq.bot.send_message(
                     int(manager_tg_id),
                     "⚠️ Не удалось отправить анкету в группу пересылки. Разработчик уже видит это в логах.",
                 )
-            except Exception:
-                pass
-
-        # delete form messages (album/text) + controls from TL chat
-        data = await state.get_data()
-        ids = list(data.get("tl_form_msg_ids") or [])
-        if ids and cq.message:
-            await _safe_delete_messages(bot=cq.bot, chat_id=int(cq.message.chat.id), message_ids=[int(x) for x in ids])
-        controls_msg_id = data.get("tl_controls_msg_id")
-        if controls_msg_id:
-            await _safe_delete_messages(bot=cq.bot, chat_id=int(cq.message.chat.id), message_ids=[int(controls_msg_id)])
-        await state.update_data(tl_form_msg_ids=[], tl_controls_msg_id=None)
-
-        notice_id = pop_tl_form_notice(int(cq.from_user.id), int(form.id))
-        if notice_id:
-            try:
-                await cq.bot.delete_message(chat_id=int(cq.message.chat.id), message_id=int(notice_id))
-            except Exception:
-                pass
+            )
 
-        await cq.answer("Подтверждено")
         if cq.message:
-            try:
-                await cq.message.answer(
+            await _send_or_none(
+                cq.message.answer(
                     "Вы успешно подтвердили анкету. "
                     "В случае ошибки проверки с вашей стороны, вы несете ответственность с менеджером."
                 )
-            except Exception:
-                pass
-        await _render_tl_live_list(cq, session)
+            )
+        await _render_tl_live_list(cq, session, tl)
         return
 
     if callback_data.action == "reject":
@@ -1568,7 +1646,8 @@ async def tl_reject_back_cb(cq: CallbackQuery, session: AsyncSession, state: FSM
 async def reject_comment(message: Message, session: AsyncSession, state: FSMContext, settings: Settings) -> None:
     if not message.from_user:
         return
-    if not await is_team_lead(session, message.from_user.id):
+    tl = await require_team_lead(session, message.from_user.id)
+    if not tl:
         return
     data = await state.get_data()
     form_id = int(data["form_id"])
@@ -1582,48 +1661,46 @@ async def reject_comment(message: Message, session: AsyncSession, state: FSMCont
 
     await set_form_status(session, form_id, FormStatus.REJECTED, team_lead_comment=comment)
     manager = await get_user_by_id(session, form.manager_id)
-    if manager:
-        try:
-            tl_comment = (comment or "").strip() or "Комментария нет"
-            text = f"❌ Отклонена: <code>{form.id}</code>\nКомментарий: {tl_comment}"
-            notice = await message.bot.send_message(
-                manager.tg_id,
-                text,
-                reply_markup=kb_dm_reject_notice(form.id),
-                parse_mode="HTML",
-            )
-            register_dm_reject_notice(int(manager.tg_id), int(form.id), int(notice.message_id))
-        except Exception:
-            log.exception("Failed to notify manager about rejection")
+    # end of the DB write phase: release the connection before Telegram I/O
+    await session.commit()
+
+    async def _notify_manager() -> None:
+        tl_comment = (comment or "").strip() or "Комментария нет"
+        text = f"❌ Отклонена: <code>{form.id}</code>\nКомментарий: {tl_comment}"
+        notice = await message.bot.send_message(
+            manager.tg_id,
+            text,
+            reply_markup=kb_dm_reject_notice(form.id),
+            parse_mode="HTML",
+        )
+        register_dm_reject_notice(int(manager.tg_id), int(form.id), int(notice.message_id))
 
-    # delete form messages (album/text) + controls from TL chat
+    # form messages (album/text) + controls + live notice + reject prompt in TL chat
     data2 = await state.get_data()
-    ids = list(data2.get("tl_form_msg_ids") or [])
-    if ids:
-        await _safe_delete_messages(bot=message.bot, chat_id=int(message.chat.id), message_ids=[int(x) for x in ids])
-
+    tl_msg_ids = [*(data2.get("tl_form_msg_ids") or ())]
     controls_msg_id = data2.get("tl_controls_msg_id")
     if controls_msg_id:
-        await _safe_delete_messages(bot=message.bot, chat_id=int(message.chat.id), message_ids=[int(controls_msg_id)])
-
+        tl_msg_ids.append(int(controls_msg_id))
     notice_id = pop_tl_form_notice(int(message.from_user.id), int(form.id))
     if notice_id:
-        try:
-            await message.bot.delete_message(chat_id=int(message.chat.id), message_id=int(notice_id))
-        except Exception:
-            pass
-
+        tl_msg_ids.append(int(notice_id))
     prompt_id = data2.get("tl_reject_prompt_msg_id")
     if prompt_id:
-        try:
-            await message.bot.delete_message(chat_id=message.chat.id, message_id=int(prompt_id))
-        except Exception:
-            pass
+        tl_msg_ids.append(int(prompt_id))
+
+    jobs: dict[str, Awaitable] = {}
+    if manager:
+        jobs["notify manager about rejection"] = _notify_manager()
+    if tl_msg_ids:
+        jobs["clean up TL form messages"] = _safe_delete_messages(
+            bot=message.bot, chat_id=int(message.chat.id), message_ids=tl_msg_ids
+        )
+    await _gather_logged(jobs)
 
     await state.clear()
     if controls_msg_id:
         await _render_tl_live_list_to_message(bot=message.bot, chat_id=int(message.chat.id), message_id=int(controls_msg_id), session=session)
         return
-    await _render_tl_live_list(message, session)
+    await _render_tl_live_list(message, session, tl)
 
 
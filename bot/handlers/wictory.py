@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Awaitable, Callable
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
@@ -37,18 +40,27 @@ from bot.keyboards import (
     kb_wictory_stats_main,
     kb_wictory_upload_actions,
 )
-from bot.middlewares import GroupMessageFilter
+from bot.auth_cache import UserAuth
+from bot.callbacks import WictoryAddCb, WictoryBankCb, WictoryEditCb, WictoryInvalidCb
+from bot.bank_cache import BankItems, get_bank_items
+from bot.middlewares import CallbackDebounceMiddleware, GroupMessageFilter, UserContextMiddleware
+from bot.pool_cache import cache_invalid_list, get_cached_invalid_list, pool_generation
 from bot.models import ResourceStatus, UserRole
 from bot.repositories import (
+    build_resource_pool_item,
     create_resource_pool_item,
+    create_resource_pool_items,
     get_bank,
+    get_banks_by_ids,
     get_pool_item,
+    get_pool_item_with_bank,
     get_user_by_id,
-    get_user_by_tg_id,
-    list_banks,
+    list_bank_items_cached,
+    list_bank_source_rows,
     list_invalid_pool_items_for_wictory,
     list_pool_items_filtered,
     list_wictory_pool_items,
+    pick_banks_for_source,
     wictory_delete_item,
     wictory_update_invalid_item,
     wictory_update_item,
@@ -58,31 +70,10 @@ from bot.utils import pack_media_item, unpack_media_item
 
 
 async def _list_banks_for_source(session: AsyncSession, source: str | None) -> list:
-    src = (source or "TG").upper()
-    banks = await list_banks(session)
-
-    def _has_fb(bank) -> bool:
-        return bool((getattr(bank, "instructions_fb", None) or "").strip()) or getattr(bank, "required_screens_fb", None) is not None
-
-    def _has_tg(bank) -> bool:
-        return bool((getattr(bank, "instructions_tg", None) or "").strip()) or getattr(bank, "required_screens_tg", None) is not None
-
-    def _has_legacy(bank) -> bool:
-        return bool((getattr(bank, "instructions", None) or "").strip()) or getattr(bank, "required_screens", None) is not None
+    return pick_banks_for_source(await list_bank_source_rows(session), source)
 
-    if src == "FB":
-        picked = [b for b in banks if _has_fb(b) or (_has_legacy(b) and not _has_tg(b))]
-        if picked:
-            return picked
-        return [b for b in banks if _has_fb(b) or not _has_tg(b)]
 
-    picked = [b for b in banks if _has_tg(b) or (_has_legacy(b) and not _has_fb(b))]
-    if picked:
-        return picked
-    return [b for b in banks if _has_tg(b) or not _has_fb(b)]
-
-
-def _bank_items_with_source(banks: list, source: str | None) -> list[tuple[int, str]]:
+def _bank_items_with_source(banks: list, source: str | None) -> BankItems:
     src = (source or "TG").upper()
     suffix = "FB" if src == "FB" else "TG"
     out: list[tuple[int, str]] = []
@@ -91,7 +82,19 @@ def _bank_items_with_source(banks: list, source: str | None) -> list[tuple[int,
         if not nm:
             continue
         out.append((int(b.id), f"{nm} ({suffix})"))
-    return out
+    return tuple(out)
+
+
+async def _bank_picker_items(session: AsyncSession, source: str | None) -> BankItems:
+    """Bank picker buttons for `source` ("ALL" shows the FB list), built once per cache TTL."""
+    src = (source or "TG").upper()
+    if src == "ALL":
+        src = "FB"
+
+    async def _load() -> BankItems:
+        return _bank_items_with_source(await _list_banks_for_source(session, src), src)
+
+    return await get_bank_items(_load, key=f"wictory:{'FB' if src == 'FB' else 'TG'}")
 
 
 def _source_label(src: str | None) -> str:
@@ -106,6 +109,11 @@ def _norm_bank_name(name: str | None) -> str:
 
 router = Router(name="wictory")
 router.message.filter(GroupMessageFilter())
+# Every handler here is WICTORY-only: resolve/authorize the sender once, inject as `wictory_user`.
+router.message.middleware(UserContextMiddleware(UserRole.WICTORY, "wictory_user"))
+# Debounce first: mashed buttons are answered and dropped before any DB/FSM access.
+router.callback_query.middleware(CallbackDebounceMiddleware(window=0.5))
+router.callback_query.middleware(UserContextMiddleware(UserRole.WICTORY, "wictory_user"))
 
 
 def _preview_caption(data: dict) -> str:
@@ -197,27 +205,34 @@ def _compose_link_esim_payload(comment: str | None, link: str | None) -> str:
     return c or l
 
 
+_RESOURCE_TYPE_RU = {
+    "link": "Ссылка",
+    "esim": "Esim",
+    "link_esim": "Ссылка + Esim",
+}
+_PREVIEW_HEAD_TMPL = "<b>Готовый запрос</b>\n\nИсточник: <b>{source}</b>\nТип: <b>{rtype}</b>"
+
+
 def _render_preview(data: dict) -> str:
-    rtype = str(data.get("resource_type") or "")
     bank_name = data.get("bank_name") or "—"
-    bank_name_fb = data.get("bank_name_fb") or bank_name
-    bank_name_tg = data.get("bank_name_tg") or "—"
-    link = data.get("text_data") or "—"
-    screens = data.get("screenshots") or []
+    return _render_preview_cached(
+        str(data.get("resource_source") or ""),
+        str(data.get("resource_type") or ""),
+        str(bank_name),
+        str(data.get("bank_name_fb") or bank_name),
+        str(data.get("bank_name_tg") or "—"),
+        str(data.get("text_data") or "—"),
+        len(data.get("screenshots") or ()),
+    )
 
-    type_ru = {
-        "link": "Ссылка",
-        "esim": "Esim",
-        "link_esim": "Ссылка + Esim",
-    }.get(rtype, rtype or "—")
 
-    lines = [
-        "<b>Готовый запрос</b>",
-        "",
-        f"Источник: <b>{_source_label(data.get('resource_source'))}</b>",
-        f"Тип: <b>{type_ru}</b>",
-    ]
-    if str(data.get("resource_source") or "").upper() == "ALL":
+@lru_cache(maxsize=256)
+def _render_preview_cached(
+    source: str, rtype: str, bank_name: str, bank_name_fb: str, bank_name_tg: str, link: str, n_screens: int
+) -> str:
+    # Preview/edit/confirm re-render the same draft back-to-back; key on the fields actually shown.
+    lines = [_PREVIEW_HEAD_TMPL.format(source=_source_label(source or None), rtype=_RESOURCE_TYPE_RU.get(rtype, rtype or "—"))]
+    if source.upper() == "ALL":
         lines.append(f"Банк FB: <b>{bank_name_fb}</b>")
         lines.append(f"Банк TG: <b>{bank_name_tg}</b>")
     else:
@@ -233,21 +248,11 @@ def _render_preview(data: dict) -> str:
         lines.append(f"Ссылка: <code>{lnk or '—'}</code>")
 
     if rtype in {"esim", "link_esim"}:
-        lines.append(f"Файлов Esim: <b>{len(screens)}</b>")
+        lines.append(f"Файлов Esim: <b>{n_screens}</b>")
 
     return "\n".join(lines)
 
 
-async def _wictory_guard(cq_or_msg: CallbackQuery | Message, session: AsyncSession):
-    u = cq_or_msg.from_user
-    if not u:
-        return None
-    user = await get_user_by_tg_id(session, int(u.id))
-    if not user or user.role != UserRole.WICTORY:
-        return None
-    return user
-
-
 async def _pool_item_is_wictory_created(session: AsyncSession, it) -> bool:
     try:
         creator = await get_user_by_id(session, int(getattr(it, "created_by_user_id", 0) or 0))
@@ -258,19 +263,19 @@ async def _pool_item_is_wictory_created(session: AsyncSession, it) -> bool:
 
 async def _wictory_bank_label(session: AsyncSession, it) -> str:
     src = str(getattr(it, "source", "") or "").upper()
-    bank_fb = await get_bank(session, int(getattr(it, "bank_id", 0) or 0))
+    fb_bid = int(getattr(it, "bank_id", 0) or 0)
+    tg_bid = int(getattr(it, "tg_bank_id", 0) or 0) if src == "ALL" else 0
+    # both banks of an ALL item in one query
+    banks = await get_banks_by_ids(session, (bid for bid in (fb_bid, tg_bid) if bid))
+    bank_fb = banks.get(fb_bid)
     if src == "ALL":
-        tg_bid = int(getattr(it, "tg_bank_id", 0) or 0)
-        bank_tg = await get_bank(session, tg_bid) if tg_bid else None
+        bank_tg = banks.get(tg_bid) if tg_bid else None
         return f"FB: {bank_fb.name if bank_fb else '—'} / TG: {bank_tg.name if bank_tg else '—'}"
     return bank_fb.name if bank_fb else "—"
 
 
 @router.callback_query(F.data == "wictory:home")
 async def wictory_home(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     await state.clear()
     await cq.answer()
     if cq.message:
@@ -282,9 +287,6 @@ async def wictory_home(cq: CallbackQuery, session: AsyncSession, state: FSMConte
 
 @router.callback_query(F.data == "wictory:cancel_create")
 async def wictory_cancel_create(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     await state.clear()
     await cq.answer("Создание отменено")
     if cq.message:
@@ -296,9 +298,6 @@ async def wictory_cancel_create(cq: CallbackQuery, session: AsyncSession, state:
 
 @router.callback_query(F.data.startswith("wictory:back:"))
 async def wictory_back(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     stage = (cq.data or "").split(":", 2)[-1]
     data = await state.get_data()
     rtype = str(data.get("resource_type") or "")
@@ -315,12 +314,7 @@ async def wictory_back(cq: CallbackQuery, session: AsyncSession, state: FSMConte
 
     if stage == "bank_list":
         src = str(data.get("resource_source") or "TG").upper()
-        if src == "ALL":
-            banks = await _list_banks_for_source(session, "FB")
-            items = _bank_items_with_source(banks, "FB")
-        else:
-            banks = await _list_banks_for_source(session, src)
-            items = _bank_items_with_source(banks, src)
+        items = await _bank_picker_items(session, src)
         await state.set_state(WictoryStates.pick_bank)
         await cq.answer()
         if cq.message:
@@ -370,15 +364,12 @@ async def wictory_back(cq: CallbackQuery, session: AsyncSession, state: FSMConte
         return
 
 
-@router.callback_query(F.data.startswith("wictory:add:"))
-async def wictory_add_start(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    resource_type = (cq.data or "").split(":")[-1]
+@router.callback_query(WictoryAddCb.filter(F.action == "add"))
+async def wictory_add_start(cq: CallbackQuery, callback_data: WictoryAddCb, session: AsyncSession, state: FSMContext) -> None:
+    await cq.answer()
+    resource_type = callback_data.resource_type
     await state.clear()
     await state.update_data(resource_type=resource_type)
-    await cq.answer()
     if cq.message:
         await _safe_edit_or_answer(
             cq,
@@ -389,22 +380,14 @@ async def wictory_add_start(cq: CallbackQuery, session: AsyncSession, state: FSM
 
 @router.callback_query(F.data.startswith("wictory:src:"))
 async def wictory_pick_source(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    src = (cq.data or "").split(":")[-1].upper()
+    src = (cq.data or "").rpartition(":")[2].upper()
     if src not in {"TG", "FB", "ALL"}:
         await cq.answer("Некорректный источник", show_alert=True)
         return
-    if src == "ALL":
-        banks = await _list_banks_for_source(session, "FB")
-        items = _bank_items_with_source(banks, "FB")
-    else:
-        banks = await _list_banks_for_source(session, src)
-        items = _bank_items_with_source(banks, src)
+    await cq.answer()
+    items = await _bank_picker_items(session, src)
     await state.set_state(WictoryStates.pick_bank)
     await state.update_data(resource_source=src)
-    await cq.answer()
     if cq.message:
         await _safe_edit_or_answer(
             cq,
@@ -413,42 +396,32 @@ async def wictory_pick_source(cq: CallbackQuery, session: AsyncSession, state: F
         )
 
 
-@router.callback_query(WictoryStates.pick_bank, F.data.startswith("wictory:bank:"))
-async def wictory_pick_bank(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    bank_id = int((cq.data or "").split(":")[-1])
+@router.callback_query(WictoryStates.pick_bank, WictoryBankCb.filter(F.action == "bank"))
+async def wictory_pick_bank(cq: CallbackQuery, callback_data: WictoryBankCb, session: AsyncSession, state: FSMContext) -> None:
+    bank_id = callback_data.bank_id
     bank = await get_bank(session, bank_id)
     if not bank:
         await cq.answer("Банк не найден", show_alert=True)
         return
+    # one read, one write: mutate the fetched dict and store it back
     data = await state.get_data()
     src = str(data.get("resource_source") or "TG").upper()
     if src == "ALL":
         bank_name_fb = str(bank.name or "").strip() or "—"
         tg_banks = await _list_banks_for_source(session, "TG")
         tg_match = next((b for b in tg_banks if _norm_bank_name(getattr(b, "name", None)) == _norm_bank_name(bank.name)), None)
-        if tg_match:
-            await state.update_data(
-                bank_id=bank_id,
-                bank_name=bank_name_fb,
-                bank_id_fb=bank_id,
-                bank_name_fb=bank_name_fb,
-                bank_id_tg=int(tg_match.id),
-                bank_name_tg=str(getattr(tg_match, "name", "") or "—"),
-            )
-        else:
-            await state.update_data(
-                bank_id=bank_id,
-                bank_name=bank_name_fb,
-                bank_id_fb=bank_id,
-                bank_name_fb=bank_name_fb,
-                bank_id_tg=None,
-                bank_name_tg=None,
-            )
+        data.update(
+            bank_id=bank_id,
+            bank_name=bank_name_fb,
+            bank_id_fb=bank_id,
+            bank_name_fb=bank_name_fb,
+            bank_id_tg=int(tg_match.id) if tg_match else None,
+            bank_name_tg=str(getattr(tg_match, "name", "") or "—") if tg_match else None,
+        )
+        if not tg_match:
             items_tg = _bank_items_with_source(tg_banks, "TG")
             await state.set_state(WictoryStates.pick_bank_tg)
+            await state.set_data(data)
             await cq.answer()
             if cq.message:
                 await _safe_edit_or_answer(
@@ -458,15 +431,16 @@ async def wictory_pick_bank(cq: CallbackQuery, session: AsyncSession, state: FSM
                 )
             return
     else:
-        await state.update_data(bank_id=bank_id, bank_name=bank.name)
-    data = await state.get_data()
+        data.update(bank_id=bank_id, bank_name=bank.name)
     await cq.answer()
     if data.get("bank_edit_mode"):
-        await state.update_data(bank_edit_mode=None)
+        data["bank_edit_mode"] = None
         await state.set_state(WictoryStates.preview)
+        await state.set_data(data)
         if cq.message:
-            await _show_preview_from_callback(cq, await state.get_data())
+            await _show_preview_from_callback(cq, data)
         return
+    await state.set_data(data)
     if cq.message:
         bank_label = bank.name
         if src == "ALL":
@@ -478,30 +452,26 @@ async def wictory_pick_bank(cq: CallbackQuery, session: AsyncSession, state: FSM
         )
 
 
-@router.callback_query(WictoryStates.pick_bank_tg, F.data.startswith("wictory:bank:"))
-async def wictory_pick_bank_tg(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    bank_id = int((cq.data or "").split(":")[-1])
+@router.callback_query(WictoryStates.pick_bank_tg, WictoryBankCb.filter(F.action == "bank"))
+async def wictory_pick_bank_tg(cq: CallbackQuery, callback_data: WictoryBankCb, session: AsyncSession, state: FSMContext) -> None:
+    bank_id = callback_data.bank_id
     bank = await get_bank(session, bank_id)
     if not bank:
         await cq.answer("Банк не найден", show_alert=True)
         return
 
     data = await state.get_data()
-    await state.update_data(
-        bank_id_tg=bank_id,
-        bank_name_tg=str(getattr(bank, "name", "") or "—"),
-    )
-    await state.set_state(WictoryStates.pick_bank)
+    data.update(bank_id_tg=bank_id, bank_name_tg=str(getattr(bank, "name", "") or "—"))
     await cq.answer()
     if data.get("bank_edit_mode"):
-        await state.update_data(bank_edit_mode=None)
+        data["bank_edit_mode"] = None
         await state.set_state(WictoryStates.preview)
+        await state.set_data(data)
         if cq.message:
-            await _show_preview_from_callback(cq, await state.get_data())
+            await _show_preview_from_callback(cq, data)
         return
+    await state.set_state(WictoryStates.pick_bank)
+    await state.set_data(data)
 
     if cq.message:
         fb_name = str(data.get("bank_name_fb") or data.get("bank_name") or "—")
@@ -515,9 +485,6 @@ async def wictory_pick_bank_tg(cq: CallbackQuery, session: AsyncSession, state:
 
 @router.callback_query(F.data == "wictory:bank_mode:single")
 async def wictory_bank_mode_single(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     data = await state.get_data()
     rtype = str(data.get("resource_type") or "")
     if rtype in {"esim", "link_esim"}:
@@ -540,9 +507,6 @@ async def wictory_bank_mode_single(cq: CallbackQuery, session: AsyncSession, sta
 
 @router.callback_query(F.data == "wictory:bank_mode:bulk")
 async def wictory_bank_mode_bulk(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     data = await state.get_data()
     rtype = str(data.get("resource_type") or "")
     await state.update_data(bulk_mode=True)
@@ -590,10 +554,7 @@ async def wictory_bank_mode_bulk(cq: CallbackQuery, session: AsyncSession, state
 
 
 @router.message(WictoryStates.upload_screenshot, F.photo | F.document | F.video)
-async def wictory_upload_screenshot(message: Message, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(message, session)
-    if not user:
-        return
+async def wictory_upload_screenshot(message: Message, session: AsyncSession, state: FSMContext, wictory_user: UserAuth) -> None:
     data = await state.get_data()
     shots: list[str] = list(data.get("screenshots") or [])
     item_edit_id = data.get("item_edit_id")
@@ -615,7 +576,8 @@ async def wictory_upload_screenshot(message: Message, session: AsyncSession, sta
                 await message.answer("Можно добавить максимум 10 файлов.")
                 return
             shots.append(str(new_item))
-        await state.update_data(screenshots=shots, replace_index=None)
+        data.update(screenshots=shots, replace_index=None)
+        await state.set_data(data)
         await message.answer(
             f"Готово. Файлов сейчас: {len(shots)}/10",
             reply_markup=kb_wictory_item_media_manage(int(item_edit_id), len(shots)),
@@ -651,7 +613,7 @@ async def wictory_upload_screenshot(message: Message, session: AsyncSession, sta
                 resource_type=rtype,
                 text_data=text_data,
                 screenshots=[str(new_item)],
-                created_by_user_id=int(user.id),
+                created_by_user_id=int(wictory_user.id),
             )
             await message.answer(
                 f"Добавлено: <code>{_resource_ident(int(item.id))}</code>",
@@ -665,7 +627,7 @@ async def wictory_upload_screenshot(message: Message, session: AsyncSession, sta
                 resource_type=rtype,
                 text_data=text_data,
                 screenshots=[str(new_item)],
-                created_by_user_id=int(user.id),
+                created_by_user_id=int(wictory_user.id),
             )
             await message.answer(f"Добавлено: <code>{_resource_ident(int(item.id))}</code>", reply_markup=kb_wictory_bulk_next_actions())
         return
@@ -677,13 +639,12 @@ async def wictory_upload_screenshot(message: Message, session: AsyncSession, sta
 
     # For regular ESIM/LINK+ESIM creation, preserve media caption as resource text/comment.
     caption_txt = (message.caption or "").strip()
-    update_payload = {"screenshots": shots}
     if caption_txt and not data.get("item_edit_mode") and not data.get("invalid_edit_mode"):
         current_text = str(data.get("text_data") or "").strip()
         if not current_text:
-            update_payload["text_data"] = caption_txt
-
-    await state.update_data(**update_payload)
+            data["text_data"] = caption_txt
+    data["screenshots"] = shots
+    await state.set_data(data)
     invalid_item_id = data.get("invalid_item_id")
     if data.get("invalid_edit_mode") == "media" and invalid_item_id:
         kb = kb_wictory_invalid_edit_back_cancel(int(invalid_item_id))
@@ -695,51 +656,54 @@ async def wictory_upload_screenshot(message: Message, session: AsyncSession, sta
     )
 
 
-@router.callback_query(F.data == "wictory:upload_done")
-async def wictory_upload_screenshot_done_cb(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    if await state.get_state() != WictoryStates.upload_screenshot.state:
-        await cq.answer("Сейчас это недоступно", show_alert=True)
-        return
-
-    data = await state.get_data()
-    shots = list(data.get("screenshots") or [])
-    if not shots:
-        await cq.answer("Нужно добавить хотя бы 1 файл.", show_alert=True)
-        return
-
+async def _finish_media_edit(
+    session: AsyncSession, state: FSMContext, data: dict, wictory_user: UserAuth, shots: list[str]
+) -> str | None:
+    """Saves `shots` for a pending invalid-item/item media edit; returns the result text, or None if not editing."""
     if data.get("invalid_edit_mode") == "media" and data.get("invalid_item_id"):
         await wictory_update_invalid_item(
             session,
             item_id=int(data.get("invalid_item_id")),
-            wictory_user_id=int(user.id),
+            wictory_user_id=int(wictory_user.id),
             screenshots=shots,
         )
-        await state.clear()
-        await cq.answer("Медиа обновлены")
-        if cq.message:
-            await _safe_edit_or_answer(cq, "Медиа обновлены", reply_markup=kb_wictory_main_inline())
-        return
-
-    if data.get("item_edit_mode") == "media" and data.get("item_edit_id"):
+        done = "Медиа обновлены"
+    elif data.get("item_edit_mode") == "media" and data.get("item_edit_id"):
         await wictory_update_item(
             session,
             item_id=int(data.get("item_edit_id")),
-            wictory_user_id=int(user.id),
+            wictory_user_id=int(wictory_user.id),
             screenshots=shots,
         )
-        await state.clear()
-        await cq.answer("Esim обновлены")
+        done = "Esim обновлены"
+    else:
+        return None
+    await state.clear()
+    return done
+
+
+@router.callback_query(F.data == "wictory:upload_done")
+async def wictory_upload_screenshot_done_cb(cq: CallbackQuery, session: AsyncSession, state: FSMContext, wictory_user: UserAuth) -> None:
+    if await state.get_state() != WictoryStates.upload_screenshot.state:
+        await cq.answer("Сейчас это недоступно", show_alert=True)
+        return
+
+    data = await state.get_data()
+    shots = list(data.get("screenshots") or [])
+    if not shots:
+        await cq.answer("Нужно добавить хотя бы 1 файл.", show_alert=True)
+        return
+
+    done = await _finish_media_edit(session, state, data, wictory_user, shots)
+    if done:
+        await cq.answer(done)
         if cq.message:
-            await _safe_edit_or_answer(cq, "Esim обновлены", reply_markup=kb_wictory_main_inline())
+            await _safe_edit_or_answer(cq, done, reply_markup=kb_wictory_main_inline())
         return
 
     rtype = str(data.get("resource_type") or "")
     if rtype == "esim":
         await state.set_state(WictoryStates.preview)
-        data = await state.get_data()
         await cq.answer("Превью отправлено ниже")
         if cq.message:
             await _show_preview_from_callback(cq, data)
@@ -752,12 +716,9 @@ async def wictory_upload_screenshot_done_cb(cq: CallbackQuery, session: AsyncSes
 
 
 @router.message(WictoryStates.upload_screenshot, F.text)
-async def wictory_upload_screenshot_done(message: Message, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(message, session)
-    if not user:
-        return
+async def wictory_upload_screenshot_done(message: Message, session: AsyncSession, state: FSMContext, wictory_user: UserAuth) -> None:
+    data = await state.get_data()
     if (message.text or "").strip().lower() != "готово":
-        data = await state.get_data()
         item_edit_id = data.get("item_edit_id")
         invalid_item_id = data.get("invalid_item_id")
         if data.get("item_edit_mode") == "media" and item_edit_id:
@@ -771,37 +732,18 @@ async def wictory_upload_screenshot_done(message: Message, session: AsyncSession
             reply_markup=kb,
         )
         return
-    data = await state.get_data()
     shots = list(data.get("screenshots") or [])
     if not shots:
         await message.answer("Нужно добавить хотя бы 1 файл.")
         return
-    if data.get("invalid_edit_mode") == "media" and data.get("invalid_item_id"):
-        await wictory_update_invalid_item(
-            session,
-            item_id=int(data.get("invalid_item_id")),
-            wictory_user_id=int(user.id),
-            screenshots=shots,
-        )
-        await state.clear()
-        await message.answer("Медиа обновлены", reply_markup=kb_wictory_main_inline())
-        return
-
-    if data.get("item_edit_mode") == "media" and data.get("item_edit_id"):
-        await wictory_update_item(
-            session,
-            item_id=int(data.get("item_edit_id")),
-            wictory_user_id=int(user.id),
-            screenshots=shots,
-        )
-        await state.clear()
-        await message.answer("Esim обновлены", reply_markup=kb_wictory_main_inline())
+    done = await _finish_media_edit(session, state, data, wictory_user, shots)
+    if done:
+        await message.answer(done, reply_markup=kb_wictory_main_inline())
         return
 
     rtype = str(data.get("resource_type") or "")
     if rtype == "esim":
         await state.set_state(WictoryStates.preview)
-        data = await state.get_data()
         await _send_preview_message(message, data)
         return
 
@@ -811,9 +753,6 @@ async def wictory_upload_screenshot_done(message: Message, session: AsyncSession
 
 @router.callback_query(F.data == "wictory:bulk:add_more")
 async def wictory_bulk_add_more(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     data = await state.get_data()
     rtype = str(data.get("resource_type") or "")
     bulk_mode = bool(data.get("bulk_mode"))
@@ -834,9 +773,6 @@ async def wictory_bulk_add_more(cq: CallbackQuery, session: AsyncSession, state:
 
 @router.callback_query(F.data == "wictory:bulk:finish")
 async def wictory_bulk_finish(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     await state.clear()
     await cq.answer()
     if cq.message:
@@ -844,10 +780,7 @@ async def wictory_bulk_finish(cq: CallbackQuery, session: AsyncSession, state: F
 
 
 @router.message(WictoryStates.enter_bulk, F.text)
-async def wictory_enter_bulk(message: Message, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(message, session)
-    if not user:
-        return
+async def wictory_enter_bulk(message: Message, session: AsyncSession, state: FSMContext, wictory_user: UserAuth) -> None:
     data = await state.get_data()
     rtype = str(data.get("resource_type") or "")
     src = str(data.get("resource_source") or "TG").upper()
@@ -881,50 +814,35 @@ async def wictory_enter_bulk(message: Message, session: AsyncSession, state: FSM
         else:
             blocks.append(tail)
 
-    created = 0
-    for block in blocks:
-        if src == "ALL":
-            if not bank_id_fb or not bank_id_tg:
-                await message.answer("Не удалось определить банки для TG/FB. Начните создание заново.")
-                return
-            await create_resource_pool_item(
-                session,
-                source="ALL",
-                bank_id=bank_id_fb,
-                tg_bank_id=bank_id_tg,
-                resource_type=rtype,
-                text_data=block,
-                screenshots=[],
-                created_by_user_id=int(user.id),
-            )
-            created += 1
-        else:
-            await create_resource_pool_item(
-                session,
-                source=src,
-                bank_id=bank_id,
-                resource_type=rtype,
-                text_data=block,
-                screenshots=[],
-                created_by_user_id=int(user.id),
-            )
-            created += 1
+    if src == "ALL" and blocks and (not bank_id_fb or not bank_id_tg):
+        await message.answer("Не удалось определить банки для TG/FB. Начните создание заново.")
+        return
+    items = [
+        build_resource_pool_item(
+            source=src,
+            bank_id=bank_id_fb if src == "ALL" else bank_id,
+            tg_bank_id=bank_id_tg if src == "ALL" else None,
+            resource_type=rtype,
+            text_data=block,
+            screenshots=[],
+            created_by_user_id=int(wictory_user.id),
+        )
+        for block in blocks
+    ]
+    await create_resource_pool_items(session, items)
 
-    await message.answer(f"Добавлено массово: <b>{created}</b>", reply_markup=kb_wictory_bulk_next_actions())
+    await message.answer(f"Добавлено массово: <b>{len(items)}</b>", reply_markup=kb_wictory_bulk_next_actions())
 
 
 @router.message(WictoryStates.enter_data, F.text)
-async def wictory_enter_data(message: Message, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(message, session)
-    if not user:
-        return
+async def wictory_enter_data(message: Message, session: AsyncSession, state: FSMContext, wictory_user: UserAuth) -> None:
     data = await state.get_data()
     txt = (message.text or "").strip()
     if data.get("invalid_edit_mode") == "data" and data.get("invalid_item_id"):
         await wictory_update_invalid_item(
             session,
             item_id=int(data.get("invalid_item_id")),
-            wictory_user_id=int(user.id),
+            wictory_user_id=int(wictory_user.id),
             text_data=txt,
         )
         await state.clear()
@@ -950,7 +868,7 @@ async def wictory_enter_data(message: Message, session: AsyncSession, state: FSM
             await wictory_update_item(
                 session,
                 item_id=item_edit_id,
-                wictory_user_id=int(user.id),
+                wictory_user_id=int(wictory_user.id),
                 text_data=new_text,
             )
         await state.clear()
@@ -963,17 +881,14 @@ async def wictory_enter_data(message: Message, session: AsyncSession, state: FSM
             await message.answer("Ссылка обязательна. Введите ссылку.")
             return
 
-    await state.update_data(text_data=txt)
+    data["text_data"] = txt
     await state.set_state(WictoryStates.preview)
-    data = await state.get_data()
+    await state.set_data(data)
     await _send_preview_message(message, data)
 
 
 @router.callback_query(WictoryStates.preview, F.data == "wictory:edit")
 async def wictory_edit(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     await state.set_state(WictoryStates.edit_pick)
     await cq.answer()
     if cq.message:
@@ -983,56 +898,58 @@ async def wictory_edit(cq: CallbackQuery, session: AsyncSession, state: FSMConte
             await _safe_edit_or_answer(cq, "Что изменить?", reply_markup=kb_wictory_edit())
 
 
-@router.callback_query(WictoryStates.edit_pick, F.data.startswith("wictory:edit:"))
-async def wictory_edit_pick(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    action = (cq.data or "").split(":")[-1]
+async def _edit_pick_bank(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
+    await cq.answer()
     data = await state.get_data()
-    if action == "bank":
-        src = str(data.get("resource_source") or "TG")
-        if src.upper() == "ALL":
-            banks = await _list_banks_for_source(session, "FB")
-            items = _bank_items_with_source(banks, "FB")
-        else:
-            banks = await _list_banks_for_source(session, src)
-            items = _bank_items_with_source(banks, src)
-        await state.set_state(WictoryStates.pick_bank)
-        await state.update_data(bank_edit_mode=True)
-        await cq.answer()
-        if cq.message:
-            await cq.message.answer("Выберите банк:", reply_markup=kb_wictory_banks(items, back_cb="wictory:preview"))
-        return
-    if action == "data":
-        await state.set_state(WictoryStates.enter_data)
-        await cq.answer()
-        if cq.message:
-            await cq.message.answer(
-                "Введите нужные данные",
-                reply_markup=kb_wictory_back_cancel(back_cb="wictory:preview"),
-            )
-        return
-    if action == "screen":
-        await state.set_state(WictoryStates.upload_screenshot)
-        await cq.answer()
-        if cq.message:
-            await cq.message.answer(
-                "Отправьте скриншот",
-                reply_markup=kb_wictory_upload_actions(back_cb="wictory:preview"),
-            )
+    items = await _bank_picker_items(session, str(data.get("resource_source") or "TG"))
+    data["bank_edit_mode"] = True
+    await state.set_state(WictoryStates.pick_bank)
+    await state.set_data(data)
+    if cq.message:
+        await cq.message.answer("Выберите банк:", reply_markup=kb_wictory_banks(items, back_cb="wictory:preview"))
+
+
+async def _edit_pick_data(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
+    await state.set_state(WictoryStates.enter_data)
+    await cq.answer()
+    if cq.message:
+        await cq.message.answer(
+            "Введите нужные данные",
+            reply_markup=kb_wictory_back_cancel(back_cb="wictory:preview"),
+        )
+
+
+async def _edit_pick_screen(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
+    await state.set_state(WictoryStates.upload_screenshot)
+    await cq.answer()
+    if cq.message:
+        await cq.message.answer(
+            "Отправьте скриншот",
+            reply_markup=kb_wictory_upload_actions(back_cb="wictory:preview"),
+        )
+
+
+_EDIT_PICK_ACTIONS: dict[str, Callable[[CallbackQuery, AsyncSession, FSMContext], Awaitable[None]]] = {
+    "bank": _edit_pick_bank,
+    "data": _edit_pick_data,
+    "screen": _edit_pick_screen,
+}
+
+
+@router.callback_query(WictoryStates.edit_pick, WictoryEditCb.filter(F.action == "edit"))
+async def wictory_edit_pick(cq: CallbackQuery, callback_data: WictoryEditCb, session: AsyncSession, state: FSMContext) -> None:
+    action = _EDIT_PICK_ACTIONS.get(callback_data.field)
+    if action is not None:
+        await action(cq, session, state)
         return
     await state.set_state(WictoryStates.preview)
     await cq.answer("Превью отправлено ниже")
     if cq.message:
-        await _show_preview_from_callback(cq, data)
+        await _show_preview_from_callback(cq, await state.get_data())
 
 
 @router.callback_query(F.data == "wictory:preview")
 async def wictory_preview_show(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     data = await state.get_data()
     await state.set_state(WictoryStates.preview)
     await cq.answer("Превью отправлено ниже")
@@ -1041,10 +958,7 @@ async def wictory_preview_show(cq: CallbackQuery, session: AsyncSession, state:
 
 
 @router.callback_query(F.data == "wictory:confirm")
-async def wictory_confirm(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
+async def wictory_confirm(cq: CallbackQuery, session: AsyncSession, state: FSMContext, wictory_user: UserAuth) -> None:
     data = await state.get_data()
     if not data.get("bank_id"):
         await cq.answer("Не выбран банк", show_alert=True)
@@ -1054,7 +968,7 @@ async def wictory_confirm(cq: CallbackQuery, session: AsyncSession, state: FSMCo
         await cq.answer("Некорректный тип ресурса", show_alert=True)
         return
     created_item = None
-    src = str(data.get("resource_source") or getattr(user, "manager_source", None) or "TG").upper()
+    src = str(data.get("resource_source") or getattr(wictory_user, "manager_source", None) or "TG").upper()
     if src == "ALL":
         bank_id_fb = int(data.get("bank_id_fb") or data.get("bank_id") or 0)
         bank_id_tg = int(data.get("bank_id_tg") or 0)
@@ -1069,7 +983,7 @@ async def wictory_confirm(cq: CallbackQuery, session: AsyncSession, state: FSMCo
             resource_type=resource_type,
             text_data=data.get("text_data"),
             screenshots=list(data.get("screenshots") or []),
-            created_by_user_id=int(user.id),
+            created_by_user_id=int(wictory_user.id),
         )
     else:
         created_item = await create_resource_pool_item(
@@ -1079,7 +993,7 @@ async def wictory_confirm(cq: CallbackQuery, session: AsyncSession, state: FSMCo
             resource_type=resource_type,
             text_data=data.get("text_data"),
             screenshots=list(data.get("screenshots") or []),
-            created_by_user_id=int(user.id),
+            created_by_user_id=int(wictory_user.id),
         )
     await state.clear()
     await cq.answer()
@@ -1096,15 +1010,18 @@ async def wictory_confirm(cq: CallbackQuery, session: AsyncSession, state: FSMCo
 
 @router.callback_query(F.data == "wictory:invalid:list")
 async def wictory_invalid_list(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    items = await list_invalid_pool_items_for_wictory(session, wictory_user_id=int(user.id))
-    packed: list[tuple[int, str]] = []
-    for it in items:
-        bank = await get_bank(session, int(it.bank_id))
-        packed.append((int(it.id), f"{_resource_ident(int(it.id))} | {bank.name if bank else '—'} | {getattr(it.type, 'value', '—')}"))
     await cq.answer()
+    # the list is shared by all WICTORY users; committed pool writes drop it (see bot.pool_cache)
+    packed = get_cached_invalid_list()
+    if packed is None:
+        gen = pool_generation()
+        items = await list_invalid_pool_items_for_wictory(session)
+        banks = await get_banks_by_ids(session, (it.bank_id for it in items))
+        packed = tuple(
+            (int(it.id), f"{_resource_ident(int(it.id))} | {getattr(banks.get(int(it.bank_id)), 'name', None) or '—'} | {getattr(it.type, 'value', '—')}")
+            for it in items
+        )
+        cache_invalid_list(packed, gen)
     if cq.message:
         if not packed:
             await _safe_edit_or_answer(cq, "Невалидных записей нет", reply_markup=kb_wictory_main_inline())
@@ -1112,17 +1029,13 @@ async def wictory_invalid_list(cq: CallbackQuery, session: AsyncSession) -> None
         await _safe_edit_or_answer(cq, "Невалидные записи:", reply_markup=kb_wictory_invalid_list(packed))
 
 
-@router.callback_query(F.data.startswith("wictory:invalid:open:"))
-async def wictory_invalid_open(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
-    it = await get_pool_item(session, item_id)
+@router.callback_query(WictoryInvalidCb.filter((F.scope == "invalid") & (F.action == "open")))
+async def wictory_invalid_open(cq: CallbackQuery, callback_data: WictoryInvalidCb, session: AsyncSession, state: FSMContext) -> None:
+    item_id = callback_data.item_id
+    it, bank = await get_pool_item_with_bank(session, item_id)
     if not it or it.status != ResourceStatus.INVALID or not await _pool_item_is_wictory_created(session, it):
         await cq.answer("Запись не найдена", show_alert=True)
         return
-    bank = await get_bank(session, int(it.bank_id))
     history_chain = str(getattr(it, "usage_history", "") or "").strip() or "—"
     txt = (
         f"<b>Невалидная запись</b>\n"
@@ -1146,12 +1059,9 @@ async def wictory_invalid_open(cq: CallbackQuery, session: AsyncSession, state:
         await _safe_edit_or_answer(cq, txt, reply_markup=kb_wictory_invalid_actions(item_id, type_label=tlabel))
 
 
-@router.callback_query(F.data.startswith("wictory:invalid:edit_data:"))
-async def wictory_invalid_edit_data_start(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
+@router.callback_query(WictoryInvalidCb.filter((F.scope == "invalid") & (F.action == "edit_data")))
+async def wictory_invalid_edit_data_start(cq: CallbackQuery, callback_data: WictoryInvalidCb, session: AsyncSession, state: FSMContext) -> None:
+    item_id = callback_data.item_id
     await state.update_data(invalid_item_id=item_id, invalid_edit_mode="data")
     await state.set_state(WictoryStates.enter_data)
     await cq.answer()
@@ -1159,12 +1069,9 @@ async def wictory_invalid_edit_data_start(cq: CallbackQuery, session: AsyncSessi
         await _safe_edit_or_answer(cq, "Введите новые данные", reply_markup=kb_wictory_invalid_edit_back_cancel(item_id))
 
 
-@router.callback_query(F.data.startswith("wictory:invalid:edit_media:"))
-async def wictory_invalid_edit_media_start(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
+@router.callback_query(WictoryInvalidCb.filter((F.scope == "invalid") & (F.action == "edit_media")))
+async def wictory_invalid_edit_media_start(cq: CallbackQuery, callback_data: WictoryInvalidCb, session: AsyncSession, state: FSMContext) -> None:
+    item_id = callback_data.item_id
     await state.update_data(invalid_item_id=item_id, invalid_edit_mode="media", screenshots=[])
     await state.set_state(WictoryStates.upload_screenshot)
     await cq.answer()
@@ -1176,36 +1083,27 @@ async def wictory_invalid_edit_media_start(cq: CallbackQuery, session: AsyncSess
         )
 
 
-@router.callback_query(F.data.startswith("wictory:invalid:return:"))
-async def wictory_invalid_return(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
-    it = await wictory_update_invalid_item(session, item_id=item_id, wictory_user_id=int(user.id), set_free=True)
+@router.callback_query(WictoryInvalidCb.filter((F.scope == "invalid") & (F.action == "return")))
+async def wictory_invalid_return(cq: CallbackQuery, callback_data: WictoryInvalidCb, session: AsyncSession, wictory_user: UserAuth) -> None:
+    item_id = callback_data.item_id
+    it = await wictory_update_invalid_item(session, item_id=item_id, wictory_user_id=int(wictory_user.id), set_free=True)
     await cq.answer("Возвращено в общий пул" if it else "Не удалось", show_alert=not bool(it))
     if cq.message:
         await _safe_edit_or_answer(cq, "Запись возвращена в общий пул", reply_markup=kb_wictory_main_inline())
 
 
-@router.callback_query(F.data.startswith("wictory:invalid:delete:"))
-async def wictory_invalid_delete(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
-    ok = await wictory_delete_item(session, item_id=item_id, wictory_user_id=int(user.id))
+@router.callback_query(WictoryInvalidCb.filter((F.scope == "invalid") & (F.action == "delete")))
+async def wictory_invalid_delete(cq: CallbackQuery, callback_data: WictoryInvalidCb, session: AsyncSession, wictory_user: UserAuth) -> None:
+    item_id = callback_data.item_id
+    ok = await wictory_delete_item(session, item_id=item_id, wictory_user_id=int(wictory_user.id))
     await cq.answer("Удалено" if ok else "Не удалось удалить", show_alert=not bool(ok))
     if cq.message and ok:
         await _safe_edit_or_answer(cq, "Невалидная запись удалена", reply_markup=kb_wictory_main_inline())
 
 
 @router.callback_query(F.data == "wictory:items:list")
-async def wictory_items_list(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    items = await list_wictory_pool_items(session, wictory_user_id=int(user.id), limit=100)
+async def wictory_items_list(cq: CallbackQuery, session: AsyncSession, wictory_user: UserAuth) -> None:
+    items = await list_wictory_pool_items(session, wictory_user_id=int(wictory_user.id), limit=100)
     packed: list[tuple[int, str]] = []
     for it in items:
         bank_label = await _wictory_bank_label(session, it)
@@ -1241,9 +1139,6 @@ async def wictory_items_list(cq: CallbackQuery, session: AsyncSession) -> None:
 
 @router.callback_query(F.data == "wictory:items:legend")
 async def wictory_items_legend(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     await cq.answer()
     if cq.message:
         await cq.message.answer(
@@ -1259,10 +1154,7 @@ async def wictory_items_legend(cq: CallbackQuery, session: AsyncSession) -> None
 
 @router.callback_query(F.data.startswith("wictory:item:open:"))
 async def wictory_item_open(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
+    item_id = int((cq.data or "").rpartition(":")[2])
     it = await get_pool_item(session, item_id)
     if not it or not await _pool_item_is_wictory_created(session, it):
         await cq.answer("Запись не найдена", show_alert=True)
@@ -1326,10 +1218,7 @@ async def wictory_item_open(cq: CallbackQuery, session: AsyncSession, state: FSM
 
 @router.callback_query(F.data.startswith("wictory:item:edit_data:"))
 async def wictory_item_edit_data_start(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
+    item_id = int((cq.data or "").rpartition(":")[2])
     it = await get_pool_item(session, item_id)
     if not it or not await _pool_item_is_wictory_created(session, it):
         await cq.answer("Запись не найдена", show_alert=True)
@@ -1354,10 +1243,7 @@ async def wictory_item_edit_data_start(cq: CallbackQuery, session: AsyncSession,
 
 @router.callback_query(F.data.startswith("wictory:item:edit_comment:"))
 async def wictory_item_edit_comment_start(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
+    item_id = int((cq.data or "").rpartition(":")[2])
     it = await get_pool_item(session, item_id)
     if not it or not await _pool_item_is_wictory_created(session, it):
         await cq.answer("Запись не найдена", show_alert=True)
@@ -1374,10 +1260,7 @@ async def wictory_item_edit_comment_start(cq: CallbackQuery, session: AsyncSessi
 
 @router.callback_query(F.data.startswith("wictory:item:edit_link:"))
 async def wictory_item_edit_link_start(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
+    item_id = int((cq.data or "").rpartition(":")[2])
     it = await get_pool_item(session, item_id)
     if not it or not await _pool_item_is_wictory_created(session, it):
         await cq.answer("Запись не найдена", show_alert=True)
@@ -1394,10 +1277,7 @@ async def wictory_item_edit_link_start(cq: CallbackQuery, session: AsyncSession,
 
 @router.callback_query(F.data.startswith("wictory:item:edit_media:"))
 async def wictory_item_edit_media_start(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
+    item_id = int((cq.data or "").rpartition(":")[2])
     it = await get_pool_item(session, item_id)
     if not it or not await _pool_item_is_wictory_created(session, it):
         await cq.answer("Запись не найдена", show_alert=True)
@@ -1419,9 +1299,6 @@ async def wictory_item_edit_media_start(cq: CallbackQuery, session: AsyncSession
 
 @router.callback_query(F.data.startswith("wictory:item:media_pick:"))
 async def wictory_item_media_pick(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     parts = (cq.data or "").split(":")
     if len(parts) < 5:
         await cq.answer("Некорректная кнопка", show_alert=True)
@@ -1445,10 +1322,7 @@ async def wictory_item_media_pick(cq: CallbackQuery, session: AsyncSession, stat
 
 @router.callback_query(F.data.startswith("wictory:item:media_add:"))
 async def wictory_item_media_add(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
+    item_id = int((cq.data or "").rpartition(":")[2])
     await state.update_data(item_edit_id=item_id, item_edit_mode="media", replace_index=None)
     await cq.answer()
     if cq.message:
@@ -1461,10 +1335,7 @@ async def wictory_item_media_add(cq: CallbackQuery, session: AsyncSession, state
 
 @router.callback_query(F.data.startswith("wictory:item:edit_source:"))
 async def wictory_item_edit_source_start(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
+    item_id = int((cq.data or "").rpartition(":")[2])
     it = await get_pool_item(session, item_id)
     if not it or not await _pool_item_is_wictory_created(session, it):
         await cq.answer("Запись не найдена", show_alert=True)
@@ -1481,10 +1352,7 @@ async def wictory_item_edit_source_start(cq: CallbackQuery, session: AsyncSessio
 
 
 @router.callback_query(F.data.startswith("wictory:item:set_source:"))
-async def wictory_item_set_source(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
+async def wictory_item_set_source(cq: CallbackQuery, session: AsyncSession, wictory_user: UserAuth) -> None:
     parts = (cq.data or "").split(":")
     if len(parts) < 5:
         await cq.answer("Некорректные данные", show_alert=True)
@@ -1504,7 +1372,7 @@ async def wictory_item_set_source(cq: CallbackQuery, session: AsyncSession) -> N
     item_src = str(getattr(it, "source", "") or "").upper()
     update_kwargs = {
         "item_id": item_id,
-        "wictory_user_id": int(user.id),
+        "wictory_user_id": int(wictory_user.id),
         "source": src,
     }
     if item_src == "ALL":
@@ -1521,10 +1389,7 @@ async def wictory_item_set_source(cq: CallbackQuery, session: AsyncSession) -> N
 
 @router.callback_query(F.data.startswith("wictory:item:edit_bank:"))
 async def wictory_item_edit_bank_start(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
+    item_id = int((cq.data or "").rpartition(":")[2])
     it = await get_pool_item(session, item_id)
     if not it or not await _pool_item_is_wictory_created(session, it):
         await cq.answer("Запись не найдена", show_alert=True)
@@ -1542,8 +1407,7 @@ async def wictory_item_edit_bank_start(cq: CallbackQuery, session: AsyncSession)
                 reply_markup=kb_wictory_item_pick_bank_source(item_id),
             )
         return
-    banks = await _list_banks_for_source(session, getattr(it, "source", None))
-    items = _bank_items_with_source(banks, getattr(it, "source", None))
+    items = await _bank_picker_items(session, getattr(it, "source", None))
     await cq.answer()
     if cq.message:
         await _safe_edit_or_answer(cq, "Выберите новый банк:", reply_markup=kb_wictory_item_banks(items, item_id=item_id))
@@ -1551,9 +1415,6 @@ async def wictory_item_edit_bank_start(cq: CallbackQuery, session: AsyncSession)
 
 @router.callback_query(F.data.startswith("wictory:item:edit_bank_source:"))
 async def wictory_item_edit_bank_source(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     parts = (cq.data or "").split(":")
     if len(parts) < 5:
         await cq.answer("Некорректные данные", show_alert=True)
@@ -1570,8 +1431,7 @@ async def wictory_item_edit_bank_source(cq: CallbackQuery, session: AsyncSession
     if getattr(it.status, "value", "") not in {"free", "invalid"}:
         await cq.answer("Редактирование доступно только для FREE/INVALID", show_alert=True)
         return
-    banks = await _list_banks_for_source(session, bank_source)
-    items = _bank_items_with_source(banks, bank_source)
+    items = await _bank_picker_items(session, bank_source)
     await cq.answer()
     if cq.message:
         await _safe_edit_or_answer(
@@ -1582,10 +1442,7 @@ async def wictory_item_edit_bank_source(cq: CallbackQuery, session: AsyncSession
 
 
 @router.callback_query(F.data.startswith("wictory:item:set_bank:"))
-async def wictory_item_set_bank(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
+async def wictory_item_set_bank(cq: CallbackQuery, session: AsyncSession, wictory_user: UserAuth) -> None:
     parts = (cq.data or "").split(":")
     if len(parts) < 5:
         await cq.answer("Некорректные данные", show_alert=True)
@@ -1599,17 +1456,14 @@ async def wictory_item_set_bank(cq: CallbackQuery, session: AsyncSession) -> Non
     if getattr(it.status, "value", "") not in {"free", "invalid"}:
         await cq.answer("Редактирование доступно только для FREE/INVALID", show_alert=True)
         return
-    await wictory_update_item(session, item_id=item_id, wictory_user_id=int(user.id), bank_id=bank_id)
+    await wictory_update_item(session, item_id=item_id, wictory_user_id=int(wictory_user.id), bank_id=bank_id)
     await cq.answer("Банк обновлён")
     if cq.message:
         await _safe_edit_or_answer(cq, "Банк обновлён", reply_markup=kb_wictory_main_inline())
 
 
 @router.callback_query(F.data.startswith("wictory:item:set_bank_source:"))
-async def wictory_item_set_bank_source(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
+async def wictory_item_set_bank_source(cq: CallbackQuery, session: AsyncSession, wictory_user: UserAuth) -> None:
     parts = (cq.data or "").split(":")
     if len(parts) < 6:
         await cq.answer("Некорректные данные", show_alert=True)
@@ -1627,7 +1481,7 @@ async def wictory_item_set_bank_source(cq: CallbackQuery, session: AsyncSession)
     if getattr(it.status, "value", "") not in {"free", "invalid"}:
         await cq.answer("Редактирование доступно только для FREE/INVALID", show_alert=True)
         return
-    update_kwargs = {"item_id": item_id, "wictory_user_id": int(user.id)}
+    update_kwargs = {"item_id": item_id, "wictory_user_id": int(wictory_user.id)}
     if bank_source == "FB":
         update_kwargs["bank_id"] = bank_id
     else:
@@ -1639,12 +1493,9 @@ async def wictory_item_set_bank_source(cq: CallbackQuery, session: AsyncSession)
 
 
 @router.callback_query(F.data.startswith("wictory:item:delete:"))
-async def wictory_item_delete(cq: CallbackQuery, session: AsyncSession) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    item_id = int((cq.data or "").split(":")[-1])
-    ok = await wictory_delete_item(session, item_id=item_id, wictory_user_id=int(user.id))
+async def wictory_item_delete(cq: CallbackQuery, session: AsyncSession, wictory_user: UserAuth) -> None:
+    item_id = int((cq.data or "").rpartition(":")[2])
+    ok = await wictory_delete_item(session, item_id=item_id, wictory_user_id=int(wictory_user.id))
     await cq.answer("Удалено" if ok else "Нельзя удалить (в работе или не найдено)", show_alert=not ok)
     if cq.message:
         await _safe_edit_or_answer(cq, "Готово", reply_markup=kb_wictory_main_inline())
@@ -1652,9 +1503,6 @@ async def wictory_item_delete(cq: CallbackQuery, session: AsyncSession) -> None:
 
 @router.callback_query(F.data == "wictory:item:cancel_edit")
 async def wictory_item_cancel_edit(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     await state.clear()
     await cq.answer("Редактирование отменено")
     if cq.message:
@@ -1664,6 +1512,22 @@ async def wictory_item_cancel_edit(cq: CallbackQuery, session: AsyncSession, sta
             await cq.message.answer("Меню <b>WICTORY</b>", reply_markup=kb_wictory_main_inline())
 
 
+_STATS_COUNTERS = ("link", "esim", "link_esim", "free", "assigned", "used", "invalid")
+_STATS_BANK_TMPL = (
+    "\n<b>{idx}. {name} ({source})</b>\n"
+    "• Типы: 🔗 {link} | 📱 {esim} | 🔗+📱 {link_esim}\n"
+    "• Статусы: 🟡 {free} | 🟢 {assigned} | ✅ {used} | 🔴 {invalid}"
+)
+_STATS_TOTAL_TMPL = (
+    "\n━━━━━━━━━━━━━━\n<b>ИТОГО</b>\n"
+    "Типы: 🔗 {link} | 📱 {esim} | 🔗+📱 {link_esim}\n"
+    "Статусы: 🟡 {free} | 🟢 {assigned} | ✅ {used} | 🔴 {invalid}"
+)
+STATS_TEXT_TTL_SECONDS = 5.0
+# filters key -> (monotonic expiry, pool generation, rendered text)
+_STATS_TEXT_CACHE: dict[tuple, tuple[float, int, str]] = {}
+
+
 def _read_stats_filters(data: dict) -> tuple[set[str], set[int], str, set[str], set[str]]:
     src = {str(x).upper() for x in (data.get("stats_sources") or [])}
     banks = {int(x) for x in (data.get("stats_bank_ids") or [])}
@@ -1694,7 +1558,7 @@ async def _render_stats_text(session: AsyncSession, data: dict) -> str:
         limit=3000,
     )
 
-    bank_map = {int(b.id): b for b in await list_banks(session)}
+    bank_names = dict(await list_bank_items_cached(session))
     grouped: dict[tuple[int, str], dict[str, int]] = {}
     for it in items:
         key = (int(it.bank_id), str(getattr(it, "source", "TG")).upper())
@@ -1710,48 +1574,39 @@ async def _render_stats_text(session: AsyncSession, data: dict) -> str:
     filt_lines.append(f"• Статус: {', '.join(sorted(statuses)) if statuses else 'все'}")
     filt_lines.append(f"• Тип: {', '.join(sorted(types)) if types else 'все'}")
 
-    lines = ["🏦 <b>Пул по банкам</b>", "<blockquote expandable>" + "\n".join(filt_lines) + "</blockquote>"]
+    head = "🏦 <b>Пул по банкам</b>\n<blockquote expandable>" + "\n".join(filt_lines) + "</blockquote>"
     if not grouped:
-        lines.append("\nПул пуст по выбранным фильтрам.")
-        return "\n".join(lines)
-
-    total_link = total_esim = total_combo = 0
-    total_free = total_assigned = total_used = total_invalid = 0
-    idx = 0
-    for (bank_id, source), st in sorted(grouped.items(), key=lambda x: (-x[1]["total"], x[0][0], x[0][1])):
-        idx += 1
-        bank_name = getattr(bank_map.get(bank_id), "name", "—")
-        total_link += st["link"]
-        total_esim += st["esim"]
-        total_combo += st["link_esim"]
-        total_free += st["free"]
-        total_assigned += st["assigned"]
-        total_used += st["used"]
-        total_invalid += st["invalid"]
-        lines.extend([
-            "",
-            f"<b>{idx}. {bank_name} ({source})</b>",
-            f"• Типы: 🔗 {st['link']} | 📱 {st['esim']} | 🔗+📱 {st['link_esim']}",
-            f"• Статусы: 🟡 {st['free']} | 🟢 {st['assigned']} | ✅ {st['used']} | 🔴 {st['invalid']}",
-        ])
-
-    lines.extend([
-        "",
-        "━━━━━━━━━━━━━━",
-        "<b>ИТОГО</b>",
-        f"Типы: 🔗 {total_link} | 📱 {total_esim} | 🔗+📱 {total_combo}",
-        f"Статусы: 🟡 {total_free} | 🟢 {total_assigned} | ✅ {total_used} | 🔴 {total_invalid}",
-    ])
-    return "\n".join(lines)
+        return head + "\n\nПул пуст по выбранным фильтрам."
+
+    rows = sorted(grouped.items(), key=lambda x: (-x[1]["total"], x[0][0], x[0][1]))
+    totals = {k: sum(st[k] for _, st in rows) for k in _STATS_COUNTERS}
+    body = "\n".join(
+        _STATS_BANK_TMPL.format(idx=idx, name=bank_names.get(bank_id, "—"), source=source, **st)
+        for idx, ((bank_id, source), st) in enumerate(rows, start=1)
+    )
+    return f"{head}\n{body}\n{_STATS_TOTAL_TMPL.format(**totals)}"
+
+
+async def _render_stats_text_cached(session: AsyncSession, data: dict) -> str:
+    # aggregate counts over up to 3000 rows: reuse the text until it expires or the pool is written
+    src, banks, date_mode, statuses, types = _read_stats_filters(data)
+    key = (frozenset(src), frozenset(banks), date_mode, frozenset(statuses), frozenset(types))
+    now = time.monotonic()
+    gen = pool_generation()
+    hit = _STATS_TEXT_CACHE.get(key)
+    if hit is not None and hit[0] > now and hit[1] == gen:
+        return hit[2]
+    txt = await _render_stats_text(session, data)
+    if len(_STATS_TEXT_CACHE) >= 256:
+        _STATS_TEXT_CACHE.clear()
+    _STATS_TEXT_CACHE[key] = (now + STATS_TEXT_TTL_SECONDS, gen, txt)
+    return txt
 
 
 @router.callback_query(F.data == "wictory:stats")
 async def wictory_stats(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     data = await state.get_data()
-    txt = await _render_stats_text(session, data)
+    txt = await _render_stats_text_cached(session, data)
     await cq.answer()
     if cq.message:
         await _safe_edit_or_answer(cq, txt, reply_markup=kb_wictory_stats_main())
@@ -1774,9 +1629,6 @@ def _filters_summary_text(data: dict) -> str:
 
 @router.callback_query(F.data == "wictory:stats:filters")
 async def wictory_stats_filters(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     await cq.answer()
     if cq.message:
         await _safe_edit_or_answer(cq, _filters_summary_text(await state.get_data()), reply_markup=kb_wictory_stats_filters_main())
@@ -1784,9 +1636,6 @@ async def wictory_stats_filters(cq: CallbackQuery, session: AsyncSession, state:
 
 @router.callback_query(F.data == "wictory:stats:filters:source")
 async def wictory_stats_filters_source(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     data = await state.get_data()
     src, _, _, _, _ = _read_stats_filters(data)
     await cq.answer()
@@ -1796,9 +1645,6 @@ async def wictory_stats_filters_source(cq: CallbackQuery, session: AsyncSession,
 
 @router.callback_query(F.data == "wictory:stats:filters:status")
 async def wictory_stats_filters_status(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     data = await state.get_data()
     _, _, _, statuses, _ = _read_stats_filters(data)
     await cq.answer()
@@ -1808,9 +1654,6 @@ async def wictory_stats_filters_status(cq: CallbackQuery, session: AsyncSession,
 
 @router.callback_query(F.data == "wictory:stats:filters:type")
 async def wictory_stats_filters_type(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     data = await state.get_data()
     _, _, _, _, types = _read_stats_filters(data)
     await cq.answer()
@@ -1820,9 +1663,6 @@ async def wictory_stats_filters_type(cq: CallbackQuery, session: AsyncSession, s
 
 @router.callback_query(F.data == "wictory:stats:filters:date")
 async def wictory_stats_filters_date(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     data = await state.get_data()
     _, _, date_mode, _, _ = _read_stats_filters(data)
     await cq.answer()
@@ -1832,13 +1672,9 @@ async def wictory_stats_filters_date(cq: CallbackQuery, session: AsyncSession, s
 
 @router.callback_query(F.data == "wictory:stats:filters:bank")
 async def wictory_stats_filters_bank(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     data = await state.get_data()
     _, bank_ids, _, _, _ = _read_stats_filters(data)
-    banks = await list_banks(session)
-    items = [(int(b.id), b.name) for b in banks]
+    items = await list_bank_items_cached(session)
     await cq.answer()
     if cq.message:
         await _safe_edit_or_answer(cq, _filters_summary_text(data), reply_markup=kb_wictory_stats_filter_bank(items, bank_ids))
@@ -1846,10 +1682,7 @@ async def wictory_stats_filters_bank(cq: CallbackQuery, session: AsyncSession, s
 
 @router.callback_query(F.data.startswith("wictory:stats:toggle:source:"))
 async def wictory_stats_toggle_source(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    val = (cq.data or "").split(":")[-1].upper()
+    val = (cq.data or "").rpartition(":")[2].upper()
     data = await state.get_data()
     src, _, _, _, _ = _read_stats_filters(data)
     if val in src:
@@ -1865,10 +1698,7 @@ async def wictory_stats_toggle_source(cq: CallbackQuery, session: AsyncSession,
 
 @router.callback_query(F.data.startswith("wictory:stats:toggle:status:"))
 async def wictory_stats_toggle_status(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    val = (cq.data or "").split(":")[-1].lower()
+    val = (cq.data or "").rpartition(":")[2].lower()
     data = await state.get_data()
     _, _, _, statuses, _ = _read_stats_filters(data)
     if val in statuses:
@@ -1884,10 +1714,7 @@ async def wictory_stats_toggle_status(cq: CallbackQuery, session: AsyncSession,
 
 @router.callback_query(F.data.startswith("wictory:stats:toggle:type:"))
 async def wictory_stats_toggle_type(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    val = (cq.data or "").split(":")[-1].lower()
+    val = (cq.data or "").rpartition(":")[2].lower()
     data = await state.get_data()
     _, _, _, _, types = _read_stats_filters(data)
     if val in types:
@@ -1903,10 +1730,7 @@ async def wictory_stats_toggle_type(cq: CallbackQuery, session: AsyncSession, st
 
 @router.callback_query(F.data.startswith("wictory:stats:toggle:bank:"))
 async def wictory_stats_toggle_bank(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    bid = int((cq.data or "").split(":")[-1])
+    bid = int((cq.data or "").rpartition(":")[2])
     data = await state.get_data()
     _, bank_ids, _, _, _ = _read_stats_filters(data)
     if bid in bank_ids:
@@ -1914,8 +1738,7 @@ async def wictory_stats_toggle_bank(cq: CallbackQuery, session: AsyncSession, st
     else:
         bank_ids.add(bid)
     await state.update_data(stats_bank_ids=sorted(bank_ids))
-    banks = await list_banks(session)
-    items = [(int(b.id), b.name) for b in banks]
+    items = await list_bank_items_cached(session)
     await cq.answer("Обновлено")
     if cq.message:
         data = await state.get_data()
@@ -1924,10 +1747,7 @@ async def wictory_stats_toggle_bank(cq: CallbackQuery, session: AsyncSession, st
 
 @router.callback_query(F.data.startswith("wictory:stats:set_date:"))
 async def wictory_stats_set_date(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    mode = (cq.data or "").split(":")[-1]
+    mode = (cq.data or "").rpartition(":")[2]
     if mode not in {"all", "today", "7d", "30d"}:
         await cq.answer("Некорректная дата", show_alert=True)
         return
@@ -1940,9 +1760,6 @@ async def wictory_stats_set_date(cq: CallbackQuery, session: AsyncSession, state
 
 @router.callback_query(F.data == "wictory:stats:reset")
 async def wictory_stats_reset(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
     await state.update_data(stats_sources=[], stats_bank_ids=[], stats_date="all", stats_statuses=[], stats_types=[])
     await cq.answer("Фильтры сброшены")
     if cq.message:
@@ -1951,10 +1768,7 @@ async def wictory_stats_reset(cq: CallbackQuery, session: AsyncSession, state: F
 
 @router.callback_query(F.data == "wictory:stats:apply")
 async def wictory_stats_apply(cq: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _wictory_guard(cq, session)
-    if not user:
-        return
-    txt = await _render_stats_text(session, await state.get_data())
+    txt = await _render_stats_text_cached(session, await state.get_data())
     await cq.answer("Готово")
     if cq.message:
         await _safe_edit_or_answer(cq, txt, reply_markup=kb_wictory_stats_main())
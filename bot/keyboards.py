@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 
@@ -10,10 +14,121 @@ from bot.callbacks import (
     FormEditCb,
     FormReviewCb,
     TeamLeadMenuCb,
+    WictoryAddCb,
+    WictoryBankCb,
+    WictoryEditCb,
+    WictoryInvalidCb,
+)
+from bot.utils import format_access_status, format_bank_hashtag, format_form_status, media_kind
+
+_ROLE_EMOJI = {
+    "DEVELOPER": "👨‍💻",
+    "TEAM_LEAD": "👑",
+    "DROP_MANAGER": "🎯",
+    "PENDING": "⏳",
+}
+_FORM_STATUS_EMOJI = {
+    "IN_PROGRESS": "⏳",
+    "PENDING": "📨",
+    "APPROVED": "✅",
+    "REJECTED": "❌",
+}
+_ACCESS_STATUS_EMOJI = {
+    "PENDING": "⏳",
+    "APPROVED": "✅",
+    "REJECTED": "❌",
+}
+_SRC_ICON = {"TG": "✈️", "FB": "📘"}
+_TRAFFIC_LABEL = {"DIRECT": "Прямой", "REFERRAL": "Сарафан"}
+
+# callback_data prefixes of per-row buttons in list keyboards
+_CB_MY_FORM_OPEN = "dm:my_form_open:"
+_CB_TL_LIVE_OPEN = "tl:live_open:"
+_CB_DEV_GROUP_OPEN = "dev:group:open:"
+_CB_DEV_SELECT_USER = "dev:select_user:"
+_CB_DEV_SELECT_FORM = "dev:select_form:"
+_CB_DEV_SELECT_REQ = "dev:select_req:"
+_CB_DM_BANK = "dm:bank:"
+_CB_DM_BANK_ID = "dm:bank_id:"
+_CB_EDIT_BANK_PICK = "dm_edit:bank_pick:"
+_CB_EDIT_BANK_PICK_ID = "dm_edit:bank_pick_id:"
+_CB_RESOURCE_BANK = "dm:resource_bank:"
+_CB_RESOURCE_ACTIVE_OPEN = "dm:resource_active_open:"
+_CB_RESOURCE_ATTACH_PICK = "dm:resource_attach_pick:"
+_CB_RESOURCE_USED_OPEN = "dm:resource_used_open:"
+_CB_WICTORY_ITEM_OPEN = "wictory:item:open:"
+
+
+# Packed CallbackData strings of the buttons repeated across form/request views; pack()
+# builds and validates a model each time, the result only depends on these arguments.
+@lru_cache(maxsize=2048)
+def _form_edit_open_cb(form_id: int) -> str:
+    return FormEditCb(action="open", form_id=form_id).pack()
+
+
+@lru_cache(maxsize=2048)
+def _access_request_cb(action: str, tg_id: int) -> str:
+    return AccessRequestCb(action=action, tg_id=tg_id).pack()
+
+
+@lru_cache(maxsize=2048)
+def _form_review_cb(action: str, form_id: int) -> str:
+    return FormReviewCb(action=action, form_id=form_id).pack()
+
+
+_TL_MENU_HOME_CB = TeamLeadMenuCb(action="home").pack()
+_TL_MENU_LIVE_CB = TeamLeadMenuCb(action="live").pack()
+_TL_MENU_BANKS_CB = TeamLeadMenuCb(action="banks").pack()
+_TL_MENU_DUPLICATES_CB = TeamLeadMenuCb(action="duplicates").pack()
+_TL_MENU_USERS_CB = TeamLeadMenuCb(action="users").pack()
+_BANK_CREATE_CB = BankCb(action="create", bank_id=None).pack()
+
+
+_FILTER_ITEMS = (
+    ("Сегодня", "today"),
+    ("Вчера", "yesterday"),
+    ("Текущая неделя", "week"),
+    ("Последние 7 дней", "last7"),
+    ("Текущий месяц", "month"),
+    ("Предыдущий месяц", "prev_month"),
+    ("Последние 30 дней", "last30"),
+    ("Текущий год", "year"),
+    ("За все время", "all"),
 )
-from bot.utils import format_access_status, format_bank_hashtag, format_form_status, unpack_media_item
 
 
+def _build_filter_menu(current: str | None, *, set_prefix: str, custom_cb: str, back_cb: str) -> InlineKeyboardMarkup:
+    """Date-period filter menu shared by the forms/duplicates/attach screens; marks `current`."""
+    cur = (current or "today").lower()
+    b = InlineKeyboardBuilder()
+    for title, key in _FILTER_ITEMS:
+        prefix = "✅ " if key == cur else ""
+        b.button(text=f"{prefix}{title}", callback_data=set_prefix + key)
+    b.button(text="Интервал дат", callback_data=custom_cb)
+    b.button(text="⬅️ Назад", callback_data=back_cb)
+    b.adjust(1)
+    return b.as_markup()
+
+
+def _btn(text: str, cb: str) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text=text, callback_data=cb)
+
+
+def _adjust_rows(buttons: list[InlineKeyboardButton], *sizes: int) -> list[list[InlineKeyboardButton]]:
+    """Groups buttons into rows like builder.adjust(*sizes): sizes apply in order, the last one repeats."""
+    rows: list[list[InlineKeyboardButton]] = []
+    pos = 0
+    for size in sizes[:-1]:
+        if pos >= len(buttons):
+            return rows
+        rows.append(buttons[pos : pos + size])
+        pos += size
+    last = sizes[-1]
+    rows.extend(buttons[j : j + last] for j in range(pos, len(buttons), last))
+    return rows
+
+
+@lru_cache(maxsize=1)
 def kb_drop_main() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Начать работу"))
@@ -22,6 +137,7 @@ def kb_drop_main() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def kb_drop_shift_active() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Создать анкету"))
@@ -32,48 +148,41 @@ def kb_drop_shift_active() -> ReplyKeyboardMarkup:
 
 
 def kb_yes_no(confirm_action: str, cancel_action: str) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    b.add(InlineKeyboardButton(text="Да", callback_data=confirm_action))
-    b.add(InlineKeyboardButton(text="Нет", callback_data=cancel_action))
-    b.adjust(2)
-    return b.as_markup()
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                _btn("Да", confirm_action),
+                _btn("Нет", cancel_action),
+            ]
+        ]
+    )
 
 
+@lru_cache(maxsize=16)
 def kb_dm_forms_filter_menu(*, current: str | None) -> InlineKeyboardMarkup:
-    cur = (current or "today").lower()
-    b = InlineKeyboardBuilder()
-    items = [
-        ("Сегодня", "today"),
-        ("Вчера", "yesterday"),
-        ("Текущая неделя", "week"),
-        ("Последние 7 дней", "last7"),
-        ("Текущий месяц", "month"),
-        ("Предыдущий месяц", "prev_month"),
-        ("Последние 30 дней", "last30"),
-        ("Текущий год", "year"),
-        ("За все время", "all"),
-    ]
-    for title, key in items:
-        prefix = "✅ " if key == cur else ""
-        b.button(text=f"{prefix}{title}", callback_data=f"dm:my_forms_filter_set:{key}")
-    b.button(text="Интервал дат", callback_data="dm:my_forms_filter_custom")
-    b.button(text="⬅️ Назад", callback_data="dm:menu")
-    b.adjust(1)
-    return b.as_markup()
+    return _build_filter_menu(
+        current,
+        set_prefix="dm:my_forms_filter_set:",
+        custom_cb="dm:my_forms_filter_custom",
+        back_cb="dm:menu",
+    )
+
+
+@lru_cache(maxsize=1024)
+def _my_form_btn(form_id: int, bank_name: str | None, status: str | None) -> InlineKeyboardButton:
+    # the list is re-rendered on every visit; a form's button only changes with its bank/status
+    return _btn(f"#{form_id} {format_bank_hashtag(bank_name or '—')} ({format_form_status(status)})", _CB_MY_FORM_OPEN + str(form_id))
 
 
 def kb_dm_my_forms_list(forms: list) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    for f in forms[:40]:
-        bank = getattr(f, "bank_name", None) or "—"
-        status = format_form_status(getattr(f, "status", None))
-        b.button(text=f"#{f.id} {format_bank_hashtag(bank)} ({status})", callback_data=f"dm:my_form_open:{int(f.id)}")
-    b.button(text="📅 Фильтр", callback_data="dm:my_forms_filter")
-    b.button(text="⬅️ Назад", callback_data="dm:menu")
-    b.adjust(1)
-    return b.as_markup()
+    # one button per row: build the rows directly instead of Builder + adjust(1)
+    rows = [[_my_form_btn(int(f.id), f.bank_name, f.status)] for f in islice(forms, 40)]
+    rows.append([_btn("📅 Фильтр", "dm:my_forms_filter")])
+    rows.append([_btn("⬅️ Назад", "dm:menu")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@lru_cache(maxsize=1024)
 def kb_dm_my_form_open(form_id: int, *, in_progress: bool = False) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     if in_progress:
@@ -83,13 +192,14 @@ def kb_dm_my_form_open(form_id: int, *, in_progress: bool = False) -> InlineKeyb
         b.adjust(1, 2)
         return b.as_markup()
     b.button(text="Отправить", callback_data=f"dm:my_form_send:{int(form_id)}")
-    b.button(text="Редактировать", callback_data=FormEditCb(action="open", form_id=form_id).pack())
+    b.button(text="Редактировать", callback_data=_form_edit_open_cb(form_id))
     b.button(text="Удалить", callback_data=f"dm:my_form_delete:{int(form_id)}")
     b.button(text="⬅️ Назад", callback_data="dm:my_forms")
     b.adjust(2, 1, 1)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dm_payment_card(form_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="КАРТА ДЛЯ ОПЛАТЫ", callback_data=f"dm:pay_card:{int(form_id)}")
@@ -97,6 +207,7 @@ def kb_dm_payment_card(form_id: int) -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dm_payment_card_with_back(form_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="КАРТА ДЛЯ ОПЛАТЫ", callback_data=f"dm:pay_card:{int(form_id)}")
@@ -107,7 +218,7 @@ def kb_dm_payment_card_with_back(form_id: int) -> InlineKeyboardMarkup:
 
 def kb_dm_approved_attach_type_pick(form_id: int, available_types: list[str] | tuple[str, ...]) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    picked = [str(t).lower() for t in (available_types or [])]
+    picked = [str(t).lower() for t in (available_types or ())]
     if "link" in picked:
         b.button(text="Ссылка", callback_data=f"dm:approved_attach_type:{int(form_id)}:link")
     if "esim" in picked:
@@ -121,7 +232,7 @@ def kb_dm_approved_attach_type_pick(form_id: int, available_types: list[str] | t
 
 def kb_dm_approved_attach_item_pick(form_id: int, items: list[tuple[int, str]]) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for item_id, title in (items or [])[:30]:
+    for item_id, title in islice(items or (), 30):
         b.button(text=title, callback_data=f"dm:approved_attach_pick:{int(form_id)}:{int(item_id)}")
     b.button(text="⬅️ Назад", callback_data=f"dm:approved_attach:{int(form_id)}")
     b.adjust(1)
@@ -136,6 +247,7 @@ def kb_dm_post_payment_actions(form_id: int, *, can_attach: bool) -> InlineKeybo
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dm_payment_next_actions(form_id: int | None = None) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Добавить карту", callback_data="dm:pay_add_card")
@@ -146,14 +258,16 @@ def kb_dm_payment_next_actions(form_id: int | None = None) -> InlineKeyboardMark
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_access_request(tg_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.button(text="✅ Апрув", callback_data=AccessRequestCb(action="approve", tg_id=tg_id).pack())
-    b.button(text="❌ Отклонить", callback_data=AccessRequestCb(action="reject", tg_id=tg_id).pack())
+    b.button(text="✅ Апрув", callback_data=_access_request_cb("approve", tg_id))
+    b.button(text="❌ Отклонить", callback_data=_access_request_cb("reject", tg_id))
     b.adjust(2)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_dm_source_pick_inline() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="TG", callback_data="dm:src:TG")
@@ -162,6 +276,7 @@ def kb_dm_source_pick_inline() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_traffic_type() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Прямой"))
@@ -170,9 +285,10 @@ def kb_traffic_type() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
-DEFAULT_BANKS = ["Пумб", "Моно", "Альянс", "Фрибанк", "Майбанк"]
+DEFAULT_BANKS = ("Пумб", "Моно", "Альянс", "Фрибанк", "Майбанк")
 
 
+@lru_cache(maxsize=1)
 def kb_bank_select() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     for name in DEFAULT_BANKS:
@@ -182,12 +298,15 @@ def kb_bank_select() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def kb_done() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Готово"))
     return b.as_markup(resize_keyboard=True)
 
 
+# kb_back_dm and kb_back_with_main are the same one-time "Назад" keyboard and return this one
+@lru_cache(maxsize=1)
 def kb_back() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Назад"))
@@ -195,6 +314,7 @@ def kb_back() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def kb_start_only() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Старт"))
@@ -202,19 +322,14 @@ def kb_start_only() -> ReplyKeyboardMarkup:
 
 
 def kb_back_dm() -> ReplyKeyboardMarkup:
-    b = ReplyKeyboardBuilder()
-    b.add(KeyboardButton(text="Назад"))
-    b.adjust(1)
-    return b.as_markup(resize_keyboard=True, one_time_keyboard=True)
+    return kb_back()
 
 
 def kb_back_with_main() -> ReplyKeyboardMarkup:
-    b = ReplyKeyboardBuilder()
-    b.add(KeyboardButton(text="Назад"))
-    b.adjust(1)
-    return b.as_markup(resize_keyboard=True, one_time_keyboard=True)
+    return kb_back()
 
 
+@lru_cache(maxsize=1)
 def kb_traffic_type_with_back() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Прямой"))
@@ -224,6 +339,7 @@ def kb_traffic_type_with_back() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def kb_bank_select_with_back() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     for name in DEFAULT_BANKS:
@@ -234,63 +350,74 @@ def kb_bank_select_with_back() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def kb_form_confirm() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.add(InlineKeyboardButton(text="Отправить", callback_data="form_submit"))
-    b.add(InlineKeyboardButton(text="Отмена", callback_data="form_cancel"))
+    b.add(_btn("Отправить", "form_submit"))
+    b.add(_btn("Отмена", "form_cancel"))
     b.adjust(2)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_form_confirm_with_edit(form_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.add(InlineKeyboardButton(text="Отправить", callback_data="form_submit"))
-    b.add(InlineKeyboardButton(text="Редактировать", callback_data=FormEditCb(action="open", form_id=form_id).pack()))
-    b.add(InlineKeyboardButton(text="Отмена", callback_data="form_cancel"))
+    b.add(_btn("Отправить", "form_submit"))
+    b.add(_btn("Редактировать", _form_edit_open_cb(form_id)))
+    b.add(_btn("Отмена", "form_cancel"))
     b.adjust(2, 1)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_form_review(form_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.button(text="✅ Подтвердить", callback_data=FormReviewCb(action="approve", form_id=form_id).pack())
-    b.button(text="❌ Отклонить", callback_data=FormReviewCb(action="reject", form_id=form_id).pack())
+    b.button(text="✅ Подтвердить", callback_data=_form_review_cb("approve", form_id))
+    b.button(text="❌ Отклонить", callback_data=_form_review_cb("reject", form_id))
     b.adjust(2)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_form_review_with_back(form_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.button(text="✅ Подтвердить", callback_data=FormReviewCb(action="approve", form_id=form_id).pack())
-    b.button(text="❌ На корректировку", callback_data=FormReviewCb(action="reject", form_id=form_id).pack())
-    b.button(text="⬅️ Назад", callback_data=TeamLeadMenuCb(action="live").pack())
+    b.button(text="✅ Подтвердить", callback_data=_form_review_cb("approve", form_id))
+    b.button(text="❌ На корректировку", callback_data=_form_review_cb("reject", form_id))
+    b.button(text="⬅️ Назад", callback_data=_TL_MENU_LIVE_CB)
     b.adjust(2, 1)
     return b.as_markup()
 
 
-def kb_tl_live_list(forms: list) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    for f in forms[:30]:
-        bank = getattr(f, "bank_name", None) or "—"
-        b.button(text=f"#{int(f.id)} {bank}", callback_data=f"tl:live_open:{int(f.id)}")
-    b.button(text="🏠 Меню", callback_data=TeamLeadMenuCb(action="home").pack())
-    b.adjust(1)
-    return b.as_markup()
+@lru_cache(maxsize=64)
+def kb_tl_live_list(items: tuple[tuple[int, str | None], ...]) -> InlineKeyboardMarkup:
+    """
+    `items` is a hashable tuple of (form_id, bank_name) pairs, so an unchanged queue
+    reuses the already built markup. Callers must not mutate the returned markup.
+    """
+    rows = [
+        [_btn(f"#{form_id} {bank_name or '—'}", _CB_TL_LIVE_OPEN + str(form_id))]
+        for form_id, bank_name in islice(items, 30)
+    ]
+    rows.append([_btn("🏠 Меню", _TL_MENU_HOME_CB)])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@lru_cache(maxsize=1024)
 def kb_edit_open(form_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.button(text="Изменить", callback_data=FormEditCb(action="open", form_id=form_id).pack())
+    b.button(text="Изменить", callback_data=_form_edit_open_cb(form_id))
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dm_reject_notice(form_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.button(text="Перейти", callback_data=FormEditCb(action="open", form_id=form_id).pack())
+    b.button(text="Перейти", callback_data=_form_edit_open_cb(form_id))
     b.adjust(1)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dm_edit_actions_inline(form_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Тип клиента", callback_data=f"dm_edit:field:{form_id}:traffic_type")
@@ -311,8 +438,8 @@ def kb_dm_edit_screens_inline(form_id: int, screenshots: list[str]) -> InlineKey
     shot_i = 0
     doc_i = 0
     vid_i = 0
-    for i, raw in enumerate(list(screenshots or [])):
-        kind, _ = unpack_media_item(str(raw))
+    for i, raw in enumerate(screenshots or ()):
+        kind = media_kind(raw if isinstance(raw, str) else str(raw))
         if kind == "doc":
             doc_i += 1
             title = f"Файл {doc_i}"
@@ -329,6 +456,7 @@ def kb_dm_edit_screens_inline(form_id: int, screenshots: list[str]) -> InlineKey
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_edit_fields() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Тип клиента"))
@@ -343,6 +471,7 @@ def kb_edit_fields() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def kb_team_lead_main() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Лайв анкеты"))
@@ -351,6 +480,7 @@ def kb_team_lead_main() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def kb_developer_main() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Заявки"))
@@ -361,6 +491,7 @@ def kb_developer_main() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def kb_developer_start() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Старт"))
@@ -368,6 +499,7 @@ def kb_developer_start() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def kb_developer_with_back() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Заявки"))
@@ -379,6 +511,7 @@ def kb_developer_with_back() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def kb_developer_list() -> ReplyKeyboardMarkup:
     """Клавиатура для списков - только Назад"""
     b = ReplyKeyboardBuilder()
@@ -388,13 +521,11 @@ def kb_developer_list() -> ReplyKeyboardMarkup:
 
 
 def kb_developer_stats() -> ReplyKeyboardMarkup:
-    """Клавиатура для статистики - только Назад"""
-    b = ReplyKeyboardBuilder()
-    b.add(KeyboardButton(text="Назад"))
-    b.adjust(1)
-    return b.as_markup(resize_keyboard=True)
+    """Клавиатура для статистики - только Назад (та же, что kb_developer_list)"""
+    return kb_developer_list()
 
 
+@lru_cache(maxsize=1)
 def kb_dev_back_main_inline() -> InlineKeyboardMarkup:
     """Inline кнопка назад в меню разработчика"""
     b = InlineKeyboardBuilder()
@@ -403,6 +534,7 @@ def kb_dev_back_main_inline() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_req_pick_role(tg_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="🎯 Дроп-менеджер", callback_data=f"dev:req_set_role:{tg_id}:DROP_MANAGER")
@@ -412,6 +544,7 @@ def kb_dev_req_pick_role(tg_id: int) -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_req_pick_team_lead_source(tg_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="TG", callback_data=f"dev:req_set_tl_source:{tg_id}:TG")
@@ -421,6 +554,7 @@ def kb_dev_req_pick_team_lead_source(tg_id: int) -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_req_pick_dm_source(tg_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="TG", callback_data=f"dev:req_set_dm_source:{tg_id}:TG")
@@ -432,10 +566,10 @@ def kb_dev_req_pick_dm_source(tg_id: int) -> InlineKeyboardMarkup:
 
 def kb_dev_req_pick_forward_group(*, tg_id: int, groups: list) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for g in groups[:40]:
-        status = "✅" if getattr(g, "is_confirmed", False) else "❌"
-        title = getattr(g, "title", None) or "—"
-        b.button(text=f"{status} #{g.id} {title}", callback_data=f"dev:user_group_set:{tg_id}:{int(g.id)}")
+    for g in islice(groups, 40):
+        status = "✅" if g.is_confirmed else "❌"
+        title = g.title or "—"
+        b.button(text=f"{status} #{g.id} {title}", callback_data=f"dev:user_group_set:{tg_id}:{g.id}")
     b.button(text="➕ Добавить группу", callback_data=f"dev:req_group_add:{tg_id}")
     b.button(text="⬅️ Назад", callback_data=f"dev:req_back_dm_source:{tg_id}")
     b.adjust(1)
@@ -462,6 +596,7 @@ def kb_dm_main_inline(*, shift_active: bool, rejected_count: int | None = None)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_dm_back_to_menu_inline() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="⬅️ Назад", callback_data="dm:menu")
@@ -477,6 +612,7 @@ def kb_dm_back_cancel_inline(*, back_cb: str, cancel_cb: str = "dm:cancel") -> I
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_dm_duplicate_bank_phone_inline() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="⬅️ Назад", callback_data="dm:back_to_bank_select")
@@ -486,6 +622,7 @@ def kb_dm_duplicate_bank_phone_inline() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_dm_traffic_type_inline() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Прямой", callback_data="dm:traffic:DIRECT")
@@ -495,60 +632,55 @@ def kb_dm_traffic_type_inline() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+def _bank_select(names: Iterable[str], *, pick_prefix: str, back_cb: str) -> InlineKeyboardMarkup:
+    """Bank picker by name: `pick_prefix + name` per bank, a row of three, then one per row."""
+    buttons = [_btn(name, pick_prefix + name) for name in names]
+    buttons.append(_btn("⬅️ Назад", back_cb))
+    return InlineKeyboardMarkup(inline_keyboard=_adjust_rows(buttons, 3, 1))
+
+
+@lru_cache(maxsize=1)
 def kb_dm_bank_select_inline() -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    for name in DEFAULT_BANKS:
-        b.button(text=name, callback_data=f"dm:bank:{name}")
-    b.button(text="⬅️ Назад", callback_data="dm:back_to_phone")
-    b.adjust(3, 1)
-    return b.as_markup()
+    return _bank_select(DEFAULT_BANKS, pick_prefix=_CB_DM_BANK, back_cb="dm:back_to_phone")
 
 
 def kb_dm_bank_select_inline_from_names(names: list[str]) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    for name in names:
-        b.button(text=name, callback_data=f"dm:bank:{name}")
-    b.button(text="⬅️ Назад", callback_data="dm:back_to_phone")
-    b.adjust(3, 1)
-    return b.as_markup()
+    return _bank_select(names, pick_prefix=_CB_DM_BANK, back_cb="dm:back_to_phone")
 
 
 def kb_dm_bank_select_inline_from_items(items: list[tuple[int, str]]) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    for bank_id, name in items:
-        b.button(text=name, callback_data=f"dm:bank_id:{int(bank_id)}")
-    b.button(text="⬅️ Назад", callback_data="dm:back_to_phone")
-    b.adjust(3, 1)
-    return b.as_markup()
+    buttons = [
+        _btn(name, _CB_DM_BANK_ID + str(int(bank_id))) for bank_id, name in items
+    ]
+    buttons.append(_btn("⬅️ Назад", "dm:back_to_phone"))
+    return InlineKeyboardMarkup(inline_keyboard=_adjust_rows(buttons, 3, 1))
 
 
+@lru_cache(maxsize=1024)
 def kb_dm_edit_bank_select_inline(*, form_id: int) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    for name in DEFAULT_BANKS:
-        b.button(text=name, callback_data=f"dm_edit:bank_pick:{int(form_id)}:{name}")
-    b.button(text="⬅️ Назад", callback_data=f"dm_edit:back:{int(form_id)}")
-    b.adjust(3, 1)
-    return b.as_markup()
+    return _bank_select(
+        DEFAULT_BANKS,
+        pick_prefix=_CB_EDIT_BANK_PICK + str(int(form_id)) + ":",
+        back_cb=f"dm_edit:back:{int(form_id)}",
+    )
 
 
 def kb_dm_edit_bank_select_inline_from_names(*, form_id: int, names: list[str]) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    for name in names:
-        b.button(text=name, callback_data=f"dm_edit:bank_pick:{int(form_id)}:{name}")
-    b.button(text="⬅️ Назад", callback_data=f"dm_edit:back:{int(form_id)}")
-    b.adjust(3, 1)
-    return b.as_markup()
+    return _bank_select(
+        names,
+        pick_prefix=_CB_EDIT_BANK_PICK + str(int(form_id)) + ":",
+        back_cb=f"dm_edit:back:{int(form_id)}",
+    )
 
 
 def kb_dm_edit_bank_select_inline_from_items(*, form_id: int, items: list[tuple[int, str]]) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    for bank_id, name in items:
-        b.button(text=name, callback_data=f"dm_edit:bank_pick_id:{int(form_id)}:{int(bank_id)}")
-    b.button(text="⬅️ Назад", callback_data=f"dm_edit:back:{int(form_id)}")
-    b.adjust(3, 1)
-    return b.as_markup()
+    pick = _CB_EDIT_BANK_PICK_ID + str(int(form_id)) + ":"
+    buttons = [_btn(name, pick + str(int(bank_id))) for bank_id, name in items]
+    buttons.append(_btn("⬅️ Назад", f"dm_edit:back:{int(form_id)}"))
+    return InlineKeyboardMarkup(inline_keyboard=_adjust_rows(buttons, 3, 1))
 
 
+@lru_cache(maxsize=1)
 def kb_dm_done_inline() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Готово", callback_data="dm:screens_done")
@@ -557,6 +689,7 @@ def kb_dm_done_inline() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dm_edit_done_inline(form_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Готово", callback_data=f"dm_edit:screens_done:{form_id}")
@@ -565,6 +698,7 @@ def kb_dm_edit_done_inline(form_id: int) -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dm_shift_comment_inline(*, shift_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Без комментария", callback_data=f"shift_comment_skip:{shift_id}")
@@ -573,6 +707,7 @@ def kb_dm_shift_comment_inline(*, shift_id: int) -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_dev_main_inline() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Заявки", callback_data="dev:menu:reqs")
@@ -585,6 +720,7 @@ def kb_dev_main_inline() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_dev_team_leads_actions() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="➕ Добавить TG", callback_data="dev:tls:add:TG")
@@ -596,6 +732,7 @@ def kb_dev_team_leads_actions() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_team_lead_pick_source(tg_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="TG", callback_data=f"dev:tls:set_source:{tg_id}:TG")
@@ -605,6 +742,7 @@ def kb_dev_team_lead_pick_source(tg_id: int) -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_dev_groups_actions() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="➕ Добавить", callback_data="dev:groups:add")
@@ -616,18 +754,19 @@ def kb_dev_groups_actions() -> InlineKeyboardMarkup:
 
 
 def kb_dev_groups_list(groups: list) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    for g in groups[:40]:
-        status = "✅" if getattr(g, "is_confirmed", False) else "❌"
-        title = getattr(g, "title", None) or "—"
-        b.button(text=f"{status} #{g.id} {title}", callback_data=f"dev:group:open:{int(g.id)}")
-    b.button(text="➕ Добавить", callback_data="dev:groups:add")
-    b.button(text="🔄 Проверить", callback_data="dev:groups:check")
-    b.button(text="⬅️ Назад", callback_data="dev:back_to_main")
-    b.adjust(1)
-    return b.as_markup()
+    rows = [
+        [
+            _btn(f"{'✅' if g.is_confirmed else '❌'} #{g.id} {g.title or '—'}", _CB_DEV_GROUP_OPEN + str(g.id))
+        ]
+        for g in islice(groups, 40)
+    ]
+    rows.append([_btn("➕ Добавить", "dev:groups:add")])
+    rows.append([_btn("🔄 Проверить", "dev:groups:check")])
+    rows.append([_btn("⬅️ Назад", "dev:back_to_main")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_group_open(group_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="🔄 Проверить", callback_data=f"dev:group:check:{group_id}")
@@ -639,10 +778,10 @@ def kb_dev_group_open(group_id: int) -> InlineKeyboardMarkup:
 
 def kb_dev_pick_forward_group(*, tg_id: int, groups: list, include_skip: bool) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for g in groups[:40]:
-        status = "✅" if getattr(g, "is_confirmed", False) else "❌"
-        title = getattr(g, "title", None) or "—"
-        b.button(text=f"{status} #{g.id} {title}", callback_data=f"dev:user_group_set:{tg_id}:{int(g.id)}")
+    for g in islice(groups, 40):
+        status = "✅" if g.is_confirmed else "❌"
+        title = g.title or "—"
+        b.button(text=f"{status} #{g.id} {title}", callback_data=f"dev:user_group_set:{tg_id}:{g.id}")
     if include_skip:
         b.button(text="Пропустить", callback_data=f"dev:user_group_skip:{tg_id}")
     b.button(text="❎ Снять привязку", callback_data=f"dev:user_group_set:{tg_id}:NONE")
@@ -653,10 +792,9 @@ def kb_dev_pick_forward_group(*, tg_id: int, groups: list, include_skip: bool) -
 
 def kb_dev_users_list_beautiful(users: list) -> tuple[str, InlineKeyboardMarkup]:
     """Создает красивый список пользователей с inline кнопками"""
-    lines = [
-        f"👥 <b>ПОЛЬЗОВАТЕЛИ СИСТЕМЫ</b>\n",
-        f"Всего: <b>{len(users)}</b>\n"
-    ]
+    lines = [""] * (len(users) + 2)
+    lines[0] = "👥 <b>ПОЛЬЗОВАТЕЛИ СИСТЕМЫ</b>\n"
+    lines[1] = f"Всего: <b>{len(users)}</b>\n"
     
     b = InlineKeyboardBuilder()
     for i, user in enumerate(users, 1):
@@ -664,62 +802,68 @@ def kb_dev_users_list_beautiful(users: list) -> tuple[str, InlineKeyboardMarkup]
         username = f"@{user.username}" if user.username else "—"
         
         
-        role_emoji = {
-            "DEVELOPER": "👨‍💻",
-            "TEAM_LEAD": "👑", 
-            "DROP_MANAGER": "🎯",
-            "PENDING": "⏳"
-        }
-        emoji = role_emoji.get(user.role, "❓")
-
-        group_mark = ""
-        try:
-            if str(getattr(user, "role", "")).endswith("DROP_MANAGER"):
-                group_mark = "✅" if getattr(user, "forward_group_id", None) else "❌"
-        except Exception:
-            group_mark = ""
-
-        lines.append(f"\n{i}. {emoji}{group_mark} <code>{user.tg_id}</code> | <b>{name}</b> | {username}")
-
-        src_icon = ""
-        src = getattr(user, "manager_source", None)
-        if src:
-            s = str(src).upper()
-            if s == "TG":
-                src_icon = "✈️"
-            elif s == "FB":
-                src_icon = "📘"
+        emoji = _ROLE_EMOJI.get(user.role, "❓")
+
+        role = user.role if isinstance(user.role, str) else str(user.role or "")
+        group_mark = ("✅" if user.forward_group_id else "❌") if role.endswith("DROP_MANAGER") else ""
+
+        marks = emoji + group_mark
+        tg_str = str(user.tg_id)
+        lines[i + 1] = f"\n{i}. {marks} <code>{tg_str}</code> | <b>{name}</b> | {username}"
+
+        src = user.manager_source
+        src_icon = _SRC_ICON.get(str(src).upper(), "") if src else ""
         
-        b.button(text=f"{emoji}{group_mark}{src_icon} {name} ({user.tg_id})", callback_data=f"dev:select_user:{user.tg_id}")
+        b.button(text=f"{marks}{src_icon} {name} ({tg_str})", callback_data=_CB_DEV_SELECT_USER + tg_str)
     b.button(text="⬅️ Назад", callback_data="dev:back_to_main")
     b.adjust(1)
     return "\n".join(lines), b.as_markup()
 
 
+@lru_cache(maxsize=16)
 def kb_dev_forms_filter_menu(*, current: str | None) -> InlineKeyboardMarkup:
-    cur = (current or "today").lower()
-    b = InlineKeyboardBuilder()
+    return _build_filter_menu(
+        current,
+        set_prefix="dev:forms_filter_set:",
+        custom_cb="dev:forms_filter_custom",
+        back_cb="dev:forms_filter_back",
+    )
 
-    items = [
-        ("Сегодня", "today"),
-        ("Вчера", "yesterday"),
-        ("Текущая неделя", "week"),
-        ("Последние 7 дней", "last7"),
-        ("Текущий месяц", "month"),
-        ("Предыдущий месяц", "prev_month"),
-        ("Последние 30 дней", "last30"),
-        ("Текущий год", "year"),
-        ("За все время", "all"),
-    ]
-    for title, key in items:
-        prefix = "✅ " if key == cur else ""
-        b.button(text=f"{prefix}{title}", callback_data=f"dev:forms_filter_set:{key}")
 
-    b.button(text="Интервал дат", callback_data="dev:forms_filter_custom")
-    b.button(text="⬅️ Назад", callback_data="dev:forms_filter_back")
+def _dev_user_row(user, team_lead_sources: dict[int, str] | None) -> tuple[str, str, str, str]:
+    """(marks, tg id, name, @username) of one user in the dev users list."""
+    name = f"{user.first_name or ''} {user.last_name or ''}".strip() or "—"
+    username = f"@{user.username}" if user.username else "—"
 
-    b.adjust(1)
-    return b.as_markup()
+    emoji = _ROLE_EMOJI.get(user.role, "❓")
+
+    role = user.role if isinstance(user.role, str) else str(user.role or "")
+    group_mark = ("✅" if user.forward_group_id else "❌") if role.endswith("DROP_MANAGER") else ""
+
+    if role == "TEAM_LEAD" and team_lead_sources is not None:
+        src_icon = _SRC_ICON.get(team_lead_sources.get(int(user.tg_id)), "")
+    else:
+        src = user.manager_source
+        src_icon = _SRC_ICON.get(str(src).upper(), "") if src else ""
+
+    return emoji + group_mark + src_icon, str(user.tg_id), name, username
+
+
+@lru_cache(maxsize=32)
+def _render_dev_user_rows(rows: tuple[tuple[str, str, str, str], ...]) -> tuple[str, InlineKeyboardMarkup]:
+    """
+    Text and markup for the rows from _dev_user_row. Refreshing an unchanged list reuses the
+    already built result; callers must not mutate the returned markup.
+    """
+    lines = [""] * (len(rows) + 2)
+    lines[0] = "👥 <b>ПОЛЬЗОВАТЕЛИ СИСТЕМЫ</b>\n"
+    lines[1] = f"Всего: <b>{len(rows)}</b>\n"
+    keyboard: list[list[InlineKeyboardButton]] = []
+    for i, (marks, tg_str, name, username) in enumerate(rows, 1):
+        lines[i + 1] = f"\n{i}. {marks} <code>{tg_str}</code> | <b>{name}</b> | {username}"
+        keyboard.append([_btn(f"{marks} {name} ({tg_str})", _CB_DEV_SELECT_USER + tg_str)])
+    keyboard.append([_btn("⬅️ Назад", "dev:back_to_main")])
+    return "\n".join(lines), InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
 def kb_dev_users_list_beautiful_with_sources(
@@ -727,81 +871,28 @@ def kb_dev_users_list_beautiful_with_sources(
     *,
     team_lead_sources: dict[int, str] | None,
 ) -> tuple[str, InlineKeyboardMarkup]:
-    lines = [
-        f"👥 <b>ПОЛЬЗОВАТЕЛИ СИСТЕМЫ</b>\n",
-        f"Всего: <b>{len(users)}</b>\n",
-    ]
-    b = InlineKeyboardBuilder()
-    for i, user in enumerate(users, 1):
-        name = f"{user.first_name or ''} {user.last_name or ''}".strip() or "—"
-        username = f"@{user.username}" if user.username else "—"
-
-        role_emoji = {
-            "DEVELOPER": "👨‍💻",
-            "TEAM_LEAD": "👑",
-            "DROP_MANAGER": "🎯",
-            "PENDING": "⏳",
-        }
-        emoji = role_emoji.get(user.role, "❓")
-
-        group_mark = ""
-        try:
-            if str(getattr(user, "role", "")).endswith("DROP_MANAGER"):
-                group_mark = "✅" if getattr(user, "forward_group_id", None) else "❌"
-        except Exception:
-            group_mark = ""
-
-        src_icon = ""
-        if str(user.role) == "TEAM_LEAD" and team_lead_sources is not None:
-            src = team_lead_sources.get(int(user.tg_id))
-            if src == "TG":
-                src_icon = "✈️"
-            elif src == "FB":
-                src_icon = "📘"
-        else:
-            src = getattr(user, "manager_source", None)
-            if src:
-                s = str(src).upper()
-                if s == "TG":
-                    src_icon = "✈️"
-                elif s == "FB":
-                    src_icon = "📘"
-
-        lines.append(f"\n{i}. {emoji}{group_mark}{src_icon} <code>{user.tg_id}</code> | <b>{name}</b> | {username}")
-
-        b.button(text=f"{emoji}{group_mark}{src_icon} {name} ({user.tg_id})", callback_data=f"dev:select_user:{user.tg_id}")
-
-    b.button(text="⬅️ Назад", callback_data="dev:back_to_main")
-    b.adjust(1)
-    return "\n".join(lines), b.as_markup()
+    return _render_dev_user_rows(tuple(_dev_user_row(user, team_lead_sources) for user in users))
 
 
 def kb_dev_forms_list_beautiful(forms: list) -> tuple[str, InlineKeyboardMarkup]:
     """Создает красивый список анкет с inline кнопками"""
-    lines = [
-        f"📋 <b>АНКЕТЫ СИСТЕМЫ</b>\n",
-        f"Всего: <b>{len(forms)}</b>\n"
-    ]
+    lines = [""] * (len(forms) + 2)
+    lines[0] = "📋 <b>АНКЕТЫ СИСТЕМЫ</b>\n"
+    lines[1] = f"Всего: <b>{len(forms)}</b>\n"
     
     b = InlineKeyboardBuilder()
     b.button(text="📅 Фильтр", callback_data="dev:forms_filter_menu")
     for i, form in enumerate(forms, 1):
-        status_emoji = {
-            "IN_PROGRESS": "⏳",
-            "PENDING": "📨",
-            "APPROVED": "✅",
-            "REJECTED": "❌",
-        }
-        emoji = status_emoji.get(str(form.status), "❓")
-        traffic = "Прямой" if form.traffic_type == "DIRECT" else "Сарафан" if form.traffic_type == "REFERRAL" else "—"
+        emoji = _FORM_STATUS_EMOJI.get(form.status, "❓")
+        traffic = _TRAFFIC_LABEL.get(form.traffic_type, "—")
         
-        status_label = format_form_status(getattr(form, "status", None))
-        bank = format_bank_hashtag(getattr(form, "bank_name", None))
-        lines.append(f"\n{i}. {emoji} <code>{form.id}</code> | <b>{bank}</b> | {traffic} | {status_label}")
+        status_label = format_form_status(form.status)
+        bank = format_bank_hashtag(form.bank_name)
+        lines[i + 1] = f"\n{i}. {emoji} <code>{form.id}</code> | <b>{bank}</b> | {traffic} | {status_label}"
         
         b.button(
             text=f"{emoji} Анкета #{form.id} - {bank} ({status_label})",
-            callback_data=f"dev:select_form:{form.id}",
+            callback_data=_CB_DEV_SELECT_FORM + str(form.id),
         )
     b.button(text="⬅️ Назад", callback_data="dev:back_to_main")
     b.adjust(1)
@@ -810,26 +901,20 @@ def kb_dev_forms_list_beautiful(forms: list) -> tuple[str, InlineKeyboardMarkup]
 
 def kb_dev_requests_list_beautiful(requests: list) -> tuple[str, InlineKeyboardMarkup]:
     """Создает красивый список заявок с inline кнопками"""
-    lines = [
-        f"📝 <b>ЗАЯВКИ НА ДОСТУП</b>\n",
-        f"Всего: <b>{len(requests)}</b>\n"
-    ]
+    lines = [""] * (len(requests) + 2)
+    lines[0] = "📝 <b>ЗАЯВКИ НА ДОСТУП</b>\n"
+    lines[1] = f"Всего: <b>{len(requests)}</b>\n"
     
     b = InlineKeyboardBuilder()
     for i, req in enumerate(requests, 1):
-        status_emoji = {
-            "PENDING": "⏳",
-            "APPROVED": "✅",
-            "REJECTED": "❌",
-        }
-        emoji = status_emoji.get(str(req.status), "❓")
-        status_label = format_access_status(getattr(req, "status", None))
+        emoji = _ACCESS_STATUS_EMOJI.get(req.status, "❓")
+        status_label = format_access_status(req.status)
 
-        lines.append(f"\n{i}. {emoji} <code>{req.user_id}</code> | <b>{status_label}</b>")
+        lines[i + 1] = f"\n{i}. {emoji} <code>{req.user_id}</code> | <b>{status_label}</b>"
 
         b.button(
             text=f"{emoji} Заявка #{req.user_id} - {status_label}",
-            callback_data=f"dev:select_req:{req.user_id}",
+            callback_data=_CB_DEV_SELECT_REQ + str(req.user_id),
         )
     b.button(text="⬅️ Назад", callback_data="dev:back_to_main")
     b.adjust(1)
@@ -840,10 +925,7 @@ def kb_dev_users_list(users: list) -> InlineKeyboardMarkup:
     """Inline клавиатура для списка пользователей"""
     b = InlineKeyboardBuilder()
     for user in users:
-        b.add(InlineKeyboardButton(
-            text=f"{user.first_name or ''} {user.last_name or ''} (@{user.username or '—'}) - {user.tg_id}",
-            callback_data=f"dev:select_user:{user.tg_id}"
-        ))
+        b.add(_btn(f"{user.first_name or ''} {user.last_name or ''} (@{user.username or '—'}) - {user.tg_id}", _CB_DEV_SELECT_USER + str(user.tg_id)))
     b.adjust(1)
     return b.as_markup()
 
@@ -852,19 +934,10 @@ def kb_dev_forms_list(forms: list) -> InlineKeyboardMarkup:
     """Inline клавиатура для списка анкет"""
     b = InlineKeyboardBuilder()
     for form in forms:
-        status_emoji = {
-            "IN_PROGRESS": "⏳",
-            "PENDING": "📨", 
-            "APPROVED": "✅",
-            "REJECTED": "❌"
-        }
-        emoji = status_emoji.get(form.status, "❓")
-        bank = format_bank_hashtag(getattr(form, "bank_name", None))
+        emoji = _FORM_STATUS_EMOJI.get(form.status, "❓")
+        bank = format_bank_hashtag(form.bank_name)
         b.add(
-            InlineKeyboardButton(
-                text=f"{emoji} Анкета #{form.id} - {bank}",
-                callback_data=f"dev:select_form:{form.id}",
-            )
+            _btn(f"{emoji} Анкета #{form.id} - {bank}", _CB_DEV_SELECT_FORM + str(form.id))
         )
     b.adjust(1)
     return b.as_markup()
@@ -874,91 +947,101 @@ def kb_dev_requests_list(requests: list) -> InlineKeyboardMarkup:
     """Inline клавиатура для списка заявок"""
     b = InlineKeyboardBuilder()
     for req in requests:
-        status_emoji = {
-            "PENDING": "⏳",
-            "APPROVED": "✅",
-            "REJECTED": "❌"
-        }
-        emoji = status_emoji.get(req.status, "❓")
-        b.add(InlineKeyboardButton(
-            text=f"{emoji} Заявка #{req.user_id} - {req.status}",
-            callback_data=f"dev:select_req:{req.user_id}"
-        ))
+        emoji = _ACCESS_STATUS_EMOJI.get(req.status, "❓")
+        b.add(_btn(f"{emoji} Заявка #{req.user_id} - {req.status}", _CB_DEV_SELECT_REQ + str(req.user_id)))
     b.adjust(1)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_confirm(kind: str, tg_id: int) -> InlineKeyboardMarkup:
     """
     kind: 'user' | 'req'
     """
-    b = InlineKeyboardBuilder()
+    rows = []
     if kind == "user":
-        b.add(InlineKeyboardButton(text="🗑 Удалить пользователя", callback_data=f"dev:del_user:{tg_id}"))
+        rows.append([_btn("🗑 Удалить пользователя", f"dev:del_user:{tg_id}")])
     elif kind == "req":
-        b.add(InlineKeyboardButton(text="🗑 Удалить заявку", callback_data=f"dev:del_req:{tg_id}"))
-    b.add(InlineKeyboardButton(text="Отмена", callback_data="dev:cancel"))
-    b.adjust(1)
-    return b.as_markup()
+        rows.append([_btn("🗑 Удалить заявку", f"dev:del_req:{tg_id}")])
+    rows.append([_btn("Отмена", "dev:cancel")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_user_actions(tg_id: int) -> InlineKeyboardMarkup:
     """Keyboard for user actions"""
-    b = InlineKeyboardBuilder()
-    b.add(InlineKeyboardButton(text="✏️ Редактировать", callback_data=f"dev:edit_user:{tg_id}"))
-    b.add(InlineKeyboardButton(text="🏷 Группа пересылки", callback_data=f"dev:user_group:{tg_id}"))
-    b.add(InlineKeyboardButton(text="🗑️ Удалить", callback_data=f"dev:del_user:{tg_id}"))
-    b.add(InlineKeyboardButton(text="⬅️ Назад", callback_data="dev:back_to_users"))
-    b.adjust(1)
-    return b.as_markup()
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [_btn("✏️ Редактировать", f"dev:edit_user:{tg_id}")],
+            [_btn("🏷 Группа пересылки", f"dev:user_group:{tg_id}")],
+            [_btn("🗑️ Удалить", f"dev:del_user:{tg_id}")],
+            [_btn("⬅️ Назад", "dev:back_to_users")],
+        ]
+    )
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_form_actions(form_id: int) -> InlineKeyboardMarkup:
     """Keyboard for form actions"""
-    b = InlineKeyboardBuilder()
-    b.add(InlineKeyboardButton(text="✏️ Редактировать", callback_data=f"dev:edit_form:{form_id}"))
-    b.add(InlineKeyboardButton(text="🗑️ Удалить", callback_data=f"dev:del_form:{form_id}"))
-    b.add(InlineKeyboardButton(text="⬅️ Назад", callback_data="dev:back_to_forms"))
-    b.adjust(1)
-    return b.as_markup()
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [_btn("✏️ Редактировать", f"dev:edit_form:{form_id}")],
+            [_btn("🗑️ Удалить", f"dev:del_form:{form_id}")],
+            [_btn("⬅️ Назад", "dev:back_to_forms")],
+        ]
+    )
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_req_actions(tg_id: int) -> InlineKeyboardMarkup:
     """Keyboard for request actions"""
-    b = InlineKeyboardBuilder()
-    b.add(InlineKeyboardButton(text="✏️ Редактировать", callback_data=f"dev:edit_req:{tg_id}"))
-    b.add(InlineKeyboardButton(text="🗑️ Удалить", callback_data=f"dev:del_req:{tg_id}"))
-    b.add(InlineKeyboardButton(text="⬅️ Назад", callback_data="dev:back_to_reqs"))
-    b.adjust(1)
-    return b.as_markup()
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [_btn("✏️ Редактировать", f"dev:edit_req:{tg_id}")],
+            [_btn("🗑️ Удалить", f"dev:del_req:{tg_id}")],
+            [_btn("⬅️ Назад", "dev:back_to_reqs")],
+        ]
+    )
+
+
+_EDIT_USER_FIELDS = (
+    ("📝 Имя", "first_name"),
+    ("📝 Фамилия", "last_name"),
+    ("📝 Username", "username"),
+    ("📝 Роль", "role"),
+    ("📝 Тег менеджера", "manager_tag"),
+    ("📝 Источник (TG/FB)", "manager_source"),
+)
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_edit_user(tg_id: int) -> InlineKeyboardMarkup:
     """Keyboard for editing user fields"""
-    b = InlineKeyboardBuilder()
-    b.add(InlineKeyboardButton(text="📝 Имя", callback_data=f"dev:edit_user_field:{tg_id}:first_name"))
-    b.add(InlineKeyboardButton(text="📝 Фамилия", callback_data=f"dev:edit_user_field:{tg_id}:last_name"))
-    b.add(InlineKeyboardButton(text="📝 Username", callback_data=f"dev:edit_user_field:{tg_id}:username"))
-    b.add(InlineKeyboardButton(text="📝 Роль", callback_data=f"dev:edit_user_field:{tg_id}:role"))
-    b.add(InlineKeyboardButton(text="📝 Тег менеджера", callback_data=f"dev:edit_user_field:{tg_id}:manager_tag"))
-    b.add(InlineKeyboardButton(text="📝 Источник (TG/FB)", callback_data=f"dev:edit_user_field:{tg_id}:manager_source"))
-    b.add(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"dev:back_to_user:{tg_id}"))
-    b.adjust(1)
-    return b.as_markup()
+    prefix = f"dev:edit_user_field:{tg_id}:"
+    rows = [[_btn(label, prefix + field)] for label, field in _EDIT_USER_FIELDS]
+    rows.append([_btn("⬅️ Назад", f"dev:back_to_user:{tg_id}")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_pick_user_role(tg_id: int) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    b.button(text="PENDING", callback_data=f"dev:set_user_role:{tg_id}:PENDING")
-    b.button(text="DROP_MANAGER", callback_data=f"dev:set_user_role:{tg_id}:DROP_MANAGER")
-    b.button(text="TEAM_LEAD", callback_data=f"dev:set_user_role:{tg_id}:TEAM_LEAD")
-    b.button(text="DEVELOPER", callback_data=f"dev:set_user_role:{tg_id}:DEVELOPER")
-    b.button(text="WICTORY", callback_data=f"dev:set_user_role:{tg_id}:WICTORY")
-    b.button(text="⬅️ Назад", callback_data=f"dev:back_to_user:{tg_id}")
-    b.adjust(2, 2, 1, 1)
-    return b.as_markup()
-
-
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                _btn("PENDING", f"dev:set_user_role:{tg_id}:PENDING"),
+                _btn("DROP_MANAGER", f"dev:set_user_role:{tg_id}:DROP_MANAGER"),
+            ],
+            [
+                _btn("TEAM_LEAD", f"dev:set_user_role:{tg_id}:TEAM_LEAD"),
+                _btn("DEVELOPER", f"dev:set_user_role:{tg_id}:DEVELOPER"),
+            ],
+            [_btn("WICTORY", f"dev:set_user_role:{tg_id}:WICTORY")],
+            [_btn("⬅️ Назад", f"dev:back_to_user:{tg_id}")],
+        ]
+    )
+
+
+@lru_cache(maxsize=1024)
 def kb_dev_pick_team_lead_source(tg_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="TG", callback_data=f"dev:set_team_lead_source:{tg_id}:TG")
@@ -968,6 +1051,7 @@ def kb_dev_pick_team_lead_source(tg_id: int) -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_dev_pick_user_source(tg_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="TG", callback_data=f"dev:set_user_source:{tg_id}:TG")
@@ -978,20 +1062,26 @@ def kb_dev_pick_user_source(tg_id: int) -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+_EDIT_FORM_FIELDS = (
+    ("📊 Тип клиента", "traffic_type"),
+    ("📞 Телефон", "phone"),
+    ("🏦 Банк", "bank_name"),
+    ("🔐 Пароль", "password"),
+    ("📝 Комментарий", "comment"),
+    ("📊 Статус", "status"),
+)
+
+
+@lru_cache(maxsize=1024)
 def kb_dev_edit_form(form_id: int) -> InlineKeyboardMarkup:
     """Keyboard for editing form fields"""
-    b = InlineKeyboardBuilder()
-    b.add(InlineKeyboardButton(text="📊 Тип клиента", callback_data=f"dev:edit_form_field:{form_id}:traffic_type"))
-    b.add(InlineKeyboardButton(text="📞 Телефон", callback_data=f"dev:edit_form_field:{form_id}:phone"))
-    b.add(InlineKeyboardButton(text="🏦 Банк", callback_data=f"dev:edit_form_field:{form_id}:bank_name"))
-    b.add(InlineKeyboardButton(text="🔐 Пароль", callback_data=f"dev:edit_form_field:{form_id}:password"))
-    b.add(InlineKeyboardButton(text="📝 Комментарий", callback_data=f"dev:edit_form_field:{form_id}:comment"))
-    b.add(InlineKeyboardButton(text="📊 Статус", callback_data=f"dev:edit_form_field:{form_id}:status"))
-    b.add(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"dev:back_to_form:{form_id}"))
-    b.adjust(1)
-    return b.as_markup()
+    prefix = f"dev:edit_form_field:{form_id}:"
+    rows = [[_btn(label, prefix + field)] for label, field in _EDIT_FORM_FIELDS]
+    rows.append([_btn("⬅️ Назад", f"dev:back_to_form:{form_id}")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@lru_cache(maxsize=1)
 def kb_dm_resource_menu() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Активные ссылки / Esim", callback_data="dm:resource_active")
@@ -1004,8 +1094,8 @@ def kb_dm_resource_menu() -> InlineKeyboardMarkup:
 
 def kb_dm_resource_banks(items: list[tuple[int, str]]) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for bank_id, name in items[:50]:
-        b.button(text=name, callback_data=f"dm:resource_bank:{int(bank_id)}")
+    for bank_id, name in islice(items, 50):
+        b.button(text=name, callback_data=_CB_RESOURCE_BANK + str(int(bank_id)))
     b.button(text="⬅️ Назад", callback_data="dm:resource_menu")
     b.adjust(1)
     return b.as_markup()
@@ -1030,7 +1120,7 @@ def kb_dm_resource_empty_bank(bank_id: int) -> InlineKeyboardMarkup:
 
 def kb_dm_resource_type_pick(bank_id: int, available_types: list[str] | tuple[str, ...] | None = None) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    picked = [str(t).lower() for t in (available_types or ["esim", "link", "link_esim"])]
+    picked = [str(t).lower() for t in (available_types or ("esim", "link", "link_esim"))]
     if "esim" in picked:
         b.button(text="Esim", callback_data=f"dm:resource_take_type:{int(bank_id)}:esim")
     if "link" in picked:
@@ -1044,8 +1134,8 @@ def kb_dm_resource_type_pick(bank_id: int, available_types: list[str] | tuple[st
 
 def kb_dm_resource_active_list(items: list[tuple[int, str]]) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for item_id, title in items[:50]:
-        b.button(text=title, callback_data=f"dm:resource_active_open:{int(item_id)}")
+    for item_id, title in islice(items, 50):
+        b.button(text=title, callback_data=_CB_RESOURCE_ACTIVE_OPEN + str(int(item_id)))
     b.button(text="⬅️ Назад", callback_data="dm:resource_menu")
     b.adjust(1)
     return b.as_markup()
@@ -1063,8 +1153,9 @@ def kb_dm_resource_active_actions(item_id: int) -> InlineKeyboardMarkup:
 
 def kb_dm_resource_attach_forms(item_id: int, forms: list) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for f in forms[:40]:
-        b.button(text=f"#{int(f.id)} {(getattr(f, 'bank_name', None) or '—')}", callback_data=f"dm:resource_attach_pick:{int(item_id)}:{int(f.id)}")
+    pick = _CB_RESOURCE_ATTACH_PICK + str(int(item_id)) + ":"
+    for f in islice(forms, 40):
+        b.button(text=f"#{int(f.id)} {(f.bank_name or '—')}", callback_data=pick + str(int(f.id)))
     b.button(text="📅 Фильтр", callback_data=f"dm:resource_attach_filter:{int(item_id)}")
     b.button(text="⬅️ Назад", callback_data=f"dm:resource_active_open:{int(item_id)}")
     b.adjust(1)
@@ -1072,37 +1163,24 @@ def kb_dm_resource_attach_forms(item_id: int, forms: list) -> InlineKeyboardMark
 
 
 def kb_dm_resource_attach_filter_menu(*, item_id: int, current: str | None) -> InlineKeyboardMarkup:
-    cur = (current or "today").lower()
-    b = InlineKeyboardBuilder()
-    items = [
-        ("Сегодня", "today"),
-        ("Вчера", "yesterday"),
-        ("Текущая неделя", "week"),
-        ("Последние 7 дней", "last7"),
-        ("Текущий месяц", "month"),
-        ("Предыдущий месяц", "prev_month"),
-        ("Последние 30 дней", "last30"),
-        ("Текущий год", "year"),
-        ("За все время", "all"),
-    ]
-    for title, key in items:
-        prefix = "✅ " if key == cur else ""
-        b.button(text=f"{prefix}{title}", callback_data=f"dm:resource_attach_filter_set:{int(item_id)}:{key}")
-    b.button(text="Интервал дат", callback_data=f"dm:resource_attach_filter_custom:{int(item_id)}")
-    b.button(text="⬅️ Назад", callback_data=f"dm:resource_attach:{int(item_id)}")
-    b.adjust(1)
-    return b.as_markup()
+    return _build_filter_menu(
+        current,
+        set_prefix=f"dm:resource_attach_filter_set:{int(item_id)}:",
+        custom_cb=f"dm:resource_attach_filter_custom:{int(item_id)}",
+        back_cb=f"dm:resource_attach:{int(item_id)}",
+    )
 
 
 def kb_dm_resource_used_list(items: list[tuple[int, str]]) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for item_id, title in items[:50]:
-        b.button(text=title, callback_data=f"dm:resource_used_open:{int(item_id)}")
+    for item_id, title in islice(items, 50):
+        b.button(text=title, callback_data=_CB_RESOURCE_USED_OPEN + str(int(item_id)))
     b.button(text="⬅️ Назад", callback_data="dm:resource_menu")
     b.adjust(1)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_dm_resource_used_actions() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="⬅️ К списку подтянутых", callback_data="dm:resource_used")
@@ -1111,11 +1189,12 @@ def kb_dm_resource_used_actions() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_wictory_main_inline() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.button(text="Добавить ссылку", callback_data="wictory:add:link")
-    b.button(text="Добавить Esim", callback_data="wictory:add:esim")
-    b.button(text="Добавить ссылку + Esim", callback_data="wictory:add:link_esim")
+    b.button(text="Добавить ссылку", callback_data=WictoryAddCb(action="add", resource_type="link").pack())
+    b.button(text="Добавить Esim", callback_data=WictoryAddCb(action="add", resource_type="esim").pack())
+    b.button(text="Добавить ссылку + Esim", callback_data=WictoryAddCb(action="add", resource_type="link_esim").pack())
     b.button(text="Мои записи", callback_data="wictory:items:list")
     b.button(text="Просмотр пула по банкам", callback_data="wictory:stats")
     b.button(text="Невалидные ссылки", callback_data="wictory:invalid:list")
@@ -1123,6 +1202,7 @@ def kb_wictory_main_inline() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=8)
 def kb_wictory_pick_source(*, back_cb: str = "wictory:home") -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="TG", callback_data="wictory:src:TG")
@@ -1133,15 +1213,17 @@ def kb_wictory_pick_source(*, back_cb: str = "wictory:home") -> InlineKeyboardMa
     return b.as_markup()
 
 
-def kb_wictory_banks(items: list[tuple[int, str]], *, back_cb: str = "wictory:home") -> InlineKeyboardMarkup:
+@lru_cache(maxsize=256)
+def kb_wictory_banks(items: tuple[tuple[int, str], ...], *, back_cb: str = "wictory:home") -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for bank_id, name in items[:50]:
-        b.button(text=name, callback_data=f"wictory:bank:{int(bank_id)}")
+    for bank_id, name in islice(items, 50):
+        b.button(text=name, callback_data=WictoryBankCb(action="bank", bank_id=int(bank_id)).pack())
     b.button(text="⬅️ Назад", callback_data=back_cb)
     b.adjust(1)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_wictory_bank_actions() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Добавить массово", callback_data="wictory:bank_mode:bulk")
@@ -1159,6 +1241,7 @@ def kb_wictory_back_cancel(*, back_cb: str, cancel_cb: str = "wictory:cancel_cre
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_wictory_bulk_next_actions() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Добавить ещё", callback_data="wictory:bulk:add_more")
@@ -1176,6 +1259,7 @@ def kb_wictory_upload_actions(*, back_cb: str, done_cb: str = "wictory:upload_do
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_wictory_preview() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Редактировать", callback_data="wictory:edit")
@@ -1185,20 +1269,22 @@ def kb_wictory_preview() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_wictory_edit() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.button(text="Изменить банк", callback_data="wictory:edit:bank")
-    b.button(text="Изменить данные", callback_data="wictory:edit:data")
-    b.button(text="Заменить скриншот", callback_data="wictory:edit:screen")
+    b.button(text="Изменить банк", callback_data=WictoryEditCb(action="edit", field="bank").pack())
+    b.button(text="Изменить данные", callback_data=WictoryEditCb(action="edit", field="data").pack())
+    b.button(text="Заменить скриншот", callback_data=WictoryEditCb(action="edit", field="screen").pack())
     b.button(text="⬅️ Назад", callback_data="wictory:preview")
     b.adjust(1)
     return b.as_markup()
 
 
-def kb_wictory_invalid_list(items: list[tuple[int, str]]) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=16)
+def kb_wictory_invalid_list(items: tuple[tuple[int, str], ...]) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for item_id, title in items[:50]:
-        b.button(text=title, callback_data=f"wictory:invalid:open:{int(item_id)}")
+    for item_id, title in islice(items, 50):
+        b.button(text=title, callback_data=WictoryInvalidCb(scope="invalid", action="open", item_id=int(item_id)).pack())
     b.button(text="⬅️ Назад", callback_data="wictory:home")
     b.adjust(1)
     return b.as_markup()
@@ -1206,16 +1292,17 @@ def kb_wictory_invalid_list(items: list[tuple[int, str]]) -> InlineKeyboardMarku
 
 def kb_wictory_invalid_actions(item_id: int, *, type_label: str | None = None) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.button(text="Изменить данные", callback_data=f"wictory:invalid:edit_data:{int(item_id)}")
-    b.button(text="Заменить медиа", callback_data=f"wictory:invalid:edit_media:{int(item_id)}")
-    b.button(text="Вернуть в общий пул", callback_data=f"wictory:invalid:return:{int(item_id)}")
+    b.button(text="Изменить данные", callback_data=WictoryInvalidCb(scope="invalid", action="edit_data", item_id=int(item_id)).pack())
+    b.button(text="Заменить медиа", callback_data=WictoryInvalidCb(scope="invalid", action="edit_media", item_id=int(item_id)).pack())
+    b.button(text="Вернуть в общий пул", callback_data=WictoryInvalidCb(scope="invalid", action="return", item_id=int(item_id)).pack())
     t = (type_label or "ресурс").strip()
-    b.button(text=f"🗑 Удалить {t}", callback_data=f"wictory:invalid:delete:{int(item_id)}")
+    b.button(text=f"🗑 Удалить {t}", callback_data=WictoryInvalidCb(scope="invalid", action="delete", item_id=int(item_id)).pack())
     b.button(text="⬅️ Назад", callback_data="wictory:invalid:list")
     b.adjust(1)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_wictory_stats_main() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Фильтр", callback_data="wictory:stats:filters")
@@ -1224,6 +1311,7 @@ def kb_wictory_stats_main() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_wictory_stats_filters_main() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Источник", callback_data="wictory:stats:filters:source")
@@ -1280,7 +1368,7 @@ def kb_wictory_stats_filter_date(current: str) -> InlineKeyboardMarkup:
 
 def kb_wictory_stats_filter_bank(items: list[tuple[int, str]], selected: set[int]) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for bid, title in items[:60]:
+    for bid, title in islice(items, 60):
         mark = "✅ " if int(bid) in selected else ""
         b.button(text=f"{mark}{title}", callback_data=f"wictory:stats:toggle:bank:{int(bid)}")
     b.button(text="⬅️ Назад", callback_data="wictory:stats:filters")
@@ -1290,8 +1378,8 @@ def kb_wictory_stats_filter_bank(items: list[tuple[int, str]], selected: set[int
 
 def kb_wictory_items_list(items: list[tuple[int, str]]) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for item_id, title in items[:50]:
-        b.button(text=title, callback_data=f"wictory:item:open:{int(item_id)}")
+    for item_id, title in islice(items, 50):
+        b.button(text=title, callback_data=_CB_WICTORY_ITEM_OPEN + str(int(item_id)))
     b.button(text="⬅️ Назад", callback_data="wictory:home")
     b.adjust(1)
     return b.as_markup()
@@ -1333,7 +1421,7 @@ def kb_wictory_item_edit_back_cancel(item_id: int) -> InlineKeyboardMarkup:
 
 def kb_wictory_invalid_edit_back_cancel(item_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    b.button(text="⬅️ Назад", callback_data=f"wictory:invalid:open:{int(item_id)}")
+    b.button(text="⬅️ Назад", callback_data=WictoryInvalidCb(scope="invalid", action="open", item_id=int(item_id)).pack())
     b.button(text="❌ Отмена", callback_data="wictory:item:cancel_edit")
     b.adjust(2)
     return b.as_markup()
@@ -1359,7 +1447,7 @@ def kb_wictory_item_pick_bank_source(item_id: int) -> InlineKeyboardMarkup:
 
 def kb_wictory_item_banks(items: list[tuple[int, str]], *, item_id: int) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
-    for bank_id, name in items[:50]:
+    for bank_id, name in islice(items, 50):
         b.button(text=name, callback_data=f"wictory:item:set_bank:{int(item_id)}:{int(bank_id)}")
     b.button(text="⬅️ Назад", callback_data=f"wictory:item:open:{int(item_id)}")
     b.adjust(1)
@@ -1369,7 +1457,7 @@ def kb_wictory_item_banks(items: list[tuple[int, str]], *, item_id: int) -> Inli
 def kb_wictory_item_banks_for_source(items: list[tuple[int, str]], *, item_id: int, bank_source: str) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     src = (bank_source or "TG").upper()
-    for bank_id, name in items[:50]:
+    for bank_id, name in islice(items, 50):
         b.button(text=name, callback_data=f"wictory:item:set_bank_source:{int(item_id)}:{src}:{int(bank_id)}")
     b.button(text="⬅️ Назад", callback_data=f"wictory:item:edit_bank:{int(item_id)}")
     b.adjust(1)
@@ -1388,6 +1476,7 @@ def kb_wictory_item_media_manage(item_id: int, files_count: int) -> InlineKeyboa
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_pending_main() -> ReplyKeyboardMarkup:
     b = ReplyKeyboardBuilder()
     b.add(KeyboardButton(text="Запросить доступ"))
@@ -1395,48 +1484,38 @@ def kb_pending_main() -> ReplyKeyboardMarkup:
     return b.as_markup(resize_keyboard=True)
 
 
+@lru_cache(maxsize=128)
 def kb_team_lead_inline_main(*, live_count: int | None = None) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     suffix = f" ({int(live_count)})" if live_count is not None else ""
-    b.button(text=f"Лайв анкеты{suffix}", callback_data=TeamLeadMenuCb(action="live").pack())
-    b.button(text="Условия для сдачи", callback_data=TeamLeadMenuCb(action="banks").pack())
-    b.button(text="Дубликаты", callback_data=TeamLeadMenuCb(action="duplicates").pack())
-    b.button(text="Пользователи", callback_data=TeamLeadMenuCb(action="users").pack())
+    b.button(text=f"Лайв анкеты{suffix}", callback_data=_TL_MENU_LIVE_CB)
+    b.button(text="Условия для сдачи", callback_data=_TL_MENU_BANKS_CB)
+    b.button(text="Дубликаты", callback_data=_TL_MENU_DUPLICATES_CB)
+    b.button(text="Пользователи", callback_data=_TL_MENU_USERS_CB)
     b.adjust(2, 1, 1)
     return b.as_markup()
 
 
+@lru_cache(maxsize=16)
 def kb_tl_duplicate_filter_menu(*, current: str | None) -> InlineKeyboardMarkup:
-    cur = (current or "today").lower()
-    b = InlineKeyboardBuilder()
-    items = [
-        ("Сегодня", "today"),
-        ("Вчера", "yesterday"),
-        ("Текущая неделя", "week"),
-        ("Последние 7 дней", "last7"),
-        ("Текущий месяц", "month"),
-        ("Предыдущий месяц", "prev_month"),
-        ("Последние 30 дней", "last30"),
-        ("Текущий год", "year"),
-        ("За все время", "all"),
-    ]
-    for title, key in items:
-        prefix = "✅ " if key == cur else ""
-        b.button(text=f"{prefix}{title}", callback_data=f"tl:dup_filter_set:{key}")
-    b.button(text="Интервал дат", callback_data="tl:dup_filter_custom")
-    b.button(text="⬅️ Назад", callback_data=TeamLeadMenuCb(action="duplicates").pack())
-    b.adjust(1)
-    return b.as_markup()
+    return _build_filter_menu(
+        current,
+        set_prefix="tl:dup_filter_set:",
+        custom_cb="tl:dup_filter_custom",
+        back_cb=_TL_MENU_DUPLICATES_CB,
+    )
 
 
+@lru_cache(maxsize=1)
 def kb_tl_duplicates_list() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="📅 Фильтр", callback_data="tl:dup_filter")
-    b.button(text="🏠 Меню", callback_data=TeamLeadMenuCb(action="home").pack())
+    b.button(text="🏠 Меню", callback_data=_TL_MENU_HOME_CB)
     b.adjust(2)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_tl_duplicate_notice() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="Перейти", callback_data="tl:dup_notice_open")
@@ -1444,6 +1523,7 @@ def kb_tl_duplicate_notice() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
+@lru_cache(maxsize=1)
 def kb_tl_reject_back_inline() -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     b.button(text="⬅️ Назад", callback_data="tl:reject_back")
@@ -1451,17 +1531,20 @@ def kb_tl_reject_back_inline() -> InlineKeyboardMarkup:
     return b.as_markup()
 
 
-def kb_banks_list(bank_items: list[tuple[int, str]]) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    for bank_id, name in bank_items:
-        b.button(text=name, callback_data=BankCb(action="open", bank_id=bank_id).pack())
-    b.button(text="Создать условия", callback_data=BankCb(action="create", bank_id=None).pack())
-    b.button(text="Назад", callback_data=TeamLeadMenuCb(action="home").pack())
+@lru_cache(maxsize=256)
+def kb_banks_list(bank_items: tuple[tuple[int, str], ...]) -> InlineKeyboardMarkup:
+    """`bank_items` is keyed by content (id + label), so a renamed/added bank builds a new markup."""
     # One button per row looks cleaner and "full-width" in Telegram clients
-    b.adjust(1)
-    return b.as_markup()
+    rows = [
+        [_btn(name, BankCb(action="open", bank_id=bank_id).pack())]
+        for bank_id, name in bank_items
+    ]
+    rows.append([_btn("Создать условия", _BANK_CREATE_CB)])
+    rows.append([_btn("Назад", _TL_MENU_HOME_CB)])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@lru_cache(maxsize=2048)
 def kb_bank_open(bank_id: int, *, has_conditions: bool) -> InlineKeyboardMarkup:
     b = InlineKeyboardBuilder()
     if has_conditions:
@@ -1469,32 +1552,38 @@ def kb_bank_open(bank_id: int, *, has_conditions: bool) -> InlineKeyboardMarkup:
     else:
         b.button(text="Создать условия", callback_data=BankCb(action="setup", bank_id=bank_id).pack())
     b.button(text="🗑 Удалить банк", callback_data=BankEditCb(action="delete", bank_id=bank_id).pack())
-    b.button(text="Назад", callback_data=TeamLeadMenuCb(action="banks").pack())
+    b.button(text="Назад", callback_data=_TL_MENU_BANKS_CB)
     b.adjust(1)
     return b.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def kb_bank_edit(bank_id: int) -> InlineKeyboardMarkup:
-    b = InlineKeyboardBuilder()
-    b.button(text="Текст условий (TG)", callback_data=BankEditCb(action="instructions_tg", bank_id=bank_id).pack())
-    b.button(text="Текст условий (FB)", callback_data=BankEditCb(action="instructions_fb", bank_id=bank_id).pack())
-    b.button(text="Кол-во скринов (TG)", callback_data=BankEditCb(action="required_tg", bank_id=bank_id).pack())
-    b.button(text="Кол-во скринов (FB)", callback_data=BankEditCb(action="required_fb", bank_id=bank_id).pack())
-    b.button(text="Назад", callback_data=BankEditCb(action="back", bank_id=bank_id).pack())
-    b.adjust(1)
-    return b.as_markup()
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [_btn("Текст условий (TG)", BankEditCb(action="instructions_tg", bank_id=bank_id).pack())],
+            [_btn("Текст условий (FB)", BankEditCb(action="instructions_fb", bank_id=bank_id).pack())],
+            [_btn("Кол-во скринов (TG)", BankEditCb(action="required_tg", bank_id=bank_id).pack())],
+            [_btn("Кол-во скринов (FB)", BankEditCb(action="required_fb", bank_id=bank_id).pack())],
+            [_btn("Назад", BankEditCb(action="back", bank_id=bank_id).pack())],
+        ]
+    )
+
 
+# source -> ((label, BankEditCb action), ...) of the per-source condition fields
+_BANK_EDIT_SRC_FIELDS = {
+    "TG": (("Текст условий (TG)", "instructions_tg"), ("Кол-во скринов (TG)", "required_tg")),
+    "FB": (("Текст условий (FB)", "instructions_fb"), ("Кол-во скринов (FB)", "required_fb")),
+}
 
+
+@lru_cache(maxsize=2048)
 def kb_bank_edit_for_source(bank_id: int, *, source: str) -> InlineKeyboardMarkup:
-    src = (source or "TG").upper()
+    fields = _BANK_EDIT_SRC_FIELDS.get((source or "TG").upper(), _BANK_EDIT_SRC_FIELDS["TG"])
     b = InlineKeyboardBuilder()
     b.button(text="Название банка", callback_data=BankEditCb(action="rename", bank_id=bank_id).pack())
-    if src == "FB":
-        b.button(text="Текст условий (FB)", callback_data=BankEditCb(action="instructions_fb", bank_id=bank_id).pack())
-        b.button(text="Кол-во скринов (FB)", callback_data=BankEditCb(action="required_fb", bank_id=bank_id).pack())
-    else:
-        b.button(text="Текст условий (TG)", callback_data=BankEditCb(action="instructions_tg", bank_id=bank_id).pack())
-        b.button(text="Кол-во скринов (TG)", callback_data=BankEditCb(action="required_tg", bank_id=bank_id).pack())
+    for text, action in fields:
+        b.button(text=text, callback_data=BankEditCb(action=action, bank_id=bank_id).pack())
     b.button(text="🗑 Удалить банк", callback_data=BankEditCb(action="delete", bank_id=bank_id).pack())
     b.button(text="Назад", callback_data=BankEditCb(action="back", bank_id=bank_id).pack())
     b.adjust(1)
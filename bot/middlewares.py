@@ -1,13 +1,15 @@
 from __future__ import annotations
 
+import time
 from typing import Any, Awaitable, Callable, Dict
 
 from aiogram import BaseMiddleware
-from aiogram.types import Message, TelegramObject
+from aiogram.types import CallbackQuery, Message, TelegramObject
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select
 
-from bot.models import User
+from bot.models import User, UserRole
+from bot.repositories import get_user_auth
 
 
 class DBSessionMiddleware(BaseMiddleware):
@@ -72,6 +74,74 @@ class LastPrivateMessageTrackerMiddleware(BaseMiddleware):
         return await handler(event, data)
 
 
+class CallbackDebounceMiddleware(BaseMiddleware):
+    """
+    Drops repeated presses of the same inline button by the same user within `window` seconds.
+    The duplicate is answered (so the client spinner stops) and the handler is not run.
+    """
+
+    def __init__(self, window: float = 0.5) -> None:
+        super().__init__()
+        self._window = window
+        self._last: dict[tuple[int, str], float] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, CallbackQuery) or not event.from_user or not event.data:
+            return await handler(event, data)
+        now = time.monotonic()
+        key = (int(event.from_user.id), event.data)
+        if now - self._last.get(key, 0.0) < self._window:
+            try:
+                await event.answer()
+            except Exception:
+                pass
+            return None
+        if len(self._last) > 10_000:
+            self._last = {k: t for k, t in self._last.items() if now - t < self._window}
+        self._last[key] = now
+        return await handler(event, data)
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """
+    Router-level guard: resolves the sender once per update (TTL-cached UserAuth) and lets
+    the handler run only for `role`, injecting the snapshot as `data[key]`.
+    Requires DBSessionMiddleware to have put `session` into the handler data.
+    """
+
+    def __init__(self, role: UserRole, key: str) -> None:
+        super().__init__()
+        self._role = role
+        self._key = key
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        session = data.get("session")
+        if not from_user or not isinstance(session, AsyncSession):
+            return None
+        auth = await get_user_auth(session, int(from_user.id))
+        if not auth or auth.role != self._role:
+            if isinstance(event, CallbackQuery):
+                # stop the client's spinner instead of leaving the button hanging
+                try:
+                    await event.answer("Нет прав", show_alert=True)
+                except Exception:
+                    pass
+            return None
+        data[self._key] = auth
+        return await handler(event, data)
+
+
 class GroupMessageFilter:
     """
     Filter that can be used to block group messages at the router level.
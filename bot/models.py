@@ -1,12 +1,34 @@
 from __future__ import annotations
 
 import enum
+import json
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import BigInteger, DateTime, Enum, ForeignKey, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy import BigInteger, Boolean, DateTime, Enum, ForeignKey, Index, Integer, String, Text, UniqueConstraint, func, text
 from sqlalchemy.dialects.sqlite import JSON as SQLITE_JSON
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.types import TypeDecorator
+
+
+class NewlineList(TypeDecorator):
+    """
+    Short list of file_ids stored as one '\\n'-joined TEXT value (file_ids never contain
+    newlines). Rows still holding the old JSON array encoding are decoded on read.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return "\n".join(value or ())
+
+    def process_result_value(self, value, dialect):
+        if not value:
+            return []
+        if value[0] == "[":
+            return json.loads(value)
+        return value.split("\n")
 
 
 class Base(DeclarativeBase):
@@ -59,19 +81,28 @@ class User(Base):
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
-    shifts: Mapped[list["Shift"]] = relationship(back_populates="manager")
-    forms: Mapped[list["Form"]] = relationship(back_populates="manager")
+    # passive_deletes: deleting a User never touches these rows and SQLite runs without FK
+    # enforcement, so whoever deletes a user removes them first (delete_user_by_tg_id)
+    shifts: Mapped[list["Shift"]] = relationship(back_populates="manager", lazy="raise_on_sql", passive_deletes=True)
+    forms: Mapped[list["Form"]] = relationship(back_populates="manager", lazy="raise_on_sql", passive_deletes=True)
     forward_group: Mapped["ForwardGroup | None"] = relationship(back_populates="drop_managers")
     access_request: Mapped["AccessRequest | None"] = relationship(
         back_populates="user",
         uselist=False,
         foreign_keys="AccessRequest.user_id",
+        passive_deletes=True,
     )
-    duplicate_reports: Mapped[list["DuplicateReport"]] = relationship(back_populates="manager")
+    duplicate_reports: Mapped[list["DuplicateReport"]] = relationship(back_populates="manager", lazy="raise_on_sql", passive_deletes=True)
+
+
+# get_user_by_username matches on lower(username); expression indexes attach to the mapped table
+Index("ix_users_username_lower", func.lower(User.username))
 
 
 class DuplicateReport(Base):
     __tablename__ = "duplicate_reports"
+    # TL duplicates list: optional source filter + created_at period
+    __table_args__ = (Index("ix_duplicate_reports_source_created", "manager_source", "created_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     manager_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
@@ -94,16 +125,19 @@ class ForwardGroup(Base):
     title: Mapped[str | None] = mapped_column(String(128), nullable=True)
 
     last_checked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
-    is_confirmed: Mapped[bool] = mapped_column(Integer, default=0)  # sqlite bool
+    is_confirmed: Mapped[bool] = mapped_column(Boolean(create_constraint=False), default=False)  # stored as 0/1
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    drop_managers: Mapped[list["User"]] = relationship(back_populates="forward_group")
+    # passive_deletes: users must be unbound before the group is deleted (delete_forward_group)
+    drop_managers: Mapped[list["User"]] = relationship(back_populates="forward_group", lazy="raise_on_sql", passive_deletes=True)
 
 
 class Shift(Base):
     __tablename__ = "shifts"
+    # get_active_shift: the open shift of a manager
+    __table_args__ = (Index("ix_shifts_active", "manager_id", sqlite_where=text("ended_at IS NULL")),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     manager_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
@@ -113,7 +147,8 @@ class Shift(Base):
     dialogs_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     manager: Mapped["User"] = relationship(back_populates="shifts")
-    forms: Mapped[list["Form"]] = relationship(back_populates="shift")
+    # passive_deletes: a shift is only deleted together with its manager's forms (delete_user_by_tg_id)
+    forms: Mapped[list["Form"]] = relationship(back_populates="shift", lazy="raise_on_sql", passive_deletes=True)
 
 
 class BankCondition(Base):
@@ -129,12 +164,17 @@ class BankCondition(Base):
     instructions_fb: Mapped[str | None] = mapped_column(Text, nullable=True)
     required_screens_tg: Mapped[int | None] = mapped_column(Integer, nullable=True)
     required_screens_fb: Mapped[int | None] = mapped_column(Integer, nullable=True)
-    template_screens: Mapped[list[str]] = mapped_column(SQLITE_JSON, default=list)
+    template_screens: Mapped[list[str]] = mapped_column(NewlineList, default=list)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class Form(Base):
     __tablename__ = "forms"
+    __table_args__ = (
+        # duplicate probes: phone alone (find_forms_by_phone) or phone + bank
+        Index("ix_forms_phone_bank", "phone", "bank_name"),
+        Index("ix_forms_manager_status", "manager_id", "status"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     manager_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
@@ -149,7 +189,7 @@ class Form(Base):
     phone: Mapped[str | None] = mapped_column(String(32), nullable=True)
     bank_name: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
     password: Mapped[str | None] = mapped_column(String(16), nullable=True)
-    screenshots: Mapped[list[str]] = mapped_column(SQLITE_JSON, default=list)
+    screenshots: Mapped[list[str]] = mapped_column(NewlineList, default=list)
     comment: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     team_lead_comment: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -167,7 +207,11 @@ class AccessRequest(Base):
     """Persistent queue of access requests to become DROP_MANAGER."""
 
     __tablename__ = "access_requests"
-    __table_args__ = (UniqueConstraint("user_id", name="uq_access_requests_user_id"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", name="uq_access_requests_user_id"),
+        # next pending request: status filter + created_at order in one index walk
+        Index("ix_access_requests_status_created", "status", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
@@ -212,6 +256,10 @@ class ResourcePool(Base):
     __tablename__ = "resource_pool"
     __table_args__ = (
         UniqueConstraint("used_with_form_id", name="uq_resource_pool_used_with_form_id"),
+        # free items of a bank per source, a DM's active items, a creator's items by status
+        Index("ix_resource_pool_bank_source_status", "bank_id", "source", "status"),
+        Index("ix_resource_pool_assigned_status", "assigned_to_user_id", "status"),
+        Index("ix_resource_pool_created_by_status", "created_by_user_id", "status"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -222,7 +270,7 @@ class ResourcePool(Base):
     status: Mapped[ResourceStatus] = mapped_column(Enum(ResourceStatus), default=ResourceStatus.FREE, index=True)
 
     text_data: Mapped[str | None] = mapped_column(Text, nullable=True)
-    screenshots: Mapped[list[str]] = mapped_column(SQLITE_JSON, default=list)
+    screenshots: Mapped[list[str]] = mapped_column(NewlineList, default=list)
 
     created_by_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     assigned_to_user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True, index=True)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+from bot.models import ResourcePool
+
+INVALID_LIST_TTL_SECONDS = 15.0
+
+InvalidListItems = tuple[tuple[int, str], ...]
+# (monotonic expiry, ((item_id, label), ...)) of the shared WICTORY invalid list
+_invalid_list: tuple[float, InvalidListItems] | None = None
+# bumped on every committed pool write; derived caches (e.g. stats text) compare it
+_generation = 0
+# session.info key: set when the session wrote resource_pool rows that affect the caches
+_PENDING = "pool_cache_changed"
+# ResourcePool columns the invalid list / stats text depend on
+_WATCHED_FIELDS = ("status", "bank_id", "type")
+
+
+def get_cached_invalid_list() -> InvalidListItems | None:
+    cached = _invalid_list
+    if cached is None or cached[0] <= time.monotonic():
+        return None
+    return cached[1]
+
+
+def cache_invalid_list(items: InvalidListItems, generation: int) -> None:
+    """`generation` is pool_generation() read before the list was loaded; a stale load is dropped."""
+    global _invalid_list
+    if generation != _generation:
+        return
+    _invalid_list = (time.monotonic() + INVALID_LIST_TTL_SECONDS, items)
+
+
+def invalidate_invalid_list() -> None:
+    global _invalid_list
+    _invalid_list = None
+
+
+def pool_generation() -> int:
+    return _generation
+
+
+def _bump() -> None:
+    global _generation
+    _generation += 1
+    invalidate_invalid_list()
+
+
+def note_pool_changed(session: AsyncSession) -> None:
+    """
+    Bulk UPDATEs on resource_pool bypass the flush hook below; they call this instead.
+    The caches are dropped when `session` commits, not before: a concurrent reader would
+    otherwise re-cache the rows this transaction is about to replace.
+    """
+    session.info[_PENDING] = True
+
+
+# Items enter/leave the list (or change their label) through plain attribute writes in
+# several places (DM marks invalid, WICTORY edits/returns); catch them all on flush.
+@event.listens_for(Session, "after_flush")
+def _on_session_flush(session: Session, flush_context) -> None:
+    if session.info.get(_PENDING):
+        return
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, ResourcePool):
+            session.info[_PENDING] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, ResourcePool) and any(inspect(obj).attrs[f].history.has_changes() for f in _WATCHED_FIELDS):
+            session.info[_PENDING] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _on_session_commit(session: Session) -> None:
+    if session.info.pop(_PENDING, False):
+        _bump()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _on_session_rollback(session: Session, previous_transaction: SessionTransaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING, None)
@@ -1,12 +1,29 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Iterable
+from typing import Any, AsyncIterator, Iterable
 
-from sqlalchemy import and_, delete, func, or_, select, update
-from sqlalchemy.orm import aliased
+from sqlalchemy import Integer, and_, bindparam, case, delete, exists, func, inspect, lambda_stmt, or_, select, update
+from sqlalchemy.orm import aliased, selectinload
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from bot import bank_cache
+from bot.pool_cache import note_pool_changed
+from bot.auth_cache import (
+    TeamLeadAuth,
+    UserAuth,
+    auth_epoch,
+    cache_team_lead,
+    cache_user,
+    get_cached_team_lead,
+    get_cached_user,
+    invalidate_team_lead_on_commit,
+    is_miss,
+)
 from bot.models import (
     AccessRequest,
     AccessRequestStatus,
@@ -26,7 +43,7 @@ from bot.models import (
 )
 
 
-DEFAULT_BANKS = ["Пумб", "Моно", "Альянс", "Фрибанк", "Майбанк"]
+DEFAULT_BANKS = ("Пумб", "Моно", "Альянс", "Фрибанк", "Майбанк")
 
 
 async def ensure_default_banks(session: AsyncSession) -> None:
@@ -42,28 +59,107 @@ async def upsert_user_from_tg(
     first_name: str | None,
     last_name: str | None,
 ) -> User:
-    res = await session.execute(select(User).where(User.tg_id == tg_id))
+    res = await session.execute(lambda_stmt(lambda: select(User).where(User.tg_id == tg_id)))
     user = res.scalar_one_or_none()
     if user is None:
-        user = User(tg_id=tg_id, username=username, first_name=first_name, last_name=last_name)
-        session.add(user)
-        await session.flush()
-        return user
+        ins = _upsert_insert(session, User)
+        if ins is None:
+            user = User(tg_id=tg_id, username=username, first_name=first_name, last_name=last_name)
+            session.add(user)
+            await session.flush()
+            return user
+        # first sighting: one atomic upsert, so two concurrent first updates can't both INSERT
+        stmt = ins.values(tg_id=tg_id, username=username, first_name=first_name, last_name=last_name)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.tg_id],
+            set_={"username": stmt.excluded.username, "first_name": stmt.excluded.first_name, "last_name": stmt.excluded.last_name},
+        )
+        return await _upsert_returning(session, stmt, User)
     user.username = username
     user.first_name = first_name
     user.last_name = last_name
     return user
 
 
+def _upsert_insert(session: AsyncSession, cls: type) -> Any:
+    """Dialect insert() for `cls` with ON CONFLICT support, or None on backends without one."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert(cls)
+    if dialect == "postgresql":
+        return pg_insert(cls)
+    return None
+
+
+async def _upsert_returning(session: AsyncSession, stmt, cls: type) -> Any:
+    """INSERT .. ON CONFLICT .. RETURNING the row as an ORM object (refreshing one already in the session)."""
+    return await session.scalar(stmt.returning(cls), execution_options={"populate_existing": True})
+
+
 async def set_user_role(session: AsyncSession, tg_id: int, role: UserRole) -> None:
-    res = await session.execute(select(User).where(User.tg_id == tg_id))
+    res = await session.execute(lambda_stmt(lambda: select(User).where(User.tg_id == tg_id)))
     user = res.scalar_one()
     user.role = role
 
 
+def _memo_get(session: AsyncSession, key: tuple, cls: type) -> Any:
+    """
+    Per-session lookup memo: `key` -> primary key of a row found earlier in this session.
+    Only rows still held, loaded and not deleted in the session's identity map are returned.
+    """
+    pk = session.info.get("_row_memo", {}).get(key)
+    if pk is None:
+        return None
+    obj = session.identity_map.get(identity_key(cls, pk))
+    if obj is None:
+        return None
+    st = inspect(obj)
+    if st.expired_attributes or st.deleted or obj in session.deleted:
+        return None
+    return obj
+
+
+def _memo_put(session: AsyncSession, key: tuple, pk: int) -> None:
+    session.info.setdefault("_row_memo", {})[key] = pk
+
+
+def _memo_drop(session: AsyncSession, kind: str) -> None:
+    memo = session.info.get("_row_memo")
+    if memo:
+        for key in [k for k in memo if k[0] == kind]:
+            del memo[key]
+
+
 async def get_user_by_tg_id(session: AsyncSession, tg_id: int) -> User | None:
-    res = await session.execute(select(User).where(User.tg_id == tg_id))
-    return res.scalar_one_or_none()
+    key = ("user_tg", int(tg_id))
+    user = _memo_get(session, key, User)
+    if user is not None:
+        return user
+    res = await session.execute(lambda_stmt(lambda: select(User).where(User.tg_id == tg_id)))
+    user = res.scalar_one_or_none()
+    if user is not None:
+        _memo_put(session, key, user.id)
+    return user
+
+
+async def get_user_auth(session: AsyncSession, tg_id: int) -> UserAuth | None:
+    """
+    Cached (USER_TTL_SECONDS) snapshot of a user's id/role/source for permission checks.
+    Committed role/source writes and deletes on User drop it (see auth_cache); unknown
+    users are not cached.
+    """
+    cached = get_cached_user(tg_id)
+    if not is_miss(cached):
+        return cached  # type: ignore[return-value]
+    epoch = auth_epoch()
+    user = await get_user_by_tg_id(session, tg_id)
+    auth = (
+        UserAuth(id=int(user.id), tg_id=int(user.tg_id), role=user.role, manager_source=user.manager_source)
+        if user
+        else None
+    )
+    cache_user(tg_id, auth, epoch)
+    return auth
 
 
 async def get_user_by_username(session: AsyncSession, username: str) -> User | None:
@@ -75,15 +171,12 @@ async def get_user_by_username(session: AsyncSession, username: str) -> User | N
 
 
 async def get_user_by_id(session: AsyncSession, user_id: int) -> User | None:
-    res = await session.execute(select(User).where(User.id == user_id))
-    return res.scalar_one_or_none()
+    # identity-map hit when the user was already loaded in this session
+    return await session.get(User, user_id)
 
 
 async def set_user_forward_group(session: AsyncSession, user_id: int, group_id: int | None) -> None:
-    user = await get_user_by_id(session, user_id)
-    if not user:
-        return
-    user.forward_group_id = group_id
+    await session.execute(update(User).where(User.id == user_id).values(forward_group_id=group_id))
 
 
 async def list_users(session: AsyncSession) -> list[User]:
@@ -91,13 +184,48 @@ async def list_users(session: AsyncSession) -> list[User]:
     return list(res.scalars().all())
 
 
+async def iter_users(session: AsyncSession, *, chunk: int = 500) -> AsyncIterator[User]:
+    """All users in id order, loaded `chunk` rows at a time (keyset pagination)."""
+    last_id = 0
+    while True:
+        res = await session.execute(select(User).where(User.id > last_id).order_by(User.id.asc()).limit(chunk))
+        users = res.scalars().all()
+        for u in users:
+            yield u
+        if len(users) < chunk:
+            return
+        last_id = int(users[-1].id)
+
+
+async def list_user_tg_ids_by_role(session: AsyncSession, role: UserRole) -> list[int]:
+    res = await session.execute(select(User.tg_id).where(User.role == role).order_by(User.id.asc()))
+    return [int(x) for x in res.scalars().all()]
+
+
 async def get_team_lead_by_tg_id(session: AsyncSession, tg_id: int) -> TeamLead | None:
-    res = await session.execute(select(TeamLead).where(TeamLead.tg_id == tg_id))
+    res = await session.execute(lambda_stmt(lambda: select(TeamLead).where(TeamLead.tg_id == tg_id)))
     return res.scalar_one_or_none()
 
 
+async def require_team_lead(session: AsyncSession, tg_id: int) -> TeamLeadAuth | None:
+    """
+    Permission check that keeps the result: returns a TeamLeadAuth snapshot (truthy) or None,
+    so handlers can reuse it instead of querying team_leads again.
+    Hits are cached per tg_id for TEAM_LEAD_TTL_SECONDS, dropped when an add/delete_team_lead
+    commits; "not a team lead" always goes to the DB.
+    """
+    cached = get_cached_team_lead(tg_id)
+    if not is_miss(cached):
+        return cached  # type: ignore[return-value]
+    epoch = auth_epoch()
+    tl = await get_team_lead_by_tg_id(session, tg_id)
+    auth = TeamLeadAuth(tg_id=int(tl.tg_id), source=tl.source or TeamLeadSource.TG) if tl else None
+    cache_team_lead(tg_id, auth, epoch)
+    return auth
+
+
 async def is_team_lead(session: AsyncSession, tg_id: int) -> bool:
-    return (await get_team_lead_by_tg_id(session, tg_id)) is not None
+    return (await require_team_lead(session, tg_id)) is not None
 
 
 async def list_team_leads(session: AsyncSession) -> list[TeamLead]:
@@ -105,27 +233,39 @@ async def list_team_leads(session: AsyncSession) -> list[TeamLead]:
     return list(res.scalars().all())
 
 
+_TL_SOURCES = {"TG": TeamLeadSource.TG, "FB": TeamLeadSource.FB}
+
+
+def _to_tl_source(source: str | None) -> TeamLeadSource:
+    return _TL_SOURCES.get((source or "TG").upper(), TeamLeadSource.TG)
+
+
 async def list_team_lead_ids_by_source(session: AsyncSession, source: str) -> list[int]:
-    src = (source or "TG").upper()
-    src_enum = TeamLeadSource.FB if src == "FB" else TeamLeadSource.TG
+    src_enum = _to_tl_source(source)
     res = await session.execute(select(TeamLead.tg_id).where(TeamLead.source == src_enum).order_by(TeamLead.tg_id.asc()))
     return [int(x) for x in res.scalars().all()]
 
 
 async def add_team_lead(session: AsyncSession, tg_id: int, source: str) -> TeamLead:
-    src = (source or "TG").upper()
-    src_enum = TeamLeadSource.FB if src == "FB" else TeamLeadSource.TG
-    existing = await get_team_lead_by_tg_id(session, tg_id)
-    if existing:
-        existing.source = src_enum
-        return existing
-    tl = TeamLead(tg_id=tg_id, source=src_enum)
-    session.add(tl)
-    await session.flush()
-    return tl
+    src_enum = _to_tl_source(source)
+    invalidate_team_lead_on_commit(session, tg_id)
+    ins = _upsert_insert(session, TeamLead)
+    if ins is None:
+        existing = await get_team_lead_by_tg_id(session, tg_id)
+        if existing:
+            existing.source = src_enum
+            return existing
+        tl = TeamLead(tg_id=tg_id, source=src_enum)
+        session.add(tl)
+        await session.flush()
+        return tl
+    stmt = ins.values(tg_id=tg_id, source=src_enum)
+    stmt = stmt.on_conflict_do_update(index_elements=[TeamLead.tg_id], set_={"source": stmt.excluded.source})
+    return await _upsert_returning(session, stmt, TeamLead)
 
 
 async def delete_team_lead(session: AsyncSession, tg_id: int) -> int:
+    invalidate_team_lead_on_commit(session, tg_id)
     res = await session.execute(delete(TeamLead).where(TeamLead.tg_id == tg_id))
     return int(res.rowcount or 0)
 
@@ -143,7 +283,8 @@ async def upsert_access_request(session: AsyncSession, user_id: int) -> bool:
         return True
     if req.status != AccessRequestStatus.PENDING:
         req.status = AccessRequestStatus.PENDING
-        req.created_at = datetime.utcnow()
+        # DB clock, same as the column's server default on first insert
+        req.created_at = func.now()
         req.processed_at = None
         req.processed_by_id = None
         return True
@@ -179,7 +320,7 @@ async def set_access_request_status(
         session.add(req)
         await session.flush()
     req.status = status
-    req.processed_at = datetime.utcnow()
+    req.processed_at = func.now()
     req.processed_by_id = processed_by_user_id
 
 
@@ -210,14 +351,19 @@ async def delete_user_by_tg_id(session: AsyncSession, tg_id: int) -> bool:
     await session.execute(delete(Form).where(Form.manager_id == user_id))
     await session.execute(delete(Shift).where(Shift.manager_id == user_id))
     await session.execute(delete(DuplicateReport).where(DuplicateReport.manager_id == user_id))
-    # user
+    # user: its one-to-many relationships are passive_deletes, so the flush does not
+    # load the (already emptied) collections back just to detach them
     await session.delete(user)
     return True
 
 
 async def get_active_shift(session: AsyncSession, manager_user_id: int) -> Shift | None:
     res = await session.execute(
-        select(Shift).where(and_(Shift.manager_id == manager_user_id, Shift.ended_at.is_(None))).order_by(Shift.id.desc())
+        lambda_stmt(
+            lambda: select(Shift)
+            .where(and_(Shift.manager_id == manager_user_id, Shift.ended_at.is_(None)))
+            .order_by(Shift.id.desc())
+        )
     )
     return res.scalar_one_or_none()
 
@@ -241,12 +387,16 @@ async def create_form(session: AsyncSession, manager_user_id: int, shift_id: int
 
 
 async def get_form(session: AsyncSession, form_id: int) -> Form | None:
-    res = await session.execute(select(Form).where(Form.id == form_id))
+    res = await session.execute(lambda_stmt(lambda: select(Form).where(Form.id == form_id)))
     return res.scalar_one_or_none()
 
 
-async def list_pending_forms(session: AsyncSession, limit: int = 10) -> list[Form]:
-    res = await session.execute(select(Form).where(Form.status == FormStatus.PENDING).order_by(Form.id.desc()).limit(limit))
+async def list_pending_forms(session: AsyncSession, limit: int = 10, *, with_managers: bool = False) -> list[Form]:
+    """with_managers: also load the forms' managers (one IN query), so get_user_by_id on them is free."""
+    q = select(Form).where(Form.status == FormStatus.PENDING).order_by(Form.id.desc()).limit(limit)
+    if with_managers:
+        q = q.options(selectinload(Form.manager))
+    res = await session.execute(q)
     return list(res.scalars().all())
 
 
@@ -272,18 +422,13 @@ async def list_dm_approved_without_payment(session: AsyncSession, *, manager_use
 
 
 async def mark_form_payment_done(session: AsyncSession, *, form_id: int) -> None:
-    form = await get_form(session, form_id)
-    if not form:
-        return
-    form.payment_done_at = datetime.utcnow()
+    await session.execute(update(Form).where(Form.id == form_id).values(payment_done_at=datetime.utcnow()))
 
 
 async def set_form_status(session: AsyncSession, form_id: int, status: FormStatus, team_lead_comment: str | None = None) -> None:
-    form = await get_form(session, form_id)
-    if not form:
-        return
-    form.status = status
-    form.team_lead_comment = team_lead_comment
+    await session.execute(
+        update(Form).where(Form.id == form_id).values(status=status, team_lead_comment=team_lead_comment)
+    )
 
 
 async def approve_form_if_pending(session: AsyncSession, *, form_id: int) -> bool:
@@ -299,6 +444,10 @@ async def get_bank_by_name(session: AsyncSession, name: str) -> BankCondition |
     needle = str(name or "").strip()
     if not needle:
         return None
+    key = ("bank_name", needle)
+    bank = _memo_get(session, key, BankCondition)
+    if bank is not None:
+        return bank
     # Compare normalized names so TG/FB TL can reuse one shared bank record
     # even when the input differs only by case or extra spaces.
     res = await session.execute(
@@ -306,20 +455,110 @@ async def get_bank_by_name(session: AsyncSession, name: str) -> BankCondition |
             func.lower(func.trim(BankCondition.name)) == func.lower(func.trim(needle))
         )
     )
-    return res.scalar_one_or_none()
+    bank = res.scalar_one_or_none()
+    if bank is not None:
+        _memo_put(session, key, bank.id)
+    return bank
+
+
+@dataclass(frozen=True, slots=True)
+class BankInstructions:
+    """Pre-stripped projection of the condition fields of a bank (legacy/TG/FB)."""
+
+    ins: str = ""
+    ins_tg: str = ""
+    ins_fb: str = ""
+    rs: int | None = None
+    rs_tg: int | None = None
+    rs_fb: int | None = None
+
+
+def bank_instructions(bank: BankCondition | Any) -> BankInstructions:
+    """
+    Returns the condition projection of a bank (or a list_bank_source_rows row),
+    computed from its current column values.
+    """
+    return BankInstructions(
+        ins=(bank.instructions or "").strip(),
+        ins_tg=(bank.instructions_tg or "").strip(),
+        ins_fb=(bank.instructions_fb or "").strip(),
+        rs=bank.required_screens,
+        rs_tg=bank.required_screens_tg,
+        rs_fb=bank.required_screens_fb,
+    )
+
+
+def pick_banks_for_source(banks: list, source: str | None) -> list:
+    """
+    Banks offered to `source` ("TG"/"FB"): those with conditions for it, plus legacy-only
+    ones; if none qualify, every bank not configured for the other source only.
+    """
+    fb = (source or "TG").upper() == "FB"
+    rows = []
+    for b in banks:
+        i = bank_instructions(b)
+        has_tg = bool(i.ins_tg) or i.rs_tg is not None
+        has_fb = bool(i.ins_fb) or i.rs_fb is not None
+        own, other = (has_fb, has_tg) if fb else (has_tg, has_fb)
+        rows.append((b, own, other, bool(i.ins) or i.rs is not None))
+    picked = [b for b, own, other, legacy in rows if own or (legacy and not other)]
+    if picked:
+        return picked
+    return [b for b, own, other, _ in rows if own or not other]
 
 
 async def get_bank(session: AsyncSession, bank_id: int) -> BankCondition | None:
-    res = await session.execute(select(BankCondition).where(BankCondition.id == bank_id))
+    res = await session.execute(lambda_stmt(lambda: select(BankCondition).where(BankCondition.id == bank_id)))
     return res.scalar_one_or_none()
 
 
+async def get_banks_by_ids(session: AsyncSession, ids: Iterable[int]) -> dict[int, BankCondition]:
+    """Bulk variant of get_bank: one `IN (...)` query, result keyed by bank id."""
+    wanted = {int(x) for x in ids}
+    if not wanted:
+        return {}
+    res = await session.execute(select(BankCondition).where(BankCondition.id.in_(wanted)))
+    return {int(b.id): b for b in res.scalars().all()}
+
+
 async def list_banks(session: AsyncSession) -> list[BankCondition]:
     res = await session.execute(select(BankCondition).order_by(BankCondition.name.asc()))
     return list(res.scalars().all())
 
 
+async def list_bank_source_rows(session: AsyncSession) -> list:
+    """
+    Column rows (no ORM entities) with id, name and the per-source instruction/screen fields,
+    ordered by name: enough to pick banks for a source without hydrating BankCondition.
+    """
+    res = await session.execute(
+        select(
+            BankCondition.id,
+            BankCondition.name,
+            BankCondition.instructions,
+            BankCondition.required_screens,
+            BankCondition.instructions_tg,
+            BankCondition.instructions_fb,
+            BankCondition.required_screens_tg,
+            BankCondition.required_screens_fb,
+        ).order_by(BankCondition.name.asc())
+    )
+    return list(res.all())
+
+
+async def list_bank_items_cached(session: AsyncSession) -> tuple[tuple[int, str], ...]:
+    """(id, name) of all banks ordered by name, shared across updates for bank_cache.BANK_ITEMS_TTL_SECONDS."""
+
+    async def _load() -> tuple[tuple[int, str], ...]:
+        res = await session.execute(select(BankCondition.id, BankCondition.name).order_by(BankCondition.name.asc()))
+        return tuple((int(bid), str(name)) for bid, name in res.all())
+
+    return await bank_cache.get_bank_items(_load)
+
+
 async def delete_bank_condition(session: AsyncSession, bank_id: int) -> bool:
+    bank_cache.invalidate_bank(bank_id)
+    _memo_drop(session, "bank_name")
     bank = await get_bank(session, bank_id)
     if not bank:
         return False
@@ -333,24 +572,43 @@ async def list_forward_groups(session: AsyncSession) -> list[ForwardGroup]:
 
 
 async def get_forward_group_by_id(session: AsyncSession, group_id: int) -> ForwardGroup | None:
-    res = await session.execute(select(ForwardGroup).where(ForwardGroup.id == group_id))
-    return res.scalar_one_or_none()
+    return await session.get(ForwardGroup, group_id)
+
+
+async def get_user_with_forward_group(
+    session: AsyncSession, user_id: int
+) -> tuple[User | None, ForwardGroup | None]:
+    """User and its bound forward group in one round-trip (LEFT JOIN)."""
+    res = await session.execute(
+        select(User, ForwardGroup)
+        .outerjoin(ForwardGroup, ForwardGroup.id == User.forward_group_id)
+        .where(User.id == user_id)
+    )
+    row = res.first()
+    if row is None:
+        return None, None
+    return row[0], row[1]
 
 
 async def get_forward_group_by_chat_id(session: AsyncSession, chat_id: int) -> ForwardGroup | None:
-    res = await session.execute(select(ForwardGroup).where(ForwardGroup.chat_id == chat_id))
+    res = await session.execute(lambda_stmt(lambda: select(ForwardGroup).where(ForwardGroup.chat_id == chat_id)))
     return res.scalar_one_or_none()
 
 
 async def create_forward_group(session: AsyncSession, *, chat_id: int, title: str | None = None) -> ForwardGroup:
-    existing = await get_forward_group_by_chat_id(session, chat_id)
-    if existing:
-        existing.title = title
-        return existing
-    g = ForwardGroup(chat_id=chat_id, title=title, is_confirmed=False)
-    session.add(g)
-    await session.flush()
-    return g
+    ins = _upsert_insert(session, ForwardGroup)
+    if ins is None:
+        existing = await get_forward_group_by_chat_id(session, chat_id)
+        if existing:
+            existing.title = title
+            return existing
+        g = ForwardGroup(chat_id=chat_id, title=title, is_confirmed=False)
+        session.add(g)
+        await session.flush()
+        return g
+    stmt = ins.values(chat_id=chat_id, title=title, is_confirmed=False)
+    stmt = stmt.on_conflict_do_update(index_elements=[ForwardGroup.chat_id], set_={"title": stmt.excluded.title})
+    return await _upsert_returning(session, stmt, ForwardGroup)
 
 
 async def delete_forward_group(session: AsyncSession, group_id: int) -> bool:
@@ -358,9 +616,7 @@ async def delete_forward_group(session: AsyncSession, group_id: int) -> bool:
     if not g:
         return False
     # unbind users
-    res = await session.execute(select(User).where(User.forward_group_id == group_id))
-    for u in res.scalars().all():
-        u.forward_group_id = None
+    await session.execute(update(User).where(User.forward_group_id == group_id).values(forward_group_id=None))
     await session.delete(g)
     return True
 
@@ -396,6 +652,7 @@ async def create_bank(session: AsyncSession, name: str) -> BankCondition:
     )
     session.add(bank)
     await session.flush()
+    bank_cache.invalidate_bank(int(bank.id))
     return bank
 
 
@@ -412,6 +669,8 @@ async def update_bank(
     required_screens_fb: int | None | Any = ...,
     template_screens: list[str] | Any = ...,
 ) -> None:
+    bank_cache.invalidate_bank(bank_id)
+    _memo_drop(session, "bank_name")
     bank = await get_bank(session, bank_id)
     if not bank:
         return
@@ -420,12 +679,10 @@ async def update_bank(
         new_name = str(name or "").strip()
         if new_name and new_name != old_name:
             bank.name = new_name
-            res_forms = await session.execute(select(Form).where(Form.bank_name == old_name))
-            for f in res_forms.scalars().all():
-                f.bank_name = new_name
-            res_dups = await session.execute(select(DuplicateReport).where(DuplicateReport.bank_name == old_name))
-            for r in res_dups.scalars().all():
-                r.bank_name = new_name
+            await session.execute(update(Form).where(Form.bank_name == old_name).values(bank_name=new_name))
+            await session.execute(
+                update(DuplicateReport).where(DuplicateReport.bank_name == old_name).values(bank_name=new_name)
+            )
     if instructions is not ...:
         bank.instructions = instructions
     if instructions_tg is not ...:
@@ -442,10 +699,6 @@ async def update_bank(
         bank.template_screens = template_screens
 
 
-def iter_team_lead_ids(team_lead_ids: Iterable[int]) -> list[int]:
-    return list(team_lead_ids)
-
-
 async def get_form_counts_by_manager(session: AsyncSession) -> dict[int, dict[FormStatus, int]]:
     """
     Returns counts of forms grouped by manager_id and status.
@@ -502,27 +755,20 @@ async def count_rejected_forms_by_user_id(session: AsyncSession, user_id: int) -
     return int(res.scalar() or 0)
 
 
-async def list_all_forms(session: AsyncSession) -> list[Form]:
-    """Get all forms in the system."""
-    res = await session.execute(
-        select(Form).order_by(Form.id.desc())
-    )
-    return list(res.scalars().all())
-
-
-async def list_all_forms_in_range(
+async def list_form_rows_in_range(
     session: AsyncSession,
     *,
     created_from: datetime | None,
     created_to: datetime | None,
-) -> list[Form]:
-    q = select(Form)
+) -> list[Any]:
+    """(id, status, traffic_type, bank_name) rows for the developer forms list; skips JSON/TEXT columns."""
+    q = select(Form.id, Form.status, Form.traffic_type, Form.bank_name)
     if created_from is not None:
         q = q.where(Form.created_at >= created_from)
     if created_to is not None:
         q = q.where(Form.created_at < created_to)
     res = await session.execute(q.order_by(Form.id.desc()))
-    return list(res.scalars().all())
+    return list(res.all())
 
 
 async def list_user_forms_in_range(
@@ -546,11 +792,26 @@ async def find_forms_by_phone(session: AsyncSession, phone: str) -> list[Form]:
     return list(res.scalars().all())
 
 
-async def phone_bank_duplicate_exists(session: AsyncSession, *, phone: str, bank_name: str, exclude_form_id: int | None = None) -> Form | None:
-    q = select(Form).where(and_(Form.phone == phone, Form.bank_name == bank_name))
-    if exclude_form_id is not None:
-        q = q.where(Form.id != exclude_form_id)
-    res = await session.execute(q.order_by(Form.id.desc()).limit(1))
+# Built once at import and reused with bound values; exclude_form_id=None matches every form.
+_exclude_form_id = bindparam("exclude_form_id", type_=Integer)
+_PHONE_BANK_MATCH = and_(
+    Form.phone == bindparam("phone"),
+    Form.bank_name == bindparam("bank_name"),
+    or_(_exclude_form_id.is_(None), Form.id != _exclude_form_id),
+)
+_PHONE_BANK_EXISTS = select(exists().where(_PHONE_BANK_MATCH))
+_PHONE_BANK_LATEST = select(Form).where(_PHONE_BANK_MATCH).order_by(Form.id.desc()).limit(1)
+
+
+async def phone_bank_duplicate_exists(session: AsyncSession, *, phone: str, bank_name: str, exclude_form_id: int | None = None) -> bool:
+    params = {"phone": phone, "bank_name": bank_name, "exclude_form_id": exclude_form_id}
+    return bool(await session.scalar(_PHONE_BANK_EXISTS, params))
+
+
+async def find_phone_bank_duplicate(session: AsyncSession, *, phone: str, bank_name: str, exclude_form_id: int | None = None) -> Form | None:
+    """Latest other form with the same phone and bank, for callers that need its manager etc."""
+    params = {"phone": phone, "bank_name": bank_name, "exclude_form_id": exclude_form_id}
+    res = await session.execute(_PHONE_BANK_LATEST, params)
     return res.scalar_one_or_none()
 
 
@@ -602,8 +863,7 @@ async def list_all_access_requests(session: AsyncSession) -> list[AccessRequest]
     return list(res.scalars().all())
 
 
-async def create_resource_pool_item(
-    session: AsyncSession,
+def build_resource_pool_item(
     *,
     source: str,
     bank_id: int,
@@ -613,22 +873,50 @@ async def create_resource_pool_item(
     screenshots: list[str] | None,
     created_by_user_id: int,
 ) -> ResourcePool:
-    t = ResourceType(resource_type)
-    item = ResourcePool(
+    """New FREE pool row, not yet added to any session (see create_resource_pool_items)."""
+    return ResourcePool(
         source=(source or "TG").upper(),
         bank_id=int(bank_id),
         tg_bank_id=(int(tg_bank_id) if tg_bank_id else None),
-        type=t,
+        type=ResourceType(resource_type),
         status=ResourceStatus.FREE,
         text_data=text_data,
         screenshots=list(screenshots or []),
         created_by_user_id=int(created_by_user_id),
     )
+
+
+async def create_resource_pool_item(
+    session: AsyncSession,
+    *,
+    source: str,
+    bank_id: int,
+    tg_bank_id: int | None = None,
+    resource_type: str,
+    text_data: str | None,
+    screenshots: list[str] | None,
+    created_by_user_id: int,
+) -> ResourcePool:
+    item = build_resource_pool_item(
+        source=source,
+        bank_id=bank_id,
+        tg_bank_id=tg_bank_id,
+        resource_type=resource_type,
+        text_data=text_data,
+        screenshots=screenshots,
+        created_by_user_id=created_by_user_id,
+    )
     session.add(item)
     await session.flush()
     return item
 
 
+async def create_resource_pool_items(session: AsyncSession, items: list[ResourcePool]) -> None:
+    """Adds rows from build_resource_pool_item with one flush; the INSERTs go out as one batch."""
+    session.add_all(items)
+    await session.flush()
+
+
 async def list_pool_items_filtered(
     session: AsyncSession,
     *,
@@ -658,37 +946,23 @@ async def list_pool_items_filtered(
 
 
 async def list_pool_stats_by_bank(session: AsyncSession, *, source: str | None = None) -> list[tuple[BankCondition, dict[str, int]]]:
-    banks = await list_banks(session)
+    # banks and their counters in one round trip; the outer join leaves zeroes for empty banks
+    on = ResourcePool.bank_id == BankCondition.id
+    if source:
+        on = and_(on, ResourcePool.source == source.upper())
+    keys = [t.value for t in ResourceType] + [f"status_{st.value}" for st in ResourceStatus]
+    sums = [func.sum(case((ResourcePool.type == t, 1), else_=0)) for t in ResourceType] + [
+        func.sum(case((ResourcePool.status == st, 1), else_=0)) for st in ResourceStatus
+    ]
+    q = (
+        select(BankCondition, *sums)
+        .outerjoin(ResourcePool, on)
+        .group_by(BankCondition.id)
+        .order_by(BankCondition.name.asc())
+    )
     out: list[tuple[BankCondition, dict[str, int]]] = []
-    for b in banks:
-        stats: dict[str, int] = {
-            "link": 0,
-            "esim": 0,
-            "link_esim": 0,
-            "status_free": 0,
-            "status_assigned": 0,
-            "status_used": 0,
-            "status_invalid": 0,
-            "total": 0,
-        }
-        for t in (ResourceType.LINK, ResourceType.ESIM, ResourceType.LINK_ESIM):
-            q = select(func.count(ResourcePool.id)).where(
-                ResourcePool.bank_id == int(b.id),
-                ResourcePool.type == t,
-            )
-            if source:
-                q = q.where(ResourcePool.source == source.upper())
-            res = await session.execute(q)
-            stats[t.value] = int(res.scalar() or 0)
-        for s in (ResourceStatus.FREE, ResourceStatus.ASSIGNED, ResourceStatus.USED, ResourceStatus.INVALID):
-            q = select(func.count(ResourcePool.id)).where(
-                ResourcePool.bank_id == int(b.id),
-                ResourcePool.status == s,
-            )
-            if source:
-                q = q.where(ResourcePool.source == source.upper())
-            res = await session.execute(q)
-            stats[f"status_{s.value}"] = int(res.scalar() or 0)
+    for b, *values in (await session.execute(q)).all():
+        stats = {k: int(v or 0) for k, v in zip(keys, values)}
         stats["total"] = stats["status_free"] + stats["status_assigned"] + stats["status_used"] + stats["status_invalid"]
         out.append((b, stats))
     return out
@@ -750,32 +1024,75 @@ async def list_dm_used_pool_items(session: AsyncSession, *, dm_user_id: int, lim
 
 
 async def get_pool_item(session: AsyncSession, item_id: int) -> ResourcePool | None:
-    res = await session.execute(select(ResourcePool).where(ResourcePool.id == int(item_id)))
+    item_id = int(item_id)
+    # lambda_stmt: the statement is built and cache-keyed once; only item_id is re-bound per call
+    res = await session.execute(lambda_stmt(lambda: select(ResourcePool).where(ResourcePool.id == item_id)))
     return res.scalar_one_or_none()
 
 
-async def list_free_pool_items_for_bank(session: AsyncSession, *, bank_id: int, source: str) -> list[ResourcePool]:
+async def get_pool_item_with_bank(
+    session: AsyncSession, item_id: int
+) -> tuple[ResourcePool | None, BankCondition | None]:
+    """Pool item and its (FB/main) bank in one round-trip (LEFT JOIN)."""
+    res = await session.execute(
+        select(ResourcePool, BankCondition)
+        .outerjoin(BankCondition, BankCondition.id == ResourcePool.bank_id)
+        .where(ResourcePool.id == int(item_id))
+    )
+    row = res.first()
+    if row is None:
+        return None, None
+    return row[0], row[1]
+
+
+def _free_pool_for_bank_cond(bank_id: int, source: str):
     src = (source or "TG").upper()
     if src == "TG":
-        cond = and_(
+        return and_(
             ResourcePool.status == ResourceStatus.FREE,
             or_(
                 and_(ResourcePool.source == "TG", ResourcePool.bank_id == int(bank_id)),
                 and_(ResourcePool.source == "ALL", ResourcePool.tg_bank_id == int(bank_id)),
             ),
         )
-    else:
-        cond = and_(
-            ResourcePool.status == ResourceStatus.FREE,
-            or_(
-                and_(ResourcePool.source == "FB", ResourcePool.bank_id == int(bank_id)),
-                and_(ResourcePool.source == "ALL", ResourcePool.bank_id == int(bank_id)),
-            ),
-        )
+    return and_(
+        ResourcePool.status == ResourceStatus.FREE,
+        or_(
+            and_(ResourcePool.source == "FB", ResourcePool.bank_id == int(bank_id)),
+            and_(ResourcePool.source == "ALL", ResourcePool.bank_id == int(bank_id)),
+        ),
+    )
+
+
+async def list_free_pool_items_for_bank(session: AsyncSession, *, bank_id: int, source: str) -> list[ResourcePool]:
+    cond = _free_pool_for_bank_cond(bank_id, source)
     res = await session.execute(select(ResourcePool).where(cond).order_by(ResourcePool.id.asc()))
     return list(res.scalars().all())
 
 
+async def count_free_pool_items_by_type(session: AsyncSession, *, bank_id: int, source: str) -> dict[str, int]:
+    """{"link": n, "esim": n, "link_esim": n} of FREE items list_free_pool_items_for_bank would return."""
+    out = {t.value: 0 for t in ResourceType}
+    res = await session.execute(
+        select(ResourcePool.type, func.count(ResourcePool.id))
+        .where(_free_pool_for_bank_cond(bank_id, source))
+        .group_by(ResourcePool.type)
+    )
+    for rtype, cnt in res.all():
+        out[rtype.value] = int(cnt)
+    return out
+
+
+async def get_first_free_pool_item(session: AsyncSession, *, bank_id: int, source: str, resource_type: str) -> ResourcePool | None:
+    res = await session.execute(
+        select(ResourcePool)
+        .where(_free_pool_for_bank_cond(bank_id, source), ResourcePool.type == ResourceType(resource_type))
+        .order_by(ResourcePool.id.asc())
+        .limit(1)
+    )
+    return res.scalar_one_or_none()
+
+
 async def count_free_pool_items_by_bank(session: AsyncSession, *, source: str) -> list[tuple[int, int]]:
     """
     Returns a list of (bank_id, free_count) for the given source.
@@ -841,6 +1158,7 @@ async def assign_pool_item_to_dm(session: AsyncSession, *, item_id: int, dm_user
     )
     if int(result.rowcount or 0) != 1:
         return None
+    note_pool_changed(session)
     item = await get_pool_item(session, int(item_id))
     if not item:
         return None
@@ -857,24 +1175,44 @@ async def assign_pool_item_to_dm(session: AsyncSession, *, item_id: int, dm_user
 
 
 async def release_pool_item(session: AsyncSession, *, item_id: int, dm_user_id: int) -> bool:
-    item = await get_pool_item(session, int(item_id))
-    if not item or item.status != ResourceStatus.ASSIGNED or int(item.assigned_to_user_id or 0) != int(dm_user_id):
+    result = await session.execute(
+        update(ResourcePool)
+        .where(
+            ResourcePool.id == int(item_id),
+            ResourcePool.status == ResourceStatus.ASSIGNED,
+            ResourcePool.assigned_to_user_id == int(dm_user_id),
+        )
+        .values(
+            status=ResourceStatus.FREE,
+            assigned_to_user_id=None,
+            assigned_at=None,
+        )
+    )
+    if int(result.rowcount or 0) != 1:
         return False
-    item.status = ResourceStatus.FREE
-    item.assigned_to_user_id = None
-    item.assigned_at = None
+    note_pool_changed(session)
     return True
 
 
 async def mark_pool_item_invalid(session: AsyncSession, *, item_id: int, dm_user_id: int, comment: str) -> ResourcePool | None:
-    item = await get_pool_item(session, int(item_id))
-    if not item or item.status != ResourceStatus.ASSIGNED or int(item.assigned_to_user_id or 0) != int(dm_user_id):
+    result = await session.execute(
+        update(ResourcePool)
+        .where(
+            ResourcePool.id == int(item_id),
+            ResourcePool.status == ResourceStatus.ASSIGNED,
+            ResourcePool.assigned_to_user_id == int(dm_user_id),
+        )
+        .values(
+            invalid_comment=(comment or "").strip(),
+            status=ResourceStatus.INVALID,
+            assigned_to_user_id=None,
+            assigned_at=None,
+        )
+    )
+    if int(result.rowcount or 0) != 1:
         return None
-    item.invalid_comment = (comment or "").strip()
-    item.status = ResourceStatus.INVALID
-    item.assigned_to_user_id = None
-    item.assigned_at = None
-    return item
+    note_pool_changed(session)
+    return await get_pool_item(session, int(item_id))
 
 
 async def form_has_linked_pool_item(session: AsyncSession, *, form_id: int) -> bool:
@@ -909,6 +1247,7 @@ async def mark_pool_item_used_with_form(session: AsyncSession, *, item_id: int,
     )
     if int(result.rowcount or 0) != 1:
         return None
+    note_pool_changed(session)
     return await get_pool_item(session, int(item_id))
 
 
@@ -926,7 +1265,8 @@ async def list_wictory_pool_items(session: AsyncSession, *, wictory_user_id: int
     return list(res.scalars().all())
 
 
-async def list_invalid_pool_items_for_wictory(session: AsyncSession, *, wictory_user_id: int) -> list[ResourcePool]:
+async def list_invalid_pool_items_for_wictory(session: AsyncSession) -> list[ResourcePool]:
+    """INVALID items created by any WICTORY user; the list is shared by all WICTORY users."""
     res = await session.execute(
         select(ResourcePool)
         .join(User, User.id == ResourcePool.created_by_user_id)
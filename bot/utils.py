@@ -9,6 +9,7 @@ from aiogram.types import Message
 from bot.models import AccessRequestStatus, FormStatus
 
 PHONE_RE = re.compile(r"^\+?\d[\d\-\s\(\)]{6,}$")
+_NON_DIGIT_RE = re.compile(r"\D")
 
 DM_APPROVED_NOTICE_IDS: dict[int, list[int]] = {}
 DM_REJECT_NOTICE_IDS: dict[int, dict[int, int]] = {}
@@ -36,11 +37,22 @@ def unpack_media_item(raw: str) -> tuple[str, str]:
     return kind, file_id
 
 
+def media_kind(raw: str) -> str:
+    """Kind of a packed media item; same result as unpack_media_item(raw)[0] without splitting."""
+    if raw.startswith("photo:") or ":" not in raw:
+        return "photo"
+    if raw.startswith("doc:"):
+        return "doc"
+    if raw.startswith("video:"):
+        return "video"
+    return unpack_media_item(raw)[0]
+
+
 def normalize_phone(text: str, default_country_code: str = "+380") -> str:
     raw = text.strip()
     if not raw:
         return ""
-    digits = re.sub(r"\D", "", raw)
+    digits = _NON_DIGIT_RE.sub("", raw)
     if not digits:
         return ""
 
@@ -65,11 +77,10 @@ def normalize_phone(text: str, default_country_code: str = "+380") -> str:
 
 def is_valid_phone(text: str) -> bool:
     text = text.strip()
+    # PHONE_RE only admits digits and separators, so no separate letter check is needed
     if not PHONE_RE.match(text):
         return False
-    if re.search(r"[A-Za-zА-Яа-я]", text):
-        return False
-    digits = re.sub(r"\D", "", text)
+    digits = _NON_DIGIT_RE.sub("", text)
     return 7 <= len(digits) <= 15
 
 
@@ -3,26 +3,76 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
+import pytest
 import pytest_asyncio
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from pytest_asyncio import is_async_test
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.pool import StaticPool
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from bot.models import Base
+from bot.auth_cache import invalidate_team_lead, invalidate_user
+from bot.bank_cache import invalidate_bank
+from bot.models import Base, User, UserRole
+from bot.pool_cache import invalidate_invalid_list
 
 
-@pytest_asyncio.fixture()
-async def session() -> AsyncSession:
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    # the shared engine below lives on the session loop, so every async test has to run there too
+    marker = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(marker, append=False)
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def engine() -> AsyncEngine:
     engine = create_async_engine(
         "sqlite+aiosqlite:///:memory:",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+
+    # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN itself
+    @event.listens_for(engine.sync_engine, "connect")
+    def _no_driver_txn(dbapi_connection, connection_record) -> None:
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _emit_begin(conn) -> None:
+        conn.exec_driver_sql("BEGIN")
+
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    session_maker = async_sessionmaker(engine, expire_on_commit=False)
-    async with session_maker() as session:
-        yield session
+    yield engine
     await engine.dispose()
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def session(engine: AsyncEngine) -> AsyncSession:
+    # process-wide caches must not leak between tests
+    invalidate_team_lead()
+    invalidate_user()
+    invalidate_bank()
+    invalidate_invalid_list()
+    async with engine.connect() as conn:
+        await conn.begin()
+        # test commits only release savepoints; the outer rollback undoes everything
+        async with AsyncSession(bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint") as session:
+            yield session
+        await conn.rollback()
+
+
+@pytest.fixture
+def make_users(session: AsyncSession):
+    """`await make_users(n, role)` -> n flushed users (tg_id 100, 101, ...), added with one flush."""
+
+    async def _make(n: int, role: UserRole = UserRole.DROP_MANAGER) -> list[User]:
+        users = [User(tg_id=100 + i, role=role) for i in range(n)]
+        session.add_all(users)
+        await session.flush()
+        return users
+
+    return _make
@@ -8,7 +8,9 @@ from bot.repositories import (
     assign_pool_item_to_dm,
     count_dm_active_pool_items_for_bank,
     count_free_pool_items_by_bank,
+    count_free_pool_items_by_type,
     form_has_linked_pool_item,
+    get_first_free_pool_item,
     list_dm_used_pool_items,
     mark_pool_item_used_with_form,
 )
@@ -151,6 +153,22 @@ async def test_count_free_pool_items_by_bank_counts_only_free_and_source(session
     assert dict(out) == {1: 2}
 
 
+@pytest.mark.asyncio
+async def test_count_free_pool_items_by_type_and_first_free(session) -> None:
+    dm = await _mk_user(session, 1311)
+    w = await _mk_user(session, 1312, role=UserRole.WICTORY)
+    it1 = await _mk_pool_item(session, bank_id=1, created_by_user_id=w.id, status=ResourceStatus.FREE)
+    it2 = await _mk_pool_item(session, bank_id=1, created_by_user_id=w.id, status=ResourceStatus.FREE)
+    it2.type = ResourceType.ESIM
+    await _mk_pool_item(session, bank_id=1, created_by_user_id=w.id, status=ResourceStatus.ASSIGNED, assigned_to_user_id=dm.id)
+    await session.flush()
+
+    counts = await count_free_pool_items_by_type(session, bank_id=1, source="TG")
+    assert counts == {"link": 1, "esim": 1, "link_esim": 0}
+    assert await get_first_free_pool_item(session, bank_id=1, source="TG", resource_type="link") is it1
+    assert await get_first_free_pool_item(session, bank_id=1, source="TG", resource_type="link_esim") is None
+
+
 def test_kb_dm_resource_type_pick_only_available() -> None:
     kb = kb_dm_resource_type_pick(7, ["link_esim"])
     rows = kb.inline_keyboard
@@ -1,116 +1,443 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from types import SimpleNamespace
 
 import pytest
+from sqlalchemy import event, func, insert, select
 
-from bot.keyboards import kb_dm_my_forms_list
-from bot.models import DuplicateReport, Form, FormStatus, User, UserRole
-from bot.repositories import delete_bank_condition, list_user_forms_in_range, phone_bank_duplicate_exists, update_bank
+from bot.keyboards import (
+    kb_dev_confirm,
+    kb_dev_forms_list_beautiful,
+    kb_dm_bank_select_inline_from_items,
+    kb_dm_my_forms_list,
+    kb_dm_resource_active_actions,
+    kb_done,
+    kb_form_confirm,
+)
+from bot.models import (
+    AccessRequest,
+    BankCondition,
+    DuplicateReport,
+    Form,
+    FormStatus,
+    ForwardGroup,
+    ResourceStatus,
+    Shift,
+    TeamLeadSource,
+    User,
+    UserRole,
+)
+from bot.pool_cache import cache_invalid_list, get_cached_invalid_list, pool_generation
+from bot.repositories import (
+    add_team_lead,
+    bank_instructions,
+    create_bank,
+    create_forward_group,
+    create_resource_pool_item,
+    delete_bank_condition,
+    delete_forward_group,
+    delete_user_by_tg_id,
+    find_phone_bank_duplicate,
+    get_bank,
+    get_bank_by_name,
+    get_pool_item_with_bank,
+    get_user_auth,
+    get_user_by_tg_id,
+    get_user_with_forward_group,
+    iter_users,
+    list_bank_items_cached,
+    list_user_tg_ids_by_role,
+    list_user_forms_in_range,
+    phone_bank_duplicate_exists,
+    pick_banks_for_source,
+    require_team_lead,
+    set_user_role,
+    update_bank,
+    upsert_user_from_tg,
+)
 from bot.utils import format_form_status, is_valid_phone, normalize_phone
 
+# shared fixture values
+PHONE = "+380 991234567"
+BANK_RU = "Моно"
+BANK_EN = "Mono"
 
-def test_normalize_phone_variants() -> None:
-    assert normalize_phone("0991234567") == "+380 991234567"
-    assert normalize_phone("+380991234567") == "+380 991234567"
-    assert normalize_phone("991234567") == "+380 991234567"
+# fixed clock for the date-range tests
+_NOW = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
 
 
-def test_is_valid_phone_rejects_letters() -> None:
-    assert is_valid_phone("+380991234567")
-    assert not is_valid_phone("+38099abc456")
+@dataclass(slots=True, frozen=True)
+class _FormRow:
+    """Stand-in for a Form where keyboard/formatting code only reads attributes."""
 
+    id: int
+    status: FormStatus
+    bank_name: str | None = None
+    traffic_type: str | None = None
 
-def test_format_form_status_values() -> None:
-    assert format_form_status(FormStatus.IN_PROGRESS) == "В работе"
-    assert format_form_status("APPROVED") == "Подтверждена"
+
+@pytest.mark.parametrize("raw", ["0991234567", "+380991234567", "991234567"])
+def test_normalize_phone_variants(raw: str) -> None:
+    assert normalize_phone(raw) == PHONE
+
+
+@pytest.mark.parametrize(("raw", "valid"), [("+380991234567", True), ("+38099abc456", False)])
+def test_is_valid_phone_rejects_letters(raw: str, valid: bool) -> None:
+    assert is_valid_phone(raw) is valid
+
+
+@pytest.mark.parametrize(
+    ("status", "label"),
+    [(FormStatus.IN_PROGRESS, "В работе"), ("APPROVED", "Подтверждена")],
+)
+def test_format_form_status_values(status, label: str) -> None:
+    assert format_form_status(status) == label
 
 
 @pytest.mark.asyncio
-async def test_phone_bank_duplicate_exists(session) -> None:
-    u1 = User(tg_id=101, role=UserRole.DROP_MANAGER)
-    u2 = User(tg_id=102, role=UserRole.DROP_MANAGER)
-    session.add_all([u1, u2])
-    await session.flush()
+async def test_phone_bank_duplicate_exists(session, make_users) -> None:
+    u1, u2 = await make_users(2)
 
-    f1 = Form(manager_id=u1.id, status=FormStatus.PENDING, phone="+380 991234567", bank_name="Моно")
-    f2 = Form(manager_id=u2.id, status=FormStatus.PENDING, phone="+380 991234567", bank_name="Моно")
+    f1 = Form(manager_id=u1.id, status=FormStatus.PENDING, phone=PHONE, bank_name=BANK_RU)
+    f2 = Form(manager_id=u2.id, status=FormStatus.PENDING, phone=PHONE, bank_name=BANK_RU)
     session.add_all([f1, f2])
     await session.flush()
 
-    dup = await phone_bank_duplicate_exists(session, phone=f1.phone, bank_name=f1.bank_name, exclude_form_id=f1.id)
+    assert await phone_bank_duplicate_exists(session, phone=PHONE, bank_name=BANK_RU, exclude_form_id=f1.id)
+    assert not await phone_bank_duplicate_exists(session, phone=PHONE, bank_name="Приват")
+    dup = await find_phone_bank_duplicate(session, phone=PHONE, bank_name=BANK_RU, exclude_form_id=f1.id)
     assert dup is not None
     assert dup.id == f2.id
 
 
 @pytest.mark.asyncio
-async def test_list_user_forms_in_range_filters(session) -> None:
-    u1 = User(tg_id=201, role=UserRole.DROP_MANAGER)
-    session.add(u1)
-    await session.flush()
+async def test_list_user_forms_in_range_filters(session, engine, make_users) -> None:
+    (u1,) = await make_users(1)
 
-    now = datetime.now(timezone.utc)
-    f1 = Form(manager_id=u1.id, status=FormStatus.PENDING, created_at=now - timedelta(days=2))
-    f2 = Form(manager_id=u1.id, status=FormStatus.PENDING, created_at=now - timedelta(days=1))
-    session.add_all([f1, f2])
-    await session.flush()
+    # only the ids are needed back: one bulk INSERT, no ORM instances
+    _, f2_id = (
+        await session.scalars(
+            insert(Form).returning(Form.id, sort_by_parameter_order=True),
+            [
+                {"manager_id": u1.id, "status": FormStatus.PENDING, "created_at": _NOW - timedelta(days=2)},
+                {"manager_id": u1.id, "status": FormStatus.PENDING, "created_at": _NOW - timedelta(days=1)},
+            ],
+        )
+    ).all()
 
-    res = await list_user_forms_in_range(
-        session,
-        user_id=u1.id,
-        created_from=now - timedelta(days=1, hours=1),
-        created_to=now + timedelta(days=1),
-    )
-    assert [f.id for f in res] == [f2.id]
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _record)
+    try:
+        res = await list_user_forms_in_range(
+            session,
+            user_id=u1.id,
+            created_from=_NOW - timedelta(days=1, hours=1),
+            created_to=_NOW + timedelta(days=1),
+        )
+        assert [(f.id, f.manager_id, f.status) for f in res] == [(f2_id, u1.id, FormStatus.PENDING)]
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _record)
+    # one SELECT, and nothing lazy-loaded while reading the rows
+    assert len(statements) == 1
 
 
 def test_kb_dm_my_forms_list_builds_buttons() -> None:
     forms = [
-        SimpleNamespace(id=1, bank_name="Моно", status=FormStatus.PENDING),
-        SimpleNamespace(id=2, bank_name=None, status=FormStatus.APPROVED),
+        _FormRow(id=1, bank_name=BANK_RU, status=FormStatus.PENDING),
+        _FormRow(id=2, bank_name=None, status=FormStatus.APPROVED),
     ]
     kb = kb_dm_my_forms_list(forms)
     assert kb.inline_keyboard[0][0].text.startswith("#1")
     assert kb.inline_keyboard[1][0].text.startswith("#2")
 
 
+def test_static_keyboards_are_built_once() -> None:
+    assert kb_done() is kb_done()
+    assert kb_form_confirm() is kb_form_confirm()
+
+
+def test_per_call_builder_markups_are_independent() -> None:
+    first = kb_dm_resource_active_actions(1)
+    second = kb_dm_resource_active_actions(2)
+    assert first.inline_keyboard[1][0].callback_data == "dm:resource_release:1"
+    assert second.inline_keyboard[1][0].callback_data == "dm:resource_release:2"
+    assert len(first.inline_keyboard) == 4
+
+
+def test_id_keyboards_are_memoized() -> None:
+    assert kb_dev_confirm("user", 1) is kb_dev_confirm("user", 1)
+    assert kb_dev_confirm("user", 1) is not kb_dev_confirm("req", 1)
+
+
+def test_bank_select_rows_match_builder_layout() -> None:
+    kb = kb_dm_bank_select_inline_from_items([(i, f"Bank{i}") for i in range(1, 6)])
+    assert [len(row) for row in kb.inline_keyboard] == [3, 1, 1, 1]
+    assert kb.inline_keyboard[0][0].callback_data == "dm:bank_id:1"
+    assert kb.inline_keyboard[-1][0].callback_data == "dm:back_to_phone"
+
+
+def test_dev_forms_list_status_emoji_from_enum() -> None:
+    form = _FormRow(id=5, status=FormStatus.APPROVED, traffic_type="DIRECT", bank_name=BANK_RU)
+    text, kb = kb_dev_forms_list_beautiful([form])
+    assert "✅ <code>5</code>" in text
+    assert kb.inline_keyboard[1][0].text.startswith("✅")
+
+
+@dataclass(slots=True, frozen=True)
+class _BankRow:
+    """Stand-in for a list_bank_source_rows row."""
+
+    name: str
+    instructions: str | None = None
+    instructions_tg: str | None = None
+    instructions_fb: str | None = None
+    required_screens: int | None = None
+    required_screens_tg: int | None = None
+    required_screens_fb: int | None = None
+
+
+def test_bank_instructions_and_source_pick() -> None:
+    i = bank_instructions(_BankRow("a", instructions=" old ", instructions_tg="", required_screens_fb=0))
+    assert (i.ins, i.ins_tg, i.ins_fb) == ("old", "", "")
+    assert (i.rs, i.rs_tg, i.rs_fb) == (None, None, 0)
+
+    tg = _BankRow("tg", instructions_tg="x")
+    fb = _BankRow("fb", required_screens_fb=2)
+    legacy = _BankRow("legacy", instructions="x")
+    both = _BankRow("both", instructions="x", instructions_tg="y")
+    banks = [tg, fb, legacy, both]
+    assert pick_banks_for_source(banks, "TG") == [tg, legacy, both]
+    assert pick_banks_for_source(banks, "fb") == [fb, legacy]
+    # nothing configured for FB and no legacy-only bank: fall back to banks not TG-only
+    assert pick_banks_for_source([tg, _BankRow("empty")], "FB")[0].name == "empty"
+
+
 @pytest.mark.asyncio
 async def test_update_bank_renames_related_records(session) -> None:
+    # whole fixture in one flush: rows are linked through relationships, not flushed ids
     u = User(tg_id=301, role=UserRole.DROP_MANAGER)
-    session.add(u)
+    bank = BankCondition(name=BANK_RU, template_screens=[])
+    f = Form(manager=u, status=FormStatus.PENDING, phone=PHONE, bank_name=BANK_RU)
+    d = DuplicateReport(manager=u, manager_source="TG", phone=PHONE, bank_name=BANK_RU)
+    session.add_all([u, bank, f, d])
     await session.flush()
 
-    from bot.repositories import create_bank
-    bank = await create_bank(session, "Моно")
-    f = Form(manager_id=u.id, status=FormStatus.PENDING, phone="+380 991234567", bank_name="Моно")
-    d = DuplicateReport(manager_id=u.id, manager_source="TG", phone="+380 991234567", bank_name="Моно")
-    session.add_all([f, d])
+    await update_bank(session, bank.id, name=BANK_EN)
     await session.flush()
 
-    await update_bank(session, bank.id, name="Mono")
-    await session.flush()
-
-    assert bank.name == "Mono"
-    assert f.bank_name == "Mono"
-    assert d.bank_name == "Mono"
+    assert bank.name == BANK_EN
+    assert f.bank_name == BANK_EN
+    assert d.bank_name == BANK_EN
 
 
 @pytest.mark.asyncio
-async def test_delete_bank_keeps_old_form_bank_name(session) -> None:
-    u = User(tg_id=401, role=UserRole.DROP_MANAGER)
-    session.add(u)
-    await session.flush()
+async def test_delete_bank_keeps_old_form_bank_name(session, make_users) -> None:
+    (u,) = await make_users(1)
 
-    from bot.repositories import create_bank, get_bank
     bank = await create_bank(session, "Альянс")
     f = Form(manager_id=u.id, status=FormStatus.PENDING, phone="+380 991111111", bank_name="Альянс")
     session.add(f)
-    await session.flush()
 
     ok = await delete_bank_condition(session, bank.id)
-    await session.flush()
 
     assert ok is True
     assert await get_bank(session, bank.id) is None
     assert f.bank_name == "Альянс"
+
+
+@pytest.mark.asyncio
+async def test_list_bank_items_cached_loads_on_cold_cache(session) -> None:
+    b = await create_bank(session, "Холодный")
+    a = await create_bank(session, "Альфа")
+
+    assert await list_bank_items_cached(session) == ((int(a.id), "Альфа"), (int(b.id), "Холодный"))
+    # served from the cache until a bank write drops it
+    await session.delete(a)
+    await session.flush()
+    assert await list_bank_items_cached(session) == ((int(a.id), "Альфа"), (int(b.id), "Холодный"))
+    await update_bank(session, int(b.id), name="Бета")
+    assert await list_bank_items_cached(session) == ((int(b.id), "Бета"),)
+
+
+@pytest.mark.asyncio
+async def test_get_user_with_forward_group_single_query(session) -> None:
+    g = ForwardGroup(chat_id=-100500, title="grp")
+    session.add(g)
+    await session.flush()
+    bound = User(tg_id=301, role=UserRole.DROP_MANAGER, forward_group_id=g.id)
+    unbound = User(tg_id=302, role=UserRole.DROP_MANAGER)
+    session.add_all([bound, unbound])
+    await session.flush()
+
+    user, group = await get_user_with_forward_group(session, int(bound.id))
+    assert user is bound
+    assert group is not None and int(group.chat_id) == -100500
+
+    user, group = await get_user_with_forward_group(session, int(unbound.id))
+    assert user is unbound and group is None
+
+    assert await get_user_with_forward_group(session, 999999) == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_get_pool_item_with_bank_single_query(session) -> None:
+    bank = await create_bank(session, "Пул")
+    creator = User(tg_id=501, role=UserRole.WICTORY)
+    session.add(creator)
+    await session.flush()
+    item = await create_resource_pool_item(
+        session,
+        source="TG",
+        bank_id=int(bank.id),
+        resource_type="link",
+        text_data="https://example.com",
+        screenshots=None,
+        created_by_user_id=int(creator.id),
+    )
+
+    it, b = await get_pool_item_with_bank(session, int(item.id))
+    assert it is item and b is bank
+
+    assert await get_pool_item_with_bank(session, 999999) == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_invalid_list_cache_dropped_on_pool_status_change(session) -> None:
+    bank = await create_bank(session, "Инвалид")
+    creator = User(tg_id=601, role=UserRole.WICTORY)
+    session.add(creator)
+    await session.flush()
+    item = await create_resource_pool_item(
+        session,
+        source="TG",
+        bank_id=int(bank.id),
+        resource_type="link",
+        text_data=None,
+        screenshots=None,
+        created_by_user_id=int(creator.id),
+    )
+
+    await session.commit()
+
+    cache_invalid_list(((1, "x"),), pool_generation())
+    assert get_cached_invalid_list() == ((1, "x"),)
+    item.status = ResourceStatus.INVALID
+    await session.flush()
+    # uncommitted: a concurrent reader must not see the list change yet
+    assert get_cached_invalid_list() == ((1, "x"),)
+    await session.commit()
+    assert get_cached_invalid_list() is None
+
+
+@pytest.mark.asyncio
+async def test_session_lookup_memo_follows_deletes_and_renames(session) -> None:
+    user = User(tg_id=701, role=UserRole.DROP_MANAGER)
+    session.add(user)
+    await session.flush()
+    assert await get_user_by_tg_id(session, 701) is user
+    assert await get_user_by_tg_id(session, 701) is user
+    await session.delete(user)
+    assert await get_user_by_tg_id(session, 701) is None
+
+    bank = await create_bank(session, "Мемо")
+    assert await get_bank_by_name(session, "Мемо") is bank
+    await update_bank(session, int(bank.id), name="Мемо2")
+    assert await get_bank_by_name(session, "Мемо") is None
+    assert await get_bank_by_name(session, "Мемо2") is bank
+
+
+@pytest.mark.asyncio
+async def test_delete_user_and_group_flush_without_collection_loads(session) -> None:
+    g = ForwardGroup(chat_id=-100700, title="grp")
+    session.add(g)
+    await session.flush()
+    user = User(tg_id=801, role=UserRole.DROP_MANAGER, forward_group_id=g.id)
+    session.add(user)
+    await session.flush()
+    user_id = int(user.id)
+    shift = Shift(manager_id=user_id)
+    session.add(shift)
+    await session.flush()
+    session.add_all(
+        [
+            Form(manager_id=user_id, shift_id=shift.id, status=FormStatus.PENDING, screenshots=[]),
+            AccessRequest(user_id=user_id),
+            DuplicateReport(manager_id=user_id, phone=PHONE, bank_name=BANK_RU),
+        ]
+    )
+
+    assert await delete_forward_group(session, int(g.id))
+    await session.flush()
+    assert user.forward_group_id is None
+    assert await session.get(ForwardGroup, g.id) is None
+
+    assert await delete_user_by_tg_id(session, 801)
+    await session.flush()
+    assert not await delete_user_by_tg_id(session, 801)
+    # passive_deletes relies on delete_user_by_tg_id clearing the children itself
+    for model, col in (
+        (Form, Form.manager_id),
+        (Shift, Shift.manager_id),
+        (AccessRequest, AccessRequest.user_id),
+        (DuplicateReport, DuplicateReport.manager_id),
+    ):
+        assert await session.scalar(select(func.count()).select_from(model).where(col == user_id)) == 0, model
+
+
+@pytest.mark.asyncio
+async def test_iter_users_pages_through_all_rows(session) -> None:
+    session.add_all([User(tg_id=900 + i, role=UserRole.WICTORY if i % 2 else UserRole.DROP_MANAGER) for i in range(5)])
+
+    seen = [int(u.tg_id) async for u in iter_users(session, chunk=2)]
+    assert seen == [900, 901, 902, 903, 904]
+    assert await list_user_tg_ids_by_role(session, UserRole.WICTORY) == [901, 903]
+
+
+@pytest.mark.asyncio
+async def test_upserts_update_existing_rows_in_place(session) -> None:
+    u1 = await upsert_user_from_tg(session, 950, "old", "A", None)
+    u2 = await upsert_user_from_tg(session, 950, "new", "A", None)
+    assert u1 is u2 and u2.username == "new" and u2.role == UserRole.PENDING
+
+    tl = await add_team_lead(session, 951, "tg")
+    assert (await add_team_lead(session, 951, "fb")) is tl
+    assert tl.source == TeamLeadSource.FB
+
+    g = await create_forward_group(session, chat_id=-100951, title="a")
+    assert (await create_forward_group(session, chat_id=-100951, title="b")) is g
+    assert g.title == "b" and not g.is_confirmed
+
+
+@pytest.mark.asyncio
+async def test_team_lead_cache_drops_on_commit_and_skips_negatives(session) -> None:
+    assert await require_team_lead(session, 961) is None
+    await add_team_lead(session, 961, "tg")
+    # "not a team lead" was not cached: the new row is seen right away
+    assert (await require_team_lead(session, 961)).source == TeamLeadSource.TG
+
+    await add_team_lead(session, 961, "fb")
+    assert (await require_team_lead(session, 961)).source == TeamLeadSource.TG
+    await session.commit()
+    assert (await require_team_lead(session, 961)).source == TeamLeadSource.FB
+
+
+@pytest.mark.asyncio
+async def test_user_auth_cache_drops_role_change_on_commit(session) -> None:
+    session.add(User(tg_id=971, role=UserRole.PENDING))
+    assert await get_user_auth(session, 970) is None
+    assert (await get_user_auth(session, 971)).role == UserRole.PENDING
+
+    await set_user_role(session, 971, UserRole.WICTORY)
+    await session.flush()
+    assert (await get_user_auth(session, 971)).role == UserRole.PENDING
+    await session.commit()
+    assert (await get_user_auth(session, 971)).role == UserRole.WICTORY
+
+    session.add(User(tg_id=970, role=UserRole.WICTORY))
+    # unknown users are not cached
+    assert (await get_user_auth(session, 970)).role == UserRole.WICTORY
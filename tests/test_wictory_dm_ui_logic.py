@@ -144,7 +144,7 @@ async def test_wictory_lists_and_edits_shared_pool_across_all_wictory_users(sess
     out = await list_wictory_pool_items(session, wictory_user_id=int(w1.id), limit=100)
     assert {int(x.created_by_user_id) for x in out} == {int(w1.id), int(w2.id)}
 
-    inv = await list_invalid_pool_items_for_wictory(session, wictory_user_id=int(w1.id))
+    inv = await list_invalid_pool_items_for_wictory(session)
     assert [int(x.id) for x in inv] == [int(it_w2_invalid.id)]
 
     # Any WICTORY user can edit any WICTORY-created item; DM-created items are not editable via WICTORY ops.